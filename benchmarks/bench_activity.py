@@ -0,0 +1,95 @@
+"""Write load of session activity tracking under concurrent chat turns.
+
+Runs the same concurrent chat turns in three modes and counts, per turn,
+the transactions committed and the statements that write agent_sessions:
+
+* ``legacy``    - the commit-per-step sequence chat() used originally
+* ``per-turn``  - activity upserted inside each turn's transaction
+                  (SESSION_ACTIVITY_FLUSH_INTERVAL=0)
+* ``coalesced`` - activity accumulated in memory and flushed in batches
+
+    python benchmarks/bench_activity.py [--threads 8] [--turns 200] [--group-commit]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+from support import make_project_app
+from bench_persistence import legacy_turn
+
+from src.models.user import db
+from src.services.intent import classify_message
+from src.services.persistence import ChatTurn, save_chat_turn
+
+
+def run(mode, threads, turns, group_commit, flush_interval, directory):
+    app = make_project_app(
+        f"sqlite:///{os.path.join(directory, f'{mode}.db')}",
+        CHAT_GROUP_COMMIT=group_commit,
+        SESSION_ACTIVITY_FLUSH_INTERVAL=0 if mode == 'per-turn' else flush_interval
+    )
+    commits = []
+    session_writes = []
+    with app.app_context():
+        event.listen(db.engine, 'commit', lambda conn: commits.append(1))
+
+        def count_session_writes(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().startswith(('INSERT', 'UPDATE')) and 'agent_sessions' in statement.split('(')[0]:
+                session_writes.append(1)
+        event.listen(db.engine, 'before_cursor_execute', count_session_writes)
+
+    response_data = classify_message('please write a python script')
+
+    def worker(index):
+        session_id = f'session-{index}'
+        with app.app_context():
+            for turn in range(turns):
+                message = f'message {turn} from worker {index}'
+                if mode == 'legacy':
+                    legacy_turn(session_id, message, response_data)
+                else:
+                    save_chat_turn(ChatTurn(session_id, message, response_data))
+            db.session.remove()
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    # Shutdown flushes count too
+    for name in ('chat_writer', 'session_activity'):
+        if app.extensions.get(name) is not None:
+            app.extensions[name].close()
+    with app.app_context():
+        db.engine.dispose()
+
+    total = threads * turns
+    return mode, total / elapsed, len(commits) / total, len(session_writes) / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--turns', type=int, default=200, help='turns per thread')
+    parser.add_argument('--group-commit', action='store_true')
+    parser.add_argument('--flush-interval', type=float, default=5.0)
+    parser.add_argument('--modes', default='legacy,per-turn,coalesced')
+    args = parser.parse_args()
+
+    print(f"{'mode':<11}{'turns/s':>9}{'commits/turn':>14}{'session writes/turn':>21}")
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in args.modes.split(','):
+            name, rate, commits, writes = run(mode, args.threads, args.turns, args.group_commit,
+                                              args.flush_interval, directory)
+            print(f'{name:<11}{rate:>9.1f}{commits:>14.3f}{writes:>21.4f}')
+
+
+if __name__ == '__main__':
+    main()
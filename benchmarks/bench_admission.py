@@ -0,0 +1,137 @@
+"""Overload test for chat admission control in the project backend.
+
+Open-loop traffic from a few chatty sessions (sharing one IP) and many
+normal ones (an IP each) arrives faster than a fixed pool of request
+workers (standing in for gunicorn threads) can serve the simulated agent
+turns. Latency is measured from the scheduled arrival, so time spent
+waiting for a worker counts. Three modes:
+
+- ``off``: no admission control, the backlog and latency keep growing
+- ``shed``: only the in-flight cap and bounded queue, excess gets 503
+- ``full``: per-session and per-IP token buckets as well, chatty sessions
+  get 429 and normal sessions keep their latency
+
+Clients do not retry, so rejected requests are simply counted.
+
+    python benchmarks/bench_admission.py [--duration 10] [--request-workers 16]
+        [--chatty 2] [--chatty-rate 6] [--normal 10] [--normal-rate 0.3]
+        [--max-in-flight 8] [--max-queued 4] [--queue-timeout 0.5]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_load import percentile, session_cookie
+from support import make_project_app
+
+MODES = ('off', 'shed', 'full')
+
+
+def admission_config(mode, args):
+    config = {}
+    if mode in ('shed', 'full'):
+        config.update(
+            CHAT_MAX_IN_FLIGHT=args.max_in_flight,
+            CHAT_MAX_QUEUED=args.max_queued,
+            CHAT_QUEUE_TIMEOUT=args.queue_timeout
+        )
+    if mode == 'full':
+        config.update(
+            RATE_LIMIT_SESSION_PER_MINUTE=args.session_per_minute,
+            RATE_LIMIT_SESSION_BURST=args.session_burst,
+            RATE_LIMIT_IP_PER_MINUTE=args.ip_per_minute,
+            RATE_LIMIT_IP_BURST=args.ip_burst
+        )
+    return config
+
+
+def schedule(args):
+    """Arrival times of (offset, kind, session_id, ip) for the whole run, evenly spaced per client"""
+    arrivals = []
+    clients = [('chatty', f'chatty-{index}', '10.0.0.1', args.chatty_rate) for index in range(args.chatty)]
+    clients += [('normal', f'normal-{index}', f'10.1.0.{index + 1}', args.normal_rate) for index in range(args.normal)]
+    for position, (kind, session_id, ip, rate) in enumerate(clients):
+        interval = 1 / rate
+        # Stagger clients so they do not all arrive on the same tick
+        offset = interval * position / len(clients)
+        while offset < args.duration:
+            arrivals.append((offset, kind, session_id, ip))
+            offset += interval
+    return sorted(arrivals)
+
+
+def run(mode, args, directory):
+    app = make_project_app(f"sqlite:///{os.path.join(directory, mode + '.db')}", **admission_config(mode, args))
+    request_workers = ThreadPoolExecutor(max_workers=args.request_workers)
+    results = defaultdict(list)
+    lock = threading.Lock()
+
+    def post_chat(scheduled, kind, session_id, ip):
+        client = app.test_client()
+        name, _, value = session_cookie(session_id).partition('=')
+        client.set_cookie(name, value)
+        response = client.post('/api/chat', json={'message': 'write a python script'},
+                               environ_base={'REMOTE_ADDR': ip})
+        with lock:
+            results[kind].append((response.status_code, time.perf_counter() - scheduled))
+
+    futures = []
+    start = time.perf_counter()
+    for offset, kind, session_id, ip in schedule(args):
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        futures.append(request_workers.submit(post_chat, start + offset, kind, session_id, ip))
+    for future in futures:
+        future.result()
+
+    request_workers.shutdown()
+    app.extensions['chat_jobs'].shutdown()
+    app.extensions['session_activity'].close()
+    return results
+
+
+def summarize(mode, kind, samples):
+    ok = [elapsed * 1000 for status, elapsed in samples if status == 200]
+    rejected = [elapsed * 1000 for status, elapsed in samples if status in (429, 503)]
+    return (
+        f"{mode:<6}{kind:<8}{len(samples):>6}{len(ok):>6}"
+        f"{sum(1 for status, _ in samples if status == 429):>6}"
+        f"{sum(1 for status, _ in samples if status == 503):>6}"
+        f"{percentile(ok, 50) if ok else 0:>10.0f}{percentile(ok, 95) if ok else 0:>10.0f}"
+        f"{percentile(rejected, 95) if rejected else 0:>14.0f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=MODES + ('all',), default='all')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--request-workers', type=int, default=16)
+    parser.add_argument('--chatty', type=int, default=2)
+    parser.add_argument('--chatty-rate', type=float, default=6, help='requests per second per chatty session')
+    parser.add_argument('--normal', type=int, default=10)
+    parser.add_argument('--normal-rate', type=float, default=0.3, help='requests per second per normal session')
+    parser.add_argument('--max-in-flight', type=int, default=8)
+    parser.add_argument('--max-queued', type=int, default=4)
+    parser.add_argument('--queue-timeout', type=float, default=0.5)
+    parser.add_argument('--session-per-minute', type=float, default=20)
+    parser.add_argument('--session-burst', type=int, default=5)
+    parser.add_argument('--ip-per-minute', type=float, default=60)
+    parser.add_argument('--ip-burst', type=int, default=15)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6}{'client':<8}{'sent':>6}{'200':>6}{'429':>6}{'503':>6}{'ok p50':>10}{'ok p95':>10}{'rejected p95':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in (MODES if args.mode == 'all' else (args.mode,)):
+            results = run(mode, args, directory)
+            for kind in ('chatty', 'normal'):
+                print(summarize(mode, kind, results[kind]))
+
+
+if __name__ == '__main__':
+    main()
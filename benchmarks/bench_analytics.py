@@ -0,0 +1,137 @@
+"""Tool and task analytics over a large message table in the project backend.
+
+Fills a database with --messages messages (half of them assistant turns
+with tasks and tools) spread over --days days, migrates it the way an
+upgrade would (tools_mask backfilled from the JSON column, usage_daily
+counted from scratch), then times three ways of answering "tools and tasks
+per day over the last --window days":
+
+- ``json scan``: load tools_used for the window and count in Python, which
+  was the only option before tools_mask
+- ``sql aggregate``: GROUP BY over tools_mask and task_description
+  (what rebuild_usage runs)
+- ``rollup``: GET /api/analytics/usage, reading usage_daily
+
+    python benchmarks/bench_analytics.py [--messages 1000000] [--days 365] [--window 30] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from support import make_project_app
+
+TASKS = ('Code development and programming', 'Website development and design',
+         'File management and document editing', 'Processing your request using available tools')
+TOOL_SETS = (['code', 'file', 'terminal'], ['browser', 'code', 'file'], ['file'], ['database', 'code'], None)
+CHUNK_SIZE = 5000
+
+
+def fill(db, Conversation, Message, args):
+    """Insert the messages with tools_mask left empty, as an older database would have them"""
+    rng = random.Random(17)
+    conversation_id = db.session.execute(
+        insert(Conversation.__table__).values(session_id='bench', title='bench', message_count=args.messages)
+    ).inserted_primary_key[0]
+    first = datetime.utcnow() - timedelta(days=args.days)
+    span = args.days * 86400
+    rows = []
+    for index in range(args.messages):
+        timestamp = first + timedelta(seconds=span * index / args.messages)
+        assistant = index % 2 == 1
+        # Every row has the same keys, executemany takes its columns from the first
+        rows.append({
+            'conversation_id': conversation_id,
+            'message_type': 'assistant' if assistant else 'user',
+            'content': 'done' if assistant else 'do it',
+            'timestamp': timestamp,
+            'task_description': rng.choice(TASKS) if assistant else None,
+            'tools_used': rng.choice(TOOL_SETS) if assistant else None
+        })
+        if len(rows) == CHUNK_SIZE:
+            db.session.execute(insert(Message.__table__), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(Message.__table__), rows)
+    db.session.commit()
+
+
+def json_scan(db, Message, start):
+    counts = Counter()
+    for timestamp, task, tools in db.session.execute(
+        select(Message.timestamp, Message.task_description, Message.tools_used)
+        .where(Message.message_type == 'assistant', Message.timestamp >= start)
+    ):
+        day = timestamp.date()
+        counts[(day, 'task', task)] += 1
+        for tool in tools or ():
+            counts[(day, 'tool', tool)] += 1
+    return counts
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--window', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_project_app(f"sqlite:///{os.path.join(directory, 'analytics.db')}")
+        with app.app_context():
+            from src.models.user import db
+            from src.models.chat import Conversation, Message
+            from src.services.usage import aggregate_usage, backfill_tool_usage
+
+            start = time.perf_counter()
+            fill(db, Conversation, Message, args)
+            print(f'filled {args.messages} messages in {time.perf_counter() - start:.1f}s')
+            start = time.perf_counter()
+            backfill_tool_usage()
+            print(f'backfilled tools_mask and usage_daily in {time.perf_counter() - start:.1f}s')
+
+            today = datetime.utcnow().date()
+            window_start = today - timedelta(days=args.window - 1)
+            client = app.test_client()
+            url = f'/api/analytics/usage?start={window_start}&end={today}'
+            # All three must agree before their timings mean anything
+            rollup = client.get(url).get_json()['totals']
+            expected = Counter({('tool', name): count for name, count in rollup['tools'].items()})
+            expected.update({('task', name): count for name, count in rollup['tasks'].items()})
+            window_start_at = datetime.combine(window_start, datetime.min.time())
+            for counts in (aggregate_usage(window_start, today), json_scan(db, Message, window_start_at)):
+                totals = Counter()
+                for (day, kind, name), count in counts.items():
+                    if kind != 'turn':
+                        totals[(kind, name)] += count
+                assert totals == expected
+
+            print(f"{'method':<16}{'median ms':>12}")
+            for name, function in (
+                ('json scan', lambda: json_scan(db, Message, window_start_at)),
+                ('sql aggregate', lambda: aggregate_usage(window_start, today)),
+                ('rollup', lambda: client.get(url)),
+            ):
+                print(f'{name:<16}{timed(function, args.repeat):>12.1f}')
+        app.extensions['chat_jobs'].shutdown()
+        app.extensions['session_activity'].close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Throughput of /api/chat/batch against one /api/chat request per message.
+
+Sends the same prompts to each backend once through /api/chat, one request
+per message, and once through /api/chat/batch in batches of --batch-size,
+and reports messages per second and SQL statements per message. The
+project backend's simulated agent delay is off unless --delay is given
+(it is paid once per request, so with it the gap is far larger).
+
+    python benchmarks/bench_batch.py [--backend both] [--messages 2000] [--batch-size 100] [--delay]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from bench_load import CHAT_MESSAGES, QueryCounter
+from support import load_production, make_project_app
+
+
+def prompts(count):
+    return [f'{CHAT_MESSAGES[index % len(CHAT_MESSAGES)]} #{index}' for index in range(count)]
+
+
+def send(client, mode, messages, batch_size, session_id=None):
+    extra = {'session_id': session_id} if session_id else {}
+    if mode == 'single':
+        for message in messages:
+            response = client.post('/api/chat', json={'message': message, **extra})
+            assert response.status_code == 200, response.get_json()
+    else:
+        for start in range(0, len(messages), batch_size):
+            response = client.post('/api/chat/batch', json={'messages': messages[start:start + batch_size], **extra})
+            assert response.status_code == 200, response.get_json()
+
+
+def measure(client, counter, mode, messages, batch_size, session_id=None):
+    queries = counter.count
+    start = time.perf_counter()
+    send(client, mode, messages, batch_size, session_id)
+    elapsed = time.perf_counter() - start
+    return len(messages) / elapsed, (counter.count - queries) / len(messages)
+
+
+def run_project(args, directory):
+    rows = []
+    for mode in ('single', 'batch'):
+        app = make_project_app(
+            f"sqlite:///{os.path.join(directory, f'project-{mode}.db')}",
+            AGENT_SIMULATED_DELAY=args.delay,
+            CHAT_BATCH_MAX_ITEMS=args.batch_size
+        )
+        with app.app_context():
+            from src.models.user import db
+            counter = QueryCounter(db.engine)
+        rows.append(('project', mode, *measure(app.test_client(), counter, mode, prompts(args.messages), args.batch_size)))
+        app.extensions['chat_jobs'].shutdown()
+        app.extensions['session_activity'].close()
+    return rows
+
+
+def run_production(args, directory):
+    production = load_production(f"sqlite:///{os.path.join(directory, 'production.db')}")
+    production.app.config['CHAT_BATCH_MAX_ITEMS'] = args.batch_size
+    with production.app.app_context():
+        counter = QueryCounter(production.db.engine)
+    client = production.app.test_client()
+    # A session each, so both modes start from an empty conversation
+    return [
+        ('production', mode, *measure(client, counter, mode, prompts(args.messages), args.batch_size, f'bench-{mode}'))
+        for mode in ('single', 'batch')
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=('project', 'production', 'both'), default='both')
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--delay', action='store_true', help="keep the project backend's simulated agent delay")
+    args = parser.parse_args()
+
+    print(f"{'backend':<12}{'mode':<8}{'msg/s':>10}{'SQL/msg':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        rows = []
+        if args.backend in ('project', 'both'):
+            rows += run_project(args, directory)
+        if args.backend in ('production', 'both'):
+            rows += run_production(args, directory)
+        for backend, mode, throughput, queries in rows:
+            print(f'{backend:<12}{mode:<8}{throughput:>10.0f}{queries:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
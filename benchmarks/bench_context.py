@@ -0,0 +1,120 @@
+"""Per-turn cost of building model context as conversations grow, project backend.
+
+For each --turns size, seeds one conversation with that many turns and then
+runs --repeat more turns through the pipeline a model backend would use:
+build the context window, ask the stub LLM, save the turn. It reports the
+median time and the peak Python memory (tracemalloc) per turn, the SQL
+statements per turn, and the one-off cost of the first build, which folds
+the seeded history into the rolling summary. ``naive`` loads and
+re-tokenizes the whole conversation on every turn instead.
+
+    python benchmarks/bench_context.py [--turns 10 100 1000 5000] [--repeat 20] [--budget 3000]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import insert, select
+
+from bench_load import CHAT_MESSAGES, QueryCounter
+from support import make_project_app
+
+
+def seed(db, Conversation, Message, classify_message, count_tokens, turns):
+    conversation_id = db.session.execute(
+        insert(Conversation.__table__).values(session_id='bench', title='bench', message_count=turns * 2)
+    ).inserted_primary_key[0]
+    rows = []
+    for index in range(turns):
+        question = f'{CHAT_MESSAGES[index % len(CHAT_MESSAGES)]} (turn {index})'
+        answer = classify_message(question)['content']
+        # Every row has the same keys, executemany takes its columns from the first
+        rows.append({'conversation_id': conversation_id, 'message_type': 'user', 'content': question,
+                     'token_count': count_tokens(question)})
+        rows.append({'conversation_id': conversation_id, 'message_type': 'assistant', 'content': answer,
+                     'token_count': count_tokens(answer)})
+    for start in range(0, len(rows), 5000):
+        db.session.execute(insert(Message.__table__), rows[start:start + 5000])
+    db.session.commit()
+    return conversation_id
+
+
+def naive_window(db, Message, count_tokens, conversation_id, budget):
+    """Everything read and tokenized again, newest messages kept while they fit"""
+    rows = db.session.execute(
+        select(Message.message_type, Message.content).where(Message.conversation_id == conversation_id).order_by(Message.id)
+    ).all()
+    tokens = [count_tokens(content) for _, content in rows]
+    window, used = [], 0
+    for (role, content), count in zip(reversed(rows), reversed(tokens)):
+        if used + count > budget:
+            break
+        used += count
+        window.append((role, content))
+    return window
+
+
+def measure(turn, repeat):
+    times, peaks = [], []
+    for index in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        turn(index)
+        times.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return statistics.median(times) * 1000, statistics.median(peaks) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, nargs='+', default=[10, 100, 1000, 5000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--budget', type=int, default=3000)
+    args = parser.parse_args()
+
+    print(f"{'turns':>7}{'mode':>9}{'first ms':>10}{'turn ms':>10}{'peak KB':>10}{'SQL/turn':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_project_app(f"sqlite:///{os.path.join(directory, 'context.db')}",
+                               AGENT_LLM='stub', CONTEXT_TOKEN_BUDGET=args.budget)
+        with app.app_context():
+            from src.models.user import db
+            from src.models.chat import Conversation, Message
+            from src.services.context import count_tokens
+            from src.services.intent import classify_message
+            from src.services.persistence import ChatTurn, save_chat_turn
+            builder = app.extensions['context_builder']
+            counter = QueryCounter(db.engine)
+
+            for turns in args.turns:
+                for mode in ('builder', 'naive'):
+                    conversation_id = seed(db, Conversation, Message, classify_message, count_tokens, turns)
+
+                    def turn(index):
+                        message = f'{CHAT_MESSAGES[index % len(CHAT_MESSAGES)]} (follow-up {index})'
+                        response_data = classify_message(message)
+                        if mode == 'builder':
+                            window = builder.build(conversation_id, message)
+                            response_data['content'] = builder.llm.complete(window, message)
+                        else:
+                            naive_window(db, Message, count_tokens, conversation_id, args.budget)
+                        response_data['processing_time'] = 0
+                        save_chat_turn(ChatTurn('bench', message, response_data, conversation_id=conversation_id))
+
+                    start = time.perf_counter()
+                    turn(0)
+                    first = (time.perf_counter() - start) * 1000
+                    queries = counter.count
+                    turn_ms, peak_kb = measure(turn, args.repeat)
+                    per_turn = (counter.count - queries) / args.repeat
+                    print(f'{turns:>7}{mode:>9}{first:>10.1f}{turn_ms:>10.2f}{peak_kb:>10.0f}{per_turn:>10.1f}')
+
+        app.extensions['chat_jobs'].shutdown()
+        app.extensions['session_activity'].close()
+
+
+if __name__ == '__main__':
+    main()
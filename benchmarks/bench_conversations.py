@@ -0,0 +1,82 @@
+"""Conversation listing cost against message volume in the project backend.
+
+Seeds one session with N conversations of M messages each and checks that
+GET /api/conversations runs a single SQL query with latency and memory
+independent of M. Exits non-zero if the listing ever issues more than one
+query, so it doubles as a regression check for the N+1 message load.
+
+    python benchmarks/bench_conversations.py [--conversations 1000] [--messages 0,10,100]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import event
+
+from support import make_project_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--conversations', type=int, default=1000)
+    parser.add_argument('--messages', default='0,10,100', help='messages per conversation')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'messages/conv':>14}{'queries':>9}{'latency ms':>12}{'peak KB':>10}")
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for per_conversation in (int(count) for count in args.messages.split(',')):
+            app = make_project_app(f"sqlite:///{os.path.join(directory, f'{per_conversation}.db')}")
+            from src.models.user import db
+            from src.models.chat import Conversation, Message
+
+            session_id = 'benchmark-session'
+            with app.app_context():
+                now = datetime.utcnow()
+                db.session.execute(Conversation.__table__.insert(), [
+                    dict(session_id=session_id, title=f'conversation {i}', created_at=now, updated_at=now,
+                         message_count=per_conversation, last_message_preview='preview', last_message_at=now)
+                    for i in range(args.conversations)
+                ])
+                ids = [row.id for row in db.session.execute(db.select(Conversation.id))]
+                if per_conversation:
+                    db.session.execute(Message.__table__.insert(), [
+                        dict(conversation_id=conversation_id, message_type='user', content='x' * 200, timestamp=now)
+                        for conversation_id in ids for _ in range(per_conversation)
+                    ])
+                db.session.commit()
+
+                queries = []
+                event.listen(db.engine, 'before_cursor_execute', lambda *a: queries.append(1))
+
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session['session_id'] = session_id
+
+            best = float('inf')
+            for _ in range(args.repeat):
+                del queries[:]
+                start = time.perf_counter()
+                client.get('/api/conversations')
+                best = min(best, time.perf_counter() - start)
+            query_count = len(queries)
+
+            tracemalloc.start()
+            client.get('/api/conversations')
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            failed |= query_count != 1
+            print(f"{per_conversation:>14}{query_count:>9}{best * 1000:>12.2f}{peak / 1024:>10.0f}")
+
+    if failed:
+        sys.exit('listing conversations must take exactly one query')
+
+
+if __name__ == '__main__':
+    main()
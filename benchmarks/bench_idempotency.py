@@ -0,0 +1,76 @@
+"""Duplicate chat turns under a retry storm, with and without Idempotency-Key.
+
+Each of --requests clients posts one message to /api/chat on the project
+backend and, as a client giving up on a slow response would, sends it again
+every --retry-after seconds, --retries times, while the simulated 1-2 s of
+agent work is still running. One more copy is sent once everything has
+finished. With ``key`` every copy carries the same Idempotency-Key; with
+``none`` each copy is a new turn. Reports the turns saved against the
+messages meant, the handler runs and how many answers were replayed.
+
+    python benchmarks/bench_idempotency.py [--requests 40] [--retries 3] [--retry-after 0.4]
+"""
+import argparse
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_load import CHAT_MESSAGES, percentile
+from support import make_project_app
+
+
+def run(mode, args, directory):
+    app = make_project_app(f"sqlite:///{os.path.join(directory, f'idempotency-{mode}.db')}")
+    keys = [str(uuid.uuid4()) for _ in range(args.requests)]
+
+    def attempt(job):
+        index, copy = job
+        time.sleep(copy * args.retry_after)
+        headers = {'Idempotency-Key': keys[index]} if mode == 'key' else {}
+        start = time.perf_counter()
+        response = app.test_client().post(
+            '/api/chat', json={'message': f'{CHAT_MESSAGES[index % len(CHAT_MESSAGES)]} ({index})'}, headers=headers
+        )
+        assert response.status_code == 200, response.get_json()
+        return time.perf_counter() - start, response.headers.get('Idempotent-Replayed') == 'true'
+
+    storm = [(index, copy) for index in range(args.requests) for copy in range(args.retries + 1)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(storm)) as clients:
+        samples = list(clients.map(attempt, storm))
+        # Late retries, after every original has finished
+        samples += list(clients.map(attempt, [(index, 0) for index in range(args.requests)]))
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        from src.models.chat import Message
+        turns = Message.query.filter_by(message_type='user').count()
+    guard = app.extensions.get('idempotency')
+    executed = guard.stats()['executed'] if mode == 'key' else len(samples)
+    app.extensions['chat_jobs'].shutdown()
+    app.extensions['session_activity'].close()
+    return samples, turns, executed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--retries', type=int, default=3, help='copies sent while the first is still running')
+    parser.add_argument('--retry-after', type=float, default=0.4, help='seconds between copies')
+    args = parser.parse_args()
+
+    print(f"{'mode':<6}{'sent':>6}{'turns':>7}{'duplicates':>12}{'handler runs':>14}{'replayed':>10}"
+          f"{'p50 ms':>8}{'wall s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ('none', 'key'):
+            samples, turns, executed, elapsed = run(mode, args, directory)
+            replayed = sum(1 for _, was_replayed in samples if was_replayed)
+            latencies = [seconds * 1000 for seconds, _ in samples]
+            print(f'{mode:<6}{len(samples):>6}{turns:>7}{turns - args.requests:>12}{executed:>14}{replayed:>10}'
+                  f'{percentile(latencies, 50):>8.0f}{elapsed:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Micro-benchmark for the keyword intent classifiers of both backends.
+
+Compares openmanus_common.intent, which both backends use, against the
+keyword chains it replaced on long messages (pasted code and documents), and
+checks that both give the same answers. Production resolves three tables
+that share keywords in one scan instead of one per table; the project's
+single table costs about what its chain did.
+
+    python benchmarks/bench_intent.py [--sizes 10,50,100] [--repeat 20]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_module(name, path):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+production_intent = load_module('production_intent', 'openmanus-backend-production/intent.py')
+project_intent = load_module('project_intent', 'openmanus-project/api/services/intent.py')
+
+
+def legacy_production(user_message):
+    """The generate_response/determine_task/determine_tools chains as they were"""
+    def first(rules, default):
+        message_lower = user_message.lower()
+        for keywords, value in rules:
+            if any(word in message_lower for word in keywords):
+                return value
+        return default
+
+    return {
+        'content': first(production_intent.RESPONSE_RULES, production_intent.GENERAL_RESPONSE),
+        'task': first(production_intent.TASK_RULES, "Processing your request using available tools"),
+        'tools': list(first(production_intent.TOOL_RULES, ('terminal', 'code', 'file'))),
+    }
+
+
+def legacy_project(user_message):
+    """The generate_agent_response chain as it was"""
+    user_message_lower = user_message.lower()
+    for keywords, response in project_intent.AGENT_RULES:
+        if any(keyword in user_message_lower for keyword in keywords):
+            return dict(response, tools=list(response['tools']))
+    return dict(project_intent.DEFAULT_RESPONSE, tools=list(project_intent.DEFAULT_RESPONSE['tools']))
+
+
+def make_message(size, rng, vocabulary):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(vocabulary)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)[:size]
+
+
+CORPORA = {
+    # Prose that never hits a keyword: the worst case for the old chains.
+    'miss': ['lorem', 'ipsum', 'dolor', 'sit', 'amet', 'quux', 'zebra', 'volt', 'moxy', 'QUIRK'],
+    # Pasted source code, which hits the low-priority rules late.
+    'code': ['def', 'return', 'self', 'import', 'for', 'in', 'range', 'if', 'else', 'None', 'lambda', 'x', 'y', 'CSV', 'excel'],
+}
+
+
+def timed(fn, messages, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in messages:
+            fn(message)
+        best = min(best, time.perf_counter() - start)
+    return best / len(messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,50,100', help='message sizes in KB')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--samples', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    pairs = [
+        ('production', legacy_production, production_intent.classify_message),
+        ('project', legacy_project, project_intent.classify_message),
+    ]
+
+    print(f"{'backend':<11}{'corpus':<7}{'size':>7}{'legacy ms':>12}{'current ms':>12}{'speedup':>9}")
+    for size_kb in (int(size) for size in args.sizes.split(',')):
+        for corpus, vocabulary in CORPORA.items():
+            messages = [make_message(size_kb * 1024, rng, vocabulary) for _ in range(args.samples)]
+            for backend, legacy, current in pairs:
+                for message in messages:
+                    assert legacy(message) == current(message), 'classifiers disagree'
+                legacy_time = timed(legacy, messages, args.repeat)
+                current_time = timed(current, messages, args.repeat)
+                print(f"{backend:<11}{corpus:<7}{size_kb:>5}KB{legacy_time * 1000:>12.3f}"
+                      f"{current_time * 1000:>12.3f}{legacy_time / current_time:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
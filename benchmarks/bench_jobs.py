@@ -0,0 +1,108 @@
+"""Load test for asynchronous chat submission in the project backend.
+
+A fixed pool of "request workers" (standing in for WSGI workers) serves a
+burst of chat requests while a prober keeps hitting /api/status through the
+same pool. In ``sync`` mode every chat request holds a worker for the whole
+agent turn; in ``async`` mode requests return 202 at once and the agent pool
+does the work, so the probes stay fast even while that pool is saturated.
+
+    python benchmarks/bench_jobs.py [--request-workers 4] [--agent-workers 4] [--requests 24]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from support import make_project_app
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def run(mode, args, directory):
+    app = make_project_app(
+        f"sqlite:///{os.path.join(directory, mode + '.db')}",
+        CHAT_JOB_WORKERS=args.agent_workers,
+        CHAT_JOB_QUEUE_DEPTH=args.requests
+    )
+    request_workers = ThreadPoolExecutor(max_workers=args.request_workers)
+    headers = {'Prefer': 'respond-async'} if mode == 'async' else {}
+
+    def post_chat(index):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post('/api/chat', json={'message': f'write a python script #{index}'}, headers=headers)
+        return client, response, time.perf_counter() - start
+
+    def probe():
+        start = time.perf_counter()
+        app.test_client().get('/api/status')
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    chats = [request_workers.submit(post_chat, index) for index in range(args.requests)]
+
+    probes = []
+    stop = threading.Event()
+
+    def prober():
+        while not stop.is_set():
+            submitted = time.perf_counter()
+            request_workers.submit(probe).result()
+            probes.append(time.perf_counter() - submitted)
+            stop.wait(args.probe_interval)
+
+    probe_thread = threading.Thread(target=prober)
+    probe_thread.start()
+
+    hold_times = []
+    for future in chats:
+        client, response, elapsed = future.result()
+        hold_times.append(elapsed)
+        if mode == 'async':
+            status_url = response.get_json()['status_url']
+            while client.get(status_url).get_json()['status'] not in ('succeeded', 'failed', 'cancelled'):
+                time.sleep(0.05)
+    total = time.perf_counter() - start
+
+    stop.set()
+    probe_thread.join()
+    request_workers.shutdown()
+    app.extensions['chat_jobs'].shutdown()
+    app.extensions['session_activity'].close()
+
+    return {
+        'mode': mode,
+        'hold_p50': statistics.median(hold_times),
+        'hold_max': max(hold_times),
+        'probe_p50': statistics.median(probes),
+        'probe_p95': percentile(probes, 0.95),
+        'probe_max': max(probes),
+        'total': total,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--request-workers', type=int, default=4)
+    parser.add_argument('--agent-workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=24)
+    parser.add_argument('--probe-interval', type=float, default=0.1)
+    args = parser.parse_args()
+
+    print(f"{'mode':<7}{'hold p50':>10}{'hold max':>10}{'probe p50':>11}{'probe p95':>11}{'probe max':>11}{'total s':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ('sync', 'async'):
+            result = run(mode, args, directory)
+            print(f"{result['mode']:<7}{result['hold_p50']:>10.3f}{result['hold_max']:>10.3f}"
+                  f"{result['probe_p50']:>11.3f}{result['probe_p95']:>11.3f}{result['probe_max']:>11.3f}"
+                  f"{result['total']:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,370 @@
+"""Load and latency benchmark for the HTTP endpoints of both backends.
+
+Seeds N sessions x M messages, then replays each scenario with a pool of
+concurrent clients and reports throughput, p50/p95/p99 latency and SQL
+statements per request as JSON. Requests go through the Flask test client
+in-process, or with --server over HTTP to a local server spawned from this
+script, so nothing leaves the machine either way.
+
+Scenarios: ``conversations`` (listing), ``history`` (one page of a
+conversation), ``static`` (SPA index and assets) and ``chat`` (a full
+turn, run last since it writes). Backend-production only has ``history``
+and ``chat``. --no-delay turns off the project backend's simulated 1-2 s
+of agent work, so ``chat`` measures the real overhead.
+
+    python benchmarks/bench_load.py [--backend both] [--server] [--concurrency 8]
+        [--requests 200] [--sessions 20] [--messages 100] [--no-delay] [--output report.json]
+"""
+import argparse
+import http.client
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event
+
+from support import load_production, make_project_app
+
+SCENARIOS = {
+    'project': ('conversations', 'history', 'static', 'chat'),
+    'production': ('history', 'chat'),
+}
+SECRET_KEY = 'benchmark'
+CHAT_MESSAGES = (
+    'Write a python script that parses a CSV file',
+    'Research the latest trends in renewable energy',
+    'Help me debug this javascript function',
+    'Create a marketing plan for a coffee shop',
+    'hello, what can you do?',
+)
+STATIC_PATHS = ('/', '/favicon.ico', '/conversations/42')
+
+
+class QueryCounter:
+    """Counts SQL statements executed on an engine"""
+
+    def __init__(self, engine):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+class InProcessTarget:
+    def __init__(self, app, counter):
+        self.app = app
+        self.counter = counter
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        if not hasattr(self._local, 'client'):
+            self._local.client = self.app.test_client()
+        client = self._local.client
+        headers = dict(headers or {})
+        if 'Cookie' in headers:
+            # The test client only sends cookies from its own jar
+            name, _, value = headers.pop('Cookie').partition('=')
+            client.set_cookie(name, value)
+        response = client.open(path, method=method, json=body, headers=headers)
+        response.close()
+        return response.status_code
+
+    def query_count(self):
+        return self.counter.count
+
+    def close(self):
+        for name in ('chat_writer', 'session_activity'):
+            if self.app.extensions.get(name) is not None:
+                self.app.extensions[name].close()
+
+
+class ServerTarget:
+    """A backend served by a child process running this script with --serve"""
+
+    def __init__(self, backend, database_uri, no_delay):
+        command = [sys.executable, os.path.abspath(__file__), '--serve', backend, '--database', database_uri]
+        if no_delay:
+            command.append('--no-delay')
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        self.port = int(self.process.stdout.readline().split()[1])
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        if not hasattr(self._local, 'connection'):
+            self._local.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        headers = dict(headers or {})
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        connection = self._local.connection
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            raise
+        return response.status
+
+    def query_count(self):
+        return json.loads(self._get('/__bench__/queries'))['queries']
+
+    def _get(self, path):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        connection.request('GET', path)
+        return connection.getresponse().read()
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def session_cookie(session_id):
+    """The signed Flask session cookie the project backend expects"""
+    signer = Flask('signer')
+    signer.secret_key = SECRET_KEY
+    return 'session=' + signer.session_interface.get_signing_serializer(signer).dumps({'session_id': session_id})
+
+
+def seed_rows(sessions, messages):
+    """Conversation and message rows for N sessions x M messages, oldest first"""
+    start = datetime.utcnow() - timedelta(seconds=sessions * messages)
+    conversations = [{'id': index + 1, 'session_id': f'bench-session-{index}'} for index in range(sessions)]
+    rows = []
+    for index in range(sessions):
+        for number in range(messages):
+            rows.append({
+                'conversation_id': index + 1,
+                'user': number % 2 == 0,
+                'content': f'{CHAT_MESSAGES[number % len(CHAT_MESSAGES)]} ({number})',
+                'timestamp': start + timedelta(seconds=index * messages + number)
+            })
+    return conversations, rows
+
+
+def seed_project(app, sessions, messages):
+    from src.models.user import db
+    from src.models.chat import Conversation, Message
+    from src.services.schema import backfill_conversation_summaries
+
+    conversations, rows = seed_rows(sessions, messages)
+    with app.app_context():
+        now = datetime.utcnow()
+        db.session.execute(Conversation.__table__.insert(), [
+            dict(conversation, title=f'Benchmark {conversation["id"]}', created_at=now, updated_at=now)
+            for conversation in conversations
+        ])
+        db.session.execute(Message.__table__.insert(), [{
+            'conversation_id': row['conversation_id'],
+            'message_type': 'user' if row['user'] else 'assistant',
+            'content': row['content'],
+            'timestamp': row['timestamp']
+        } for row in rows])
+        db.session.commit()
+        backfill_conversation_summaries()
+        db.engine.dispose()
+    return conversations
+
+
+def seed_production(module, sessions, messages):
+    conversations, rows = seed_rows(sessions, messages)
+    with module.app.app_context():
+        now = datetime.utcnow()
+        module.db.session.execute(module.Conversation.__table__.insert(), [
+            dict(conversation, created_at=now, updated_at=now) for conversation in conversations
+        ])
+        module.db.session.execute(module.Message.__table__.insert(), [{
+            'conversation_id': row['conversation_id'],
+            'role': 'user' if row['user'] else 'assistant',
+            'content': row['content'],
+            'timestamp': row['timestamp']
+        } for row in rows])
+        module.db.session.commit()
+        module.db.engine.dispose()
+    return conversations
+
+
+def build_request(backend, scenario, iteration, conversation):
+    """Return ``(method, path, body, headers)`` for one request of a scenario"""
+    session_id = conversation['session_id']
+    if backend == 'production':
+        if scenario == 'history':
+            return 'GET', f'/api/conversations?session_id={session_id}&limit=50', None, None
+        message = CHAT_MESSAGES[iteration % len(CHAT_MESSAGES)]
+        return 'POST', '/api/chat', {'message': message, 'session_id': session_id}, None
+
+    headers = {'Cookie': conversation['cookie']}
+    if scenario == 'conversations':
+        return 'GET', '/api/conversations', None, headers
+    if scenario == 'history':
+        return 'GET', f"/api/conversations/{conversation['id']}/messages?limit=50", None, headers
+    if scenario == 'static':
+        return 'GET', STATIC_PATHS[iteration % len(STATIC_PATHS)], None, {'Accept-Encoding': 'gzip, br'}
+    return 'POST', '/api/chat', {'message': CHAT_MESSAGES[iteration % len(CHAT_MESSAGES)]}, headers
+
+
+def run_scenario(target, backend, scenario, conversations, args):
+    latencies = [None] * args.requests
+    errors = []
+    next_iteration = iter(range(args.requests))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                iteration = next(next_iteration, None)
+            if iteration is None:
+                return
+            method, path, body, headers = build_request(
+                backend, scenario, iteration, conversations[iteration % len(conversations)]
+            )
+            start = time.perf_counter()
+            try:
+                status = target.request(method, path, body, headers)
+            except Exception as e:
+                status = repr(e)
+            latencies[iteration] = (time.perf_counter() - start) * 1000
+            if not isinstance(status, int) or status >= 400:
+                errors.append(status)
+
+    queries_before = target.query_count()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        for _ in range(args.concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - start
+    queries = target.query_count() - queries_before
+
+    return {
+        'backend': backend,
+        'scenario': scenario,
+        'requests': args.requests,
+        'errors': len(errors),
+        'error_statuses': sorted(set(map(str, errors))),
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(args.requests / elapsed, 1),
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(max(latencies), 3)
+        },
+        'db_queries_per_request': round(queries / args.requests, 2)
+    }
+
+
+def run_backend(backend, args, directory):
+    database_uri = f"sqlite:///{os.path.join(directory, f'{backend}.db')}"
+    if backend == 'project':
+        app = make_project_app(database_uri, AGENT_SIMULATED_DELAY=not args.no_delay)
+        from src.models.user import db
+        conversations = seed_project(app, args.sessions, args.messages)
+        for conversation in conversations:
+            conversation['cookie'] = session_cookie(conversation['session_id'])
+    else:
+        module = load_production(database_uri)
+        app, db = module.app, module.db
+        conversations = seed_production(module, args.sessions, args.messages)
+
+    if args.server:
+        target = ServerTarget(backend, database_uri, args.no_delay)
+    else:
+        with app.app_context():
+            target = InProcessTarget(app, QueryCounter(db.engine))
+
+    try:
+        scenarios = [name for name in args.scenarios.split(',') if name in SCENARIOS[backend]]
+        return [run_scenario(target, backend, scenario, conversations, args) for scenario in scenarios]
+    finally:
+        target.close()
+
+
+def serve(backend, database_uri, no_delay):
+    """Child process of --server: serve one backend on a free local port"""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    if backend == 'project':
+        app = make_project_app(database_uri, AGENT_SIMULATED_DELAY=not no_delay)
+        from src.models.user import db
+    else:
+        module = load_production(database_uri)
+        app, db = module.app, module.db
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+
+    @app.route('/__bench__/queries')
+    def bench_queries():
+        return {'queries': counter.count}
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    print(f'PORT {server.server_port}', flush=True)
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=('project', 'production', 'both'), default='both')
+    parser.add_argument('--server', action='store_true', help='benchmark over HTTP against a spawned local server')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--messages', type=int, default=100, help='seeded messages per session')
+    parser.add_argument('--scenarios', default='conversations,history,static,chat')
+    parser.add_argument('--no-delay', action='store_true', help="skip the project backend's simulated agent delay")
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--serve', choices=('project', 'production'), help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.serve, args.database, args.no_delay)
+
+    backends = ('project', 'production') if args.backend == 'both' else (args.backend,)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in backends:
+            results.extend(run_backend(backend, args, directory))
+
+    report = {
+        'config': {
+            'mode': 'server' if args.server else 'in-process',
+            'concurrency': args.concurrency,
+            'requests_per_scenario': args.requests,
+            'sessions': args.sessions,
+            'messages_per_session': args.messages,
+            'simulated_delay': not args.no_delay,
+            'python': platform.python_version(),
+            'started_at': datetime.utcnow().isoformat()
+        },
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
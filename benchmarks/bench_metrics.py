@@ -0,0 +1,70 @@
+"""Overhead of the request metrics middleware.
+
+Builds two project backends on identically seeded databases, one with
+METRICS_ENABLED and one without, and replays the same scenarios against
+both in alternating rounds so drift affects them equally. Reports the
+median per-request latency of each and the relative overhead. Requests run
+one at a time to keep scheduling noise out of the comparison.
+
+    python benchmarks/bench_metrics.py [--rounds 5] [--requests 500]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+
+from bench_load import InProcessTarget, QueryCounter, run_scenario, seed_project, session_cookie
+from support import load_project, make_project_app
+
+SCENARIOS = ('conversations', 'history', 'static', 'chat')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario and round')
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--slow-request-ms', type=float, default=0, help='also enable the slow-request log')
+    args = parser.parse_args()
+    args.concurrency = 1
+
+    load_project()
+    from src.models.user import db
+    targets = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for enabled in (False, True):
+            app = make_project_app(
+                f"sqlite:///{os.path.join(directory, f'metrics-{enabled}.db')}",
+                AGENT_SIMULATED_DELAY=False,
+                METRICS_ENABLED=enabled,
+                METRICS_SLOW_REQUEST_MS=args.slow_request_ms
+            )
+            app.logger.disabled = True
+            conversations = seed_project(app, args.sessions, args.messages)
+            for conversation in conversations:
+                conversation['cookie'] = session_cookie(conversation['session_id'])
+            with app.app_context():
+                targets[enabled] = (InProcessTarget(app, QueryCounter(db.engine)), conversations)
+
+        latency = {(scenario, enabled): [] for scenario in SCENARIOS for enabled in (False, True)}
+        for round_number in range(args.rounds):
+            # Swap which app goes first every round
+            order = (False, True) if round_number % 2 == 0 else (True, False)
+            for scenario in SCENARIOS:
+                for enabled in order:
+                    target, conversations = targets[enabled]
+                    result = run_scenario(target, 'project', scenario, conversations, args)
+                    latency[(scenario, enabled)].append(result['latency_ms']['p50'])
+
+        for target, _ in targets.values():
+            target.close()
+
+    print(f"{'scenario':<15}{'off p50 ms':>12}{'on p50 ms':>11}{'overhead':>10}")
+    for scenario in SCENARIOS:
+        off = statistics.median(latency[(scenario, False)])
+        on = statistics.median(latency[(scenario, True)])
+        print(f'{scenario:<15}{off:>12.3f}{on:>11.3f}{(on / off - 1) * 100:>9.1f}%')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Message history latency as conversations grow, for both backends.
+
+Seeds one conversation per size and times the default (most recent) page,
+a page deep in the history via ``before``, and the old load-everything
+query the endpoints used to run.
+
+    python benchmarks/bench_pagination.py [--sizes 1000,10000,100000] [--repeat 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from support import load_production, make_project_app
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def seed(db, table, conversation_id, count, **columns):
+    now = datetime.utcnow()
+    for start in range(0, count, 10000):
+        db.session.execute(table.insert(), [
+            dict(conversation_id=conversation_id, content=f'message {i}', timestamp=now, **columns)
+            for i in range(start, min(count, start + 10000))
+        ])
+    db.session.commit()
+
+
+def bench_project(sizes, repeat, directory):
+    app = make_project_app(f"sqlite:///{os.path.join(directory, 'project.db')}")
+    from src.models.user import db
+    from src.models.chat import Conversation, Message
+
+    rows = []
+    for size in sizes:
+        with app.app_context():
+            conversation = Conversation(session_id=f'session-{size}', title='benchmark')
+            db.session.add(conversation)
+            db.session.commit()
+            conversation_id = conversation.id
+            seed(db, Message.__table__, conversation_id, size, message_type='user')
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['session_id'] = f'session-{size}'
+        url = f'/api/conversations/{conversation_id}/messages'
+        middle = client.get(url, query_string={'limit': 1}).get_json()['page']['before'] - size // 2
+
+        def full_load():
+            with app.app_context():
+                messages = Message.query.filter_by(conversation_id=conversation_id).order_by(Message.timestamp.asc()).all()
+                [message.to_dict() for message in messages]
+
+        rows.append(('project', size,
+                     best_of(lambda: client.get(url), repeat),
+                     best_of(lambda: client.get(url, query_string={'before': middle}), repeat),
+                     best_of(full_load, max(1, repeat // 5))))
+    return rows
+
+
+def bench_production(sizes, repeat, directory):
+    production = load_production(f"sqlite:///{os.path.join(directory, 'production.db')}")
+    app, db, Conversation, Message = production.app, production.db, production.Conversation, production.Message
+
+    rows = []
+    for size in sizes:
+        with app.app_context():
+            conversation = Conversation(session_id=f'session-{size}')
+            db.session.add(conversation)
+            db.session.commit()
+            conversation_id = conversation.id
+            seed(db, Message.__table__, conversation_id, size, role='user')
+
+        client = app.test_client()
+        query = {'session_id': f'session-{size}'}
+        middle = client.get('/api/conversations', query_string=dict(query, limit=1)).get_json()['page']['before'] - size // 2
+
+        def full_load():
+            with app.app_context():
+                messages = Message.query.filter_by(conversation_id=conversation_id).order_by(Message.timestamp).all()
+                [(m.id, m.role, m.content, m.timestamp.isoformat()) for m in messages]
+
+        rows.append(('production', size,
+                     best_of(lambda: client.get('/api/conversations', query_string=query), repeat),
+                     best_of(lambda: client.get('/api/conversations', query_string=dict(query, before=middle)), repeat),
+                     best_of(full_load, max(1, repeat // 5))))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    print(f"{'backend':<11}{'messages':>9}{'latest ms':>11}{'middle ms':>11}{'load all ms':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for row in bench_project(sizes, args.repeat, directory) + bench_production(sizes, args.repeat, directory):
+            print(f"{row[0]:<11}{row[1]:>9}{row[2]:>11.2f}{row[3]:>11.2f}{row[4]:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Throughput benchmark for chat turn persistence in the project backend.
+
+Writes the same chat turns from concurrent threads in three modes and
+reports commits/sec and turns/sec for each:
+
+* ``legacy``  - the commit-per-step sequence chat() used before
+* ``single``  - one transaction per turn
+* ``group``   - turns coalesced by the background group-commit writer
+
+    python benchmarks/bench_persistence.py [--threads 8] [--turns 200]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from support import load_project, make_project_app
+
+load_project()
+from src.models.user import db  # noqa: E402
+from src.models.chat import Conversation, Message, AgentSession  # noqa: E402
+from src.services.intent import classify_message  # noqa: E402
+from src.services.persistence import ChatTurn, save_chat_turn  # noqa: E402
+
+
+def legacy_turn(session_id, user_message, response_data):
+    """The write sequence of chat() before turns were a single transaction"""
+    agent_session = AgentSession.query.filter_by(session_id=session_id).first()
+    if not agent_session:
+        agent_session = AgentSession(session_id=session_id)
+        db.session.add(agent_session)
+    else:
+        agent_session.last_active = datetime.utcnow()
+    db.session.commit()
+
+    conversation = Conversation.query.filter_by(session_id=session_id).order_by(Conversation.updated_at.desc()).first()
+    if not conversation:
+        conversation = Conversation(session_id=session_id, title=user_message[:50])
+        db.session.add(conversation)
+        db.session.commit()
+        agent_session.total_conversations += 1
+
+    db.session.add(Message(conversation_id=conversation.id, message_type='user', content=user_message))
+    db.session.commit()
+
+    conversation.updated_at = datetime.utcnow()
+    agent_session.total_messages += 1
+    db.session.commit()
+
+    assistant_message = Message(
+        conversation_id=conversation.id,
+        message_type='assistant',
+        content=response_data["content"],
+        task_description=response_data["task"],
+        tools_used=response_data["tools"]
+    )
+    db.session.add(assistant_message)
+    db.session.commit()
+
+    agent_session.total_messages += 1
+    db.session.commit()
+    return assistant_message.id
+
+
+def run(mode, threads, turns, directory):
+    path = os.path.join(directory, f'{mode}.db')
+    app = make_project_app(f'sqlite:///{path}', CHAT_GROUP_COMMIT=(mode == 'group'))
+    commits = []
+    with app.app_context():
+        event.listen(db.engine, 'commit', lambda conn: commits.append(1))
+
+    response_data = classify_message('please write a python script')
+    errors = []
+
+    def worker(index):
+        session_id = f'session-{index}'
+        with app.app_context():
+            for turn in range(turns):
+                message = f'message {turn} from worker {index}'
+                try:
+                    if mode == 'legacy':
+                        legacy_turn(session_id, message, response_data)
+                    else:
+                        save_chat_turn(ChatTurn(session_id, message, response_data))
+                except Exception as e:
+                    db.session.rollback()
+                    errors.append(e)
+            db.session.remove()
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    for name in ('chat_writer', 'session_activity'):
+        if app.extensions.get(name) is not None:
+            app.extensions[name].close()
+    with app.app_context():
+        db.engine.dispose()
+
+    completed = threads * turns - len(errors)
+    return {
+        'mode': mode,
+        'turns': completed,
+        'errors': len(errors),
+        'commits': len(commits),
+        'seconds': elapsed,
+        'turns_per_sec': completed / elapsed,
+        'commits_per_sec': len(commits) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--turns', type=int, default=200, help='turns per thread')
+    parser.add_argument('--modes', default='legacy,single,group')
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'turns':>7}{'errors':>8}{'commits':>9}{'seconds':>9}{'turns/s':>10}{'commits/s':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in args.modes.split(','):
+            result = run(mode, args.threads, args.turns, directory)
+            print(f"{result['mode']:<8}{result['turns']:>7}{result['errors']:>8}{result['commits']:>9}"
+                  f"{result['seconds']:>9.2f}{result['turns_per_sec']:>10.1f}{result['commits_per_sec']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
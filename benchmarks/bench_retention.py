@@ -0,0 +1,184 @@
+"""Space and hot-path latency before and after archiving cold conversations.
+
+Seeds --conversations conversations of --messages messages each, one
+session per conversation, with all but --hot of them last updated 60 days
+ago. Then it measures the database file size and the hot queries, runs one
+retention pass (RETENTION_DAYS=30) while a client keeps sending chat turns,
+VACUUMs, and measures again. The hot queries are a history page of a hot
+conversation (transcript cache off), a search in a hot session and a chat
+turn. A history page of an archived conversation, rehydrated from its
+archive, is timed afterwards.
+
+    python benchmarks/bench_retention.py [--conversations 4000] [--messages 100] [--hot 0.1]
+        [--repeat 50] [--batch-size 10] [--codec zlib]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from bench_load import CHAT_MESSAGES, percentile, session_cookie
+from support import make_project_app
+
+CHUNK_SIZE = 5000
+
+
+def seed(db, Conversation, Message, classify_message, count_tokens, args):
+    """Insert the conversations, the cold ones first so their message ids are lower"""
+    now = datetime.utcnow()
+    cold_at = now - timedelta(days=60)
+    hot_count = max(1, int(args.conversations * args.hot))
+    conversations = []
+    for index in range(args.conversations):
+        hot = index >= args.conversations - hot_count
+        conversations.append({
+            'id': index + 1, 'session_id': f'bench-{index}', 'title': f'conversation {index}',
+            'message_count': args.messages, 'created_at': cold_at, 'updated_at': now if hot else cold_at
+        })
+    db.session.execute(insert(Conversation.__table__), conversations)
+
+    answers = {message: classify_message(message) for message in CHAT_MESSAGES}
+    rows = []
+    for conversation in conversations:
+        for number in range(args.messages // 2):
+            question = CHAT_MESSAGES[(conversation['id'] + number) % len(CHAT_MESSAGES)]
+            answer = answers[question]
+            # Every row has the same keys, executemany takes its columns from the first
+            rows.append({'conversation_id': conversation['id'], 'message_type': 'user', 'content': question,
+                         'timestamp': conversation['updated_at'], 'token_count': count_tokens(question),
+                         'task_description': None, 'tools_used': None})
+            rows.append({'conversation_id': conversation['id'], 'message_type': 'assistant',
+                         'content': answer['content'], 'timestamp': conversation['updated_at'],
+                         'token_count': count_tokens(answer['content']),
+                         'task_description': answer['task'], 'tools_used': answer['tools']})
+            if len(rows) >= CHUNK_SIZE:
+                db.session.execute(insert(Message.__table__), rows)
+                rows = []
+    if rows:
+        db.session.execute(insert(Message.__table__), rows)
+    db.session.commit()
+    return [conversation['id'] for conversation in conversations[-hot_count:]]
+
+
+def file_size(db, path):
+    with db.engine.connect() as connection:
+        connection.execute(text('PRAGMA wal_checkpoint(TRUNCATE)'))
+    return os.path.getsize(path)
+
+
+def timed(function, repeat):
+    samples = []
+    for index in range(repeat):
+        start = time.perf_counter()
+        function(index)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def hot_queries(app, hot_ids, repeat):
+    rng = random.Random(7)
+
+    def client_for(conversation_id):
+        client = app.test_client()
+        name, _, value = session_cookie(f'bench-{conversation_id - 1}').partition('=')
+        client.set_cookie(name, value)
+        return client
+
+    clients = {conversation_id: client_for(conversation_id) for conversation_id in hot_ids}
+
+    def history(index):
+        conversation_id = rng.choice(hot_ids)
+        assert clients[conversation_id].get(f'/api/conversations/{conversation_id}/messages').status_code == 200
+
+    def search(index):
+        assert clients[rng.choice(hot_ids)].get('/api/search?q=website').status_code == 200
+
+    def chat(index):
+        assert clients[rng.choice(hot_ids)].post('/api/chat', json={'message': f'one more thing {index}'}).status_code == 200
+
+    return {name: timed(function, repeat) for name, function in (('history', history), ('search', search), ('chat', chat))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--conversations', type=int, default=4000)
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--hot', type=float, default=0.1, help='share of conversations still in use')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--codec', default='zlib', choices=['zlib', 'zstd'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'retention.db')
+        app = make_project_app(
+            f'sqlite:///{path}', AGENT_SIMULATED_DELAY=False, TRANSCRIPT_CACHE_SIZE=0,
+            RETENTION_BATCH_SIZE=args.batch_size, RETENTION_CODEC=args.codec
+        )
+        with app.app_context():
+            from src.models.user import db
+            from src.models.chat import Conversation, Message
+            from src.services.context import count_tokens
+            from src.services.intent import classify_message
+            from src.services.retention import RetentionWorker
+
+            start = time.perf_counter()
+            hot_ids = seed(db, Conversation, Message, classify_message, count_tokens, args)
+            print(f'seeded {args.conversations * args.messages} messages in {time.perf_counter() - start:.1f}s')
+            size_before = file_size(db, path)
+            before = hot_queries(app, hot_ids, args.repeat)
+
+            # Chat turns keep coming while the pass runs
+            turn_times, errors, stop = [], [], threading.Event()
+
+            def chatter():
+                client = app.test_client()
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    status = client.post('/api/chat', json={'message': 'still here'}).status_code
+                    turn_times.append((time.perf_counter() - start) * 1000)
+                    if status != 200:
+                        errors.append(status)
+
+            thread = threading.Thread(target=chatter)
+            thread.start()
+            worker = RetentionWorker(app, 30, batch_size=args.batch_size, codec=args.codec, start=False)
+            totals = worker.run_once()
+            stop.set()
+            thread.join()
+
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                connection.execute(text('VACUUM'))
+            size_after = file_size(db, path)
+            after = hot_queries(app, hot_ids, args.repeat)
+
+            cold_id = 1
+            cold = app.test_client()
+            name, _, value = session_cookie(f'bench-{cold_id - 1}').partition('=')
+            cold.set_cookie(name, value)
+            rehydrate = timed(lambda index: cold.get(f'/api/conversations/{cold_id}/messages'), args.repeat)
+
+        print(f"archived {totals['messages']} messages of {totals['conversations']} conversations in "
+              f"{totals['seconds']:.1f}s: {totals['raw_bytes'] / 2**20:.1f} MB serialized, "
+              f"{totals['archived_bytes'] / 2**20:.1f} MB compressed ({args.codec})")
+        print(f'chat turns during the pass: {len(turn_times)}, p50 {percentile(turn_times, 50):.1f} ms, '
+              f'p99 {percentile(turn_times, 99):.1f} ms, max {max(turn_times):.1f} ms, errors {len(errors)}')
+        print(f'database file: {size_before / 2**20:.1f} MB before, {size_after / 2**20:.1f} MB after VACUUM '
+              f'({(1 - size_after / size_before) * 100:.0f}% smaller)')
+        print(f"\n{'hot query':<12}{'before ms':>11}{'after ms':>10}")
+        for name in before:
+            print(f'{name:<12}{before[name]:>11.2f}{after[name]:>10.2f}')
+        print(f"{'archived history (rehydrated)':<30}{rehydrate:>8.2f} ms")
+
+        app.extensions['chat_jobs'].shutdown()
+        app.extensions['session_activity'].close()
+
+
+if __name__ == '__main__':
+    main()
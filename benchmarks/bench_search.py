@@ -0,0 +1,87 @@
+"""Message search latency: FTS5 index against a LIKE scan.
+
+Seeds N messages of random text spread over a number of sessions (indexed
+incrementally by the insert trigger), times a full rebuild, then times the
+same session-scoped queries through the FTS5 index and through the LIKE
+fallback (what searching looked like without the index).
+
+    python benchmarks/bench_search.py [--messages 1000000] [--sessions 100]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+from support import make_project_app
+
+QUERIES = ('w12', 'w7 w30', 'w400', 'w2500', 'w12*', 'w3 w9 w27')
+
+
+def make_text(rng, vocabulary, weights, words):
+    return ' '.join(rng.choices(vocabulary, weights, k=words))
+
+
+def time_queries(search, session_ids, query, rounds):
+    latencies = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        search.search(session_ids[i % len(session_ids)], query, limit=20)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), max(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--words', type=int, default=20, help='words per message')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocabulary = [f'w{i}' for i in range(5000)]
+    # Zipf-like: a few very common words and a long tail of rare ones
+    weights = [1 / (i + 1) for i in range(len(vocabulary))]
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_project_app(f"sqlite:///{os.path.join(directory, 'search.db')}")
+        from src.models.user import db
+        from src.models.chat import Conversation, Message
+        from src.services.search import MessageSearch
+
+        search = app.extensions['message_search']
+        session_ids = [f'session-{i}' for i in range(args.sessions)]
+        conversations = args.sessions * 10
+        now = datetime.utcnow()
+        with app.app_context():
+            started = time.perf_counter()
+            db.session.execute(Conversation.__table__.insert(), [
+                dict(session_id=session_ids[i % args.sessions], title=f'conversation {i}', created_at=now, updated_at=now)
+                for i in range(conversations)
+            ])
+            for start in range(0, args.messages, 10000):
+                db.session.execute(Message.__table__.insert(), [
+                    dict(conversation_id=i % conversations + 1, message_type='assistant',
+                         content=make_text(rng, vocabulary, weights, args.words), timestamp=now)
+                    for i in range(start, min(args.messages, start + 10000))
+                ])
+            db.session.commit()
+            print(f'inserted {args.messages} messages, indexed by trigger, in {time.perf_counter() - started:.1f}s')
+
+            start = time.perf_counter()
+            search.rebuild()
+            print(f'rebuilt the index in {time.perf_counter() - start:.1f}s')
+
+            like = MessageSearch(fts=False)
+            print(f"{'query':<12}{'fts p50 ms':>12}{'fts max':>10}{'like p50 ms':>13}{'like max':>10}{'speedup':>9}")
+            for query in QUERIES:
+                fts_p50, fts_max = time_queries(search, session_ids, query, args.rounds)
+                like_p50, like_max = time_queries(like, session_ids, query, max(3, args.rounds // 5))
+                print(f'{query:<12}{fts_p50:>12.2f}{fts_max:>10.2f}{like_p50:>13.1f}{like_max:>10.1f}{like_p50 / fts_p50:>8.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Cold start benchmark: process start to first response, for both backends.
+
+Every run is a fresh Python process that imports the framework, imports
+and sets up the backend against an existing database, then serves two
+requests through the test client. Each phase is timed separately, so the
+report shows where startup time goes, with and without FAST_STARTUP.
+Medians of --runs processes are reported as JSON, so releases can be
+compared.
+
+Phases: ``interpreter`` (process spawn to the first line of this script),
+``framework_imports`` (Flask, Flask-SQLAlchemy, Flask-CORS, SQLAlchemy),
+``app_imports`` (the backend's own modules), ``app_setup`` (building the
+app, including schema checks unless deferred), ``first_response`` (the
+first request, which also prepares the schema under FAST_STARTUP) and
+``second_response`` for comparison. ``total`` runs from spawn to the end
+of the first response.
+
+The project backend is started through api/main.py, as deployed:
+``app_imports`` are the modules it loads up front, ``app_setup`` the rest of
+importing it, and ``lazy_setup`` (part of ``first_response``) the
+blueprints and services it imports and sets up when the first request
+arrives. SQL statements per phase are counted too, and
+--latency-ms adds a delay to every connection and statement to model a
+database server instead of a local SQLite file.
+
+    python benchmarks/bench_startup.py [--backend both] [--runs 10] [--latency-ms 0] [--output report.json]
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from support import PRODUCTION_DIR, load_production, load_project
+
+PHASES = ('interpreter', 'framework_imports', 'app_imports', 'app_setup', 'first_response', 'second_response')
+FIRST_REQUEST = {
+    'project': '/api/conversations',
+    'production': '/api/conversations?session_id=bench',
+}
+
+
+def child(backend, database_uri, fast_startup, spawned_at, latency):
+    """Run inside the fresh process: time each phase and print them as JSON"""
+    timings = {'interpreter': time.time() - spawned_at}
+    os.environ['FAST_STARTUP'] = '1' if fast_startup else '0'
+
+    mark = time.perf_counter()
+    queries = 0
+
+    def lap(phase):
+        nonlocal mark, queries
+        now = time.perf_counter()
+        timings[phase] = now - mark
+        timings[phase + '_queries'] = queries
+        mark = now
+        queries = 0
+
+    import flask, flask_cors, flask_sqlalchemy, sqlalchemy  # noqa: F401
+    lap('framework_imports')
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    def before_cursor_execute(*args):
+        nonlocal queries
+        queries += 1
+        # A round trip to a database server
+        time.sleep(latency)
+
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(Engine, 'connect', lambda *args: time.sleep(latency))
+
+    lazy_setup = None
+    if backend == 'project':
+        os.environ['DATABASE_URL'] = database_uri
+        load_project()
+        import src.models.chat, src.services.retention, src.services.schema, src.services.storage  # noqa: F401
+        lap('app_imports')
+        main = importlib.import_module('src.main')
+        app, lazy_setup = main.app, main.lazy_setup
+    else:
+        sys.path.insert(0, PRODUCTION_DIR)
+        import intent, transfer, usage  # noqa: F401
+        import openmanus_common.metrics, openmanus_common.storage, openmanus_common.tools  # noqa: F401
+        lap('app_imports')
+        app = load_production(database_uri).app
+    lap('app_setup')
+
+    client = app.test_client()
+    for phase in ('first_response', 'second_response'):
+        response = client.get(FIRST_REQUEST[backend])
+        assert response.status_code == 200, response.get_data(as_text=True)
+        lap(phase)
+    if lazy_setup is not None:
+        timings['lazy_setup'] = lazy_setup.seconds
+
+    print(json.dumps(timings))
+    sys.stdout.flush()
+    # Skip the atexit flushes of background workers, they are not startup
+    os._exit(0)
+
+
+def spawn(backend, database_uri, fast_startup, latency):
+    spawned_at = time.time()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', backend, '--database', database_uri,
+         '--spawned-at', repr(spawned_at), '--latency', repr(latency)] + (['--fast-startup'] if fast_startup else []),
+        check=True, capture_output=True, text=True
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings['total'] = sum(timings[phase] for phase in PHASES if phase != 'second_response')
+    return timings
+
+
+def run_backend(backend, runs, latency, directory):
+    database_uri = f"sqlite:///{os.path.join(directory, backend + '.db')}"
+    # Creates the database and the bytecode caches, like an earlier deploy would have
+    spawn(backend, database_uri, False, 0)
+
+    results = []
+    for fast_startup in (False, True):
+        samples = [spawn(backend, database_uri, fast_startup, latency) for _ in range(runs)]
+        phases = PHASES + ('total',) + (('lazy_setup',) if 'lazy_setup' in samples[0] else ())
+        results.append({
+            'backend': backend,
+            'fast_startup': fast_startup,
+            'runs': runs,
+            'median_ms': {
+                phase: round(statistics.median(sample[phase] for sample in samples) * 1000, 1)
+                for phase in phases
+            },
+            'queries': {
+                phase: samples[-1][phase + '_queries'] for phase in ('app_setup', 'first_response', 'second_response')
+            }
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=('project', 'production', 'both'), default='both')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help='added to every connection and SQL statement, to model a database server')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--child', choices=('project', 'production'), help=argparse.SUPPRESS)
+    parser.add_argument('--database', help=argparse.SUPPRESS)
+    parser.add_argument('--spawned-at', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--fast-startup', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--latency', type=float, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.database, args.fast_startup, args.spawned_at, args.latency)
+
+    backends = ('project', 'production') if args.backend == 'both' else (args.backend,)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in backends:
+            results.extend(run_backend(backend, args.runs, args.latency_ms / 1000, directory))
+
+    report = {
+        'config': {
+            'runs': args.runs,
+            'latency_ms': args.latency_ms,
+            'python': platform.python_version(),
+            'started_at': datetime.utcnow().isoformat()
+        },
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Storage profiles compared under concurrent reads and writes from several workers.
+
+For each profile, --workers server processes of the project backend (what
+gunicorn workers would be) share one database seeded with --sessions x
+--messages. --clients clients then send --requests requests between them,
+--write-share of them chat turns and the rest history pages and
+conversation listings. Reports throughput, read and write latency and
+failed requests.
+
+SQLite runs the ``default`` engine settings, ``sqlite-wal`` without its
+single-writer queue and ``sqlite-wal``. PostgreSQL runs ``default`` and
+``postgres-pooled``, against --postgres-url (or BENCH_POSTGRES_URL) when
+given, otherwise against a throwaway local server if the ``pgserver``
+package is installed, otherwise not at all. Halfway through a PostgreSQL
+run, traffic stops and every connection is terminated on the server, as a
+failover or a proxy's idle timeout would, before the second half. Each
+profile gets a fresh database. Needs psycopg 3 for PostgreSQL.
+
+    python benchmarks/bench_storage.py [--workers 4] [--clients 32] [--requests 3000]
+        [--write-share 0.3] [--sessions 50] [--messages 100] [--postgres-url URL]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from bench_load import CHAT_MESSAGES, ServerTarget, percentile, seed_project, session_cookie
+from support import make_project_app
+
+SQLITE_CASES = (
+    ('sqlite default', {'STORAGE_PROFILE': 'default'}),
+    ('sqlite-wal, no writer queue', {'STORAGE_PROFILE': 'sqlite-wal', 'STORAGE_SINGLE_WRITER': '0'}),
+    ('sqlite-wal', {'STORAGE_PROFILE': 'sqlite-wal'}),
+)
+POSTGRES_CASES = (
+    ('postgres default', {'STORAGE_PROFILE': 'default'}),
+    ('postgres-pooled', {'STORAGE_PROFILE': 'postgres-pooled'}),
+)
+
+
+def postgres_server(directory):
+    """A local PostgreSQL URL: --postgres-url, or a pgserver started in ``directory``"""
+    try:
+        import pgserver
+    except ImportError:
+        return None
+    server = pgserver.get_server(directory, cleanup_mode='stop')
+    return server.get_uri().replace('postgresql://', 'postgresql+psycopg://', 1)
+
+
+def fresh_postgres_database(url, name):
+    """Create database ``name`` next to the one in ``url`` and return its URL"""
+    engine = create_engine(url, isolation_level='AUTOCOMMIT')
+    with engine.connect() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS {name}'))
+        connection.execute(text(f'CREATE DATABASE {name}'))
+    engine.dispose()
+    return make_url(url).set(database=name).render_as_string(hide_password=False)
+
+
+def terminate_connections(database_uri):
+    """Close every other connection to the database from the server side"""
+    engine = create_engine(database_uri, isolation_level='AUTOCOMMIT')
+    with engine.connect() as connection:
+        connection.execute(text(
+            'SELECT pg_terminate_backend(pid) FROM pg_stat_activity '
+            'WHERE datname = current_database() AND pid <> pg_backend_pid()'
+        ))
+    engine.dispose()
+
+
+def seed(database_uri, args):
+    app = make_project_app(database_uri, AGENT_SIMULATED_DELAY=False)
+    conversations = seed_project(app, args.sessions, args.messages)
+    app.extensions['chat_jobs'].shutdown()
+    app.extensions['session_activity'].close()
+    for conversation in conversations:
+        conversation['cookie'] = session_cookie(conversation['session_id'])
+    return conversations
+
+
+def run_case(database_uri, environment, args, midway=None):
+    conversations = seed(database_uri, args)
+    saved = {name: os.environ.get(name) for name in ('STORAGE_PROFILE', 'STORAGE_SINGLE_WRITER')}
+    os.environ.update(environment)
+    try:
+        targets = [ServerTarget('project', database_uri, no_delay=True) for _ in range(args.workers)]
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    rng = random.Random(11)
+    plan = [(rng.random() < args.write_share, rng.choice(conversations)) for _ in range(args.requests)]
+    latencies = {'read': [], 'write': []}
+    errors = []
+    lock = threading.Lock()
+
+    def client(next_request):
+        while True:
+            with lock:
+                index = next(next_request, None)
+            if index is None:
+                return
+            write, conversation = plan[index]
+            target = targets[index % len(targets)]
+            headers = {'Cookie': conversation['cookie']}
+            if write:
+                request = ('POST', '/api/chat', {'message': CHAT_MESSAGES[index % len(CHAT_MESSAGES)]}, headers)
+            elif index % 2:
+                request = ('GET', f"/api/conversations/{conversation['id']}/messages?limit=50", None, headers)
+            else:
+                request = ('GET', '/api/conversations', None, headers)
+            start = time.perf_counter()
+            try:
+                status = target.request(*request)
+            except Exception as e:
+                status = repr(e)
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies['write' if write else 'read'].append(elapsed)
+                if not isinstance(status, int) or status >= 400:
+                    errors.append(status)
+
+    try:
+        elapsed = 0
+        half = args.requests // 2
+        for indexes in (range(half), range(half, args.requests)):
+            if indexes.start and midway is not None:
+                # Between two bursts, with every connection idle in its pool
+                midway()
+            next_request = iter(indexes)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.clients) as pool:
+                for future in [pool.submit(client, next_request) for _ in range(args.clients)]:
+                    future.result()
+            elapsed += time.perf_counter() - start
+    finally:
+        for target in targets:
+            target.close()
+    return elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4, help='server processes sharing the database')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--write-share', type=float, default=0.3)
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--messages', type=int, default=100)
+    parser.add_argument('--postgres-url', default=os.environ.get('BENCH_POSTGRES_URL'))
+    args = parser.parse_args()
+
+    print(f"{'profile':<30}{'req/s':>8}{'read p50':>10}{'read p99':>10}{'write p50':>11}{'write p99':>11}{'failed':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        cases = [(label, f"sqlite:///{os.path.join(directory, f'storage-{index}.db')}", environment)
+                 for index, (label, environment) in enumerate(SQLITE_CASES)]
+        postgres_url = args.postgres_url or postgres_server(os.path.join(directory, 'postgres'))
+        if postgres_url:
+            cases += [(label, fresh_postgres_database(postgres_url, f'bench_storage_{index}'), environment)
+                      for index, (label, environment) in enumerate(POSTGRES_CASES)]
+
+        for label, database_uri, environment in cases:
+            midway = (lambda: terminate_connections(database_uri)) if database_uri.startswith('postgresql') else None
+            elapsed, latencies, errors = run_case(database_uri, environment, args, midway)
+            reads, writes = latencies['read'], latencies['write']
+            failed = f'{len(errors)}' + (f' {sorted(set(map(str, errors)))}' if errors else '')
+            print(f'{label:<30}{args.requests / elapsed:>8.0f}{percentile(reads, 50):>10.1f}{percentile(reads, 99):>10.1f}'
+                  f'{percentile(writes, 50):>11.1f}{percentile(writes, 99):>11.1f}{failed:>8}')
+        if not postgres_url:
+            print('postgres: skipped (pass --postgres-url or install pgserver and psycopg)')
+
+
+if __name__ == '__main__':
+    main()
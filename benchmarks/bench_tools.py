@@ -0,0 +1,88 @@
+"""End-to-end chat turn latency with tool execution, against the slowest tool.
+
+Drives /api/chat on the project backend with TOOL_EXECUTION on and the
+stub tools, from --clients concurrent clients, without the simulated agent
+delay. For every turn it compares the response time with the slowest of
+its tools and with the sum of them (what running the tools one after the
+other would cost). Run it once per --tool-workers to see what happens
+when the shared pool is smaller than clients times tools per turn.
+
+    python benchmarks/bench_tools.py [--turns 200] [--clients 8] [--tool-workers 16 32]
+        [--latency-scale 0.1] [--stream]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_load import CHAT_MESSAGES, percentile
+from support import make_project_app
+
+
+def stream_turn(client, message):
+    """Post a streamed turn; return when each tool event arrived and the tool results"""
+    response = client.post('/api/chat', json={'message': message}, headers={'Accept': 'text/event-stream'})
+    results = []
+    for block in response.get_data(as_text=True).split('\n\n'):
+        if block.startswith('event: tool'):
+            results.append(json.loads(block.split('data: ', 1)[1]))
+    return results
+
+
+def run(tool_workers, args, directory):
+    app = make_project_app(
+        f"sqlite:///{os.path.join(directory, f'tools-{tool_workers}.db')}",
+        AGENT_SIMULATED_DELAY=False,
+        TOOL_EXECUTION=True,
+        TOOL_WORKERS=tool_workers,
+        TOOL_STUB_LATENCY_SCALE=args.latency_scale
+    )
+
+    def turn(index):
+        client = app.test_client()
+        message = CHAT_MESSAGES[index % len(CHAT_MESSAGES)]
+        start = time.perf_counter()
+        if args.stream:
+            results = stream_turn(client, message)
+        else:
+            response = client.post('/api/chat', json={'message': message})
+            assert response.status_code == 200, response.get_json()
+            results = response.get_json()['tool_results']
+        elapsed = time.perf_counter() - start
+        tool_times = [result['output']['latency'] for result in results if result['status'] == 'succeeded']
+        return elapsed, max(tool_times, default=0), sum(tool_times)
+
+    with ThreadPoolExecutor(max_workers=args.clients) as clients:
+        samples = list(clients.map(turn, range(args.turns)))
+
+    app.extensions['chat_jobs'].shutdown()
+    app.extensions['session_activity'].close()
+    app.extensions['tool_executor'].shutdown()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--tool-workers', type=int, nargs='+', default=[16, 32])
+    parser.add_argument('--latency-scale', type=float, default=0.1, help='multiplies the stub tool latencies')
+    parser.add_argument('--stream', action='store_true', help='use the event stream instead of plain /api/chat')
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}{'turn p50':>10}{'turn p95':>10}{'slowest p50':>13}{'sum p50':>10}{'over slowest p50':>18}")
+    with tempfile.TemporaryDirectory() as directory:
+        for tool_workers in args.tool_workers:
+            samples = run(tool_workers, args, directory)
+            turns = [elapsed * 1000 for elapsed, _, _ in samples]
+            slowest = [tool * 1000 for _, tool, _ in samples]
+            serial = [total * 1000 for _, _, total in samples]
+            overhead = [(elapsed - tool) * 1000 for elapsed, tool, _ in samples]
+            print(f'{tool_workers:>8}{percentile(turns, 50):>10.0f}{percentile(turns, 95):>10.0f}'
+                  f'{percentile(slowest, 50):>13.0f}{percentile(serial, 50):>10.0f}{percentile(overhead, 50):>18.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""NDJSON export/import throughput and memory across both backends.
+
+Seeds the project backend with N messages, streams GET /api/export to a
+file, imports that file into the production backend with POST /api/import,
+exports it again from there and imports the result back into a fresh
+project database. Peak RSS growth per phase shows whether memory stays
+constant as the dataset grows.
+
+    python benchmarks/bench_transfer.py [--messages 1000000] [--per-conversation 100]
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+from datetime import datetime
+
+from support import load_production, make_project_app
+
+TOKEN = 'benchmark-token'
+HEADERS = {'Authorization': f'Bearer {TOKEN}'}
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def timed_phase(name, fn, results):
+    rss_before = max_rss_mb()
+    start = time.perf_counter()
+    detail = fn()
+    results.append((name, time.perf_counter() - start, max_rss_mb() - rss_before, detail))
+
+
+def export_to(client, path):
+    response = client.get('/api/export', headers=HEADERS, buffered=False)
+    size = 0
+    with open(path, 'w') as f:
+        for chunk in response.response:
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            size += len(chunk)
+            f.write(chunk)
+    response.close()
+    return f'{size / 1024 / 1024:.0f} MB'
+
+
+def import_from(client, path):
+    with open(path, 'rb') as f:
+        result = client.post('/api/import', headers=dict(HEADERS, **{'Content-Type': 'application/x-ndjson'}),
+                             input_stream=f, content_length=os.path.getsize(path)).get_json()
+    return f"{result['conversations']} conversations, {result['messages']} messages, {result['error_count']} errors"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000000)
+    parser.add_argument('--per-conversation', type=int, default=100)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        source = make_project_app(f"sqlite:///{os.path.join(directory, 'source.db')}", ADMIN_TOKEN=TOKEN)
+        target = make_project_app(f"sqlite:///{os.path.join(directory, 'target.db')}", ADMIN_TOKEN=TOKEN)
+        production = load_production(f"sqlite:///{os.path.join(directory, 'production.db')}")
+        production.app.config['ADMIN_TOKEN'] = TOKEN
+
+        from src.models.user import db
+        from src.models.chat import Conversation, Message
+
+        def seed():
+            conversations = max(1, args.messages // args.per_conversation)
+            now = datetime.utcnow()
+            with source.app_context():
+                db.session.execute(Conversation.__table__.insert(), [
+                    dict(session_id=f'session-{i}', title=f'conversation {i}', created_at=now, updated_at=now)
+                    for i in range(conversations)
+                ])
+                for start in range(0, args.messages, 10000):
+                    db.session.execute(Message.__table__.insert(), [
+                        dict(conversation_id=i % conversations + 1, message_type='user' if i % 2 else 'assistant',
+                             content=f'message {i} ' + 'lorem ipsum ' * 10, timestamp=now,
+                             task_description='Code development and programming', tools_used=['code', 'file'])
+                        for i in range(start, min(args.messages, start + 10000))
+                    ])
+                db.session.commit()
+            return f'{conversations} conversations, {args.messages} messages'
+
+        project_file = os.path.join(directory, 'project.ndjson')
+        production_file = os.path.join(directory, 'production.ndjson')
+        timed_phase('seed project', seed, results)
+        timed_phase('export project', lambda: export_to(source.test_client(), project_file), results)
+        timed_phase('import production', lambda: import_from(production.app.test_client(), project_file), results)
+        timed_phase('export production', lambda: export_to(production.app.test_client(), production_file), results)
+        timed_phase('import project', lambda: import_from(target.test_client(), production_file), results)
+
+    print(f"{'phase':<19}{'seconds':>9}{'msgs/s':>10}{'RSS +MB':>9}  detail")
+    for name, seconds, rss, detail in results:
+        print(f"{name:<19}{seconds:>9.2f}{args.messages / seconds:>10.0f}{rss:>9.1f}  {detail}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Onboarding-sized user imports and listings on the project backend.
+
+Imports --users users three ways and reports users per second:
+
+- ``single``: one POST /api/users per user, each with its own commit, for
+  the first --single users only (it is the slow path being replaced)
+- ``bulk``: POST /api/users/bulk, --batch-size users per request
+- ``bulk again``: the same import repeated, so every row is a conflict, and
+  then in upsert mode with every email changed, so every row is an update
+
+It then times listing them: the whole table in one response (what GET
+/api/users used to return) against one keyset page, with all fields and
+with ``fields=username``, and walking every page.
+
+    python benchmarks/bench_users.py [--users 100000] [--single 2000] [--batch-size 1000] [--page-size 200]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from support import make_project_app
+
+
+def users(start, stop, domain='example.com'):
+    return [{'username': f'user{index}', 'email': f'user{index}@{domain}'} for index in range(start, stop)]
+
+
+def bulk_import(client, rows, batch_size, mode='create'):
+    counts = {}
+    for start in range(0, len(rows), batch_size):
+        response = client.post('/api/users/bulk', json={'users': rows[start:start + batch_size], 'mode': mode})
+        assert response.status_code in (200, 207), response.get_json()
+        for status in ('created', 'updated', 'conflict'):
+            counts[status] = counts.get(status, 0) + response.get_json()[status]
+    return counts
+
+
+def timed(function, repeat=5):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--single', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--page-size', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_project_app(f"sqlite:///{os.path.join(directory, 'users.db')}")
+        client = app.test_client()
+
+        print(f"{'import':<22}{'users':>9}{'seconds':>10}{'users/s':>10}  result")
+        start = time.perf_counter()
+        for row in users(0, args.single):
+            assert client.post('/api/users', json=row).status_code == 201
+        elapsed = time.perf_counter() - start
+        print(f"{'single':<22}{args.single:>9}{elapsed:>10.2f}{args.single / elapsed:>10.0f}")
+
+        for label, rows, mode in (
+            ('bulk', users(args.single, args.users), 'create'),
+            ('bulk again (conflicts)', users(0, args.users), 'create'),
+            ('bulk upsert (updates)', users(0, args.users, 'example.org'), 'upsert'),
+        ):
+            start = time.perf_counter()
+            counts = bulk_import(client, rows, args.batch_size, mode)
+            elapsed = time.perf_counter() - start
+            print(f'{label:<22}{len(rows):>9}{elapsed:>10.2f}{len(rows) / elapsed:>10.0f}  {counts}')
+
+        with app.app_context():
+            from flask import jsonify
+            from src.models.user import User
+
+            def list_all():
+                # The old GET /api/users
+                return jsonify([user.to_dict() for user in User.query.all()])
+
+            def walk():
+                after = 0
+                while True:
+                    page = client.get(f'/api/users?limit={args.page_size}&fields=username&after={after}').get_json()['page']
+                    if not page['has_more']:
+                        return
+                    after = page['after']
+
+            middle = args.users // 2
+            print(f"\n{'listing':<30}{'median ms':>10}")
+            for label, function, repeat in (
+                ('whole table', list_all, 3),
+                ('one page', lambda: client.get(f'/api/users?limit={args.page_size}&after={middle}'), 20),
+                ('one page, fields=username', lambda: client.get(
+                    f'/api/users?limit={args.page_size}&fields=username&after={middle}'), 20),
+                ('every page, fields=username', walk, 1),
+            ):
+                print(f'{label:<30}{timed(function, repeat):>10.1f}')
+
+        app.extensions['chat_jobs'].shutdown()
+        app.extensions['session_activity'].close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Helpers shared by the benchmark scripts."""
+import importlib
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_DIR = os.path.join(ROOT, 'openmanus-project')
+PRODUCTION_DIR = os.path.join(ROOT, 'openmanus-backend-production')
+
+
+def load_project():
+    """Make the project backend importable under the ``src`` name it is deployed as"""
+    if 'src' not in sys.modules:
+        sys.path.insert(0, PROJECT_DIR)
+        sys.modules['src'] = importlib.import_module('api')
+    return sys.modules['src']
+
+
+def load_production(database_uri):
+    """Import backend-production/app.py against its own database (once per process)"""
+    if 'app' not in sys.modules:
+        os.environ['DATABASE_URL'] = database_uri
+        sys.path.insert(0, PRODUCTION_DIR)
+    return importlib.import_module('app')
+
+
+def make_project_app(database_uri, **config):
+    """Build the project backend the way api/main.py does, on its own database"""
+    load_project()
+    from flask import Flask
+    from src.models.user import db
+    from src.routes.user import user_bp
+    from src.routes.chat import chat_bp
+    from src.routes.transfer import transfer_bp
+    from src.routes.analytics import analytics_bp
+    from src.services.activity import init_activity
+    from src.services.admission import init_admission
+    from src.services.cache import init_cache
+    from src.services.context import init_context
+    from src.services.idempotency import init_idempotency
+    from src.services.jobs import init_jobs
+    from src.services.metrics import init_metrics
+    from src.services.persistence import init_persistence
+    from src.services.retention import init_retention
+    from src.services.schema import init_schema
+    from src.services.search import init_search
+    from src.services.static import init_static
+    from src.services.storage import init_storage
+    from src.services.tools import init_tools
+
+    app = Flask('openmanus-benchmark', static_folder=os.path.join(PROJECT_DIR, 'api', 'static'))
+    app.config.update(
+        SECRET_KEY='benchmark',
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        # Benchmarks drive chat from one client as fast as it goes, so rate
+        # limits and the in-flight cap are off unless a benchmark sets them
+        RATE_LIMIT_SESSION_PER_MINUTE=0,
+        RATE_LIMIT_IP_PER_MINUTE=0,
+        CHAT_MAX_IN_FLIGHT=0
+    )
+    app.config.update(config)
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(chat_bp, url_prefix='/api')
+    app.register_blueprint(transfer_bp, url_prefix='/api')
+    app.register_blueprint(analytics_bp, url_prefix='/api')
+    init_storage(app)
+    db.init_app(app)
+    init_schema(app)
+    init_cache(app)
+    init_activity(app)
+    init_persistence(app)
+    init_retention(app)
+    init_jobs(app)
+    init_tools(app)
+    init_context(app)
+    init_search(app)
+    init_metrics(app)
+    init_admission(app)
+    init_idempotency(app)
+
+    static_manifest = init_static(app)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        static_file = static_manifest.get(path) if path != '' else None
+        return static_manifest.send(static_file or static_manifest.get('index.html'))
+
+    return app
@@ -1,9 +1,25 @@
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+from functools import wraps
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy import inspect
+from sqlalchemy.exc import DBAPIError
+from werkzeug.middleware.proxy_fix import ProxyFix
+from datetime import date, datetime, timedelta
+import hmac
+import io
 import json
+import threading
+
+from intent import classify_message, classify_messages
+from openmanus_common.idempotency import IdempotencyGuard, MemoryIdempotencyStore
+from openmanus_common.metrics import init_metrics
+from openmanus_common.storage import Storage
+from openmanus_common.tools import DEFAULT_TOOL_TIMEOUT, ToolExecutor, stub_registry
+from openmanus_common.usage import INTERVALS, count_usage, record_usage, usage_report
+from transfer import NDJSONImporter, export_ndjson
+from usage import backfill_usage
 
 app = Flask(__name__)
 
@@ -11,6 +27,28 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///openmanus.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Tuned engine settings: STORAGE_PROFILE=auto picks sqlite-wal or postgres-pooled by database
+storage = Storage(app.config['SQLALCHEMY_DATABASE_URI'], os.environ.get('STORAGE_PROFILE', 'auto'))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = storage.engine_options()
+# Bearer token for the /api/export and /api/import endpoints (disabled when unset)
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN')
+# Most messages accepted by one /api/chat/batch request
+app.config['CHAT_BATCH_MAX_ITEMS'] = int(os.environ.get('CHAT_BATCH_MAX_ITEMS', 100))
+# Run each turn's tools (offline stubs for now) concurrently and return their results
+app.config['TOOL_EXECUTION'] = os.environ.get('TOOL_EXECUTION', '0') == '1'
+app.config['TOOL_WORKERS'] = int(os.environ.get('TOOL_WORKERS', 16))
+app.config['TOOL_TIMEOUT'] = float(os.environ.get('TOOL_TIMEOUT', DEFAULT_TOOL_TIMEOUT))
+app.config['TOOL_STUB_LATENCY_SCALE'] = float(os.environ.get('TOOL_STUB_LATENCY_SCALE', 1))
+# Proxies in front that set X-Forwarded-For (Railway: 1). Without them every
+# client has the proxy's address, and Idempotency-Key scopes are shared
+app.config['TRUSTED_PROXY_HOPS'] = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))
+if app.config['TRUSTED_PROXY_HOPS']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_HOPS'], x_proto=app.config['TRUSTED_PROXY_HOPS'])
+# Replay responses to retries sent with the same Idempotency-Key (0 keys turns it off)
+app.config['IDEMPOTENCY_TTL'] = float(os.environ.get('IDEMPOTENCY_TTL', 86400))
+app.config['IDEMPOTENCY_MAX_KEYS'] = int(os.environ.get('IDEMPOTENCY_MAX_KEYS', 10000))
+app.config['IDEMPOTENCY_MAX_BYTES'] = int(os.environ.get('IDEMPOTENCY_MAX_BYTES', 32 * 1024 * 1024))
+app.config['IDEMPOTENCY_WAIT_TIMEOUT'] = float(os.environ.get('IDEMPOTENCY_WAIT_TIMEOUT', 30))
 
 # Initialize extensions
 db = SQLAlchemy(app)
@@ -32,9 +70,104 @@ class Message(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     tools_used = db.Column(db.Text)  # JSON string of tools used
 
-# Create tables
-with app.app_context():
+    __table_args__ = (
+        # Keyset pagination of a conversation's history
+        db.Index('ix_message_conversation_id_id', 'conversation_id', 'id'),
+    )
+
+class UsageDaily(db.Model):
+    """Assistant turns, tools and tasks counted per day, kept current by every write"""
+    __tablename__ = 'usage_daily'
+    day = db.Column(db.Date, primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)  # 'turn', 'tool' or 'task'
+    name = db.Column(db.String(1000), primary_key=True)  # '' for turns
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+# Bump whenever a model or index changes, so existing databases go through
+# create_all once more. While the stored version matches, startup skips
+# reflecting the schema altogether.
+SCHEMA_VERSION = 2
+
+class SchemaVersion(db.Model):
+    version = db.Column(db.Integer, primary_key=True)
+
+def schema_is_current():
+    """True when the database was last prepared with this SCHEMA_VERSION"""
+    try:
+        with db.engine.connect() as connection:
+            return connection.execute(db.select(SchemaVersion.version)).scalar() == SCHEMA_VERSION
+    except DBAPIError:
+        # No marker table yet
+        return False
+
+def prepare_database():
+    """Create missing tables and indexes unless the version marker says they exist"""
+    if schema_is_current():
+        return
+    new_usage = not inspect(db.engine).has_table(UsageDaily.__tablename__)
     db.create_all()
+    if new_usage:
+        backfill_usage(db.session, UsageDaily.__table__, Message.__table__)
+    # create_all skips indexes of tables that already exist
+    for index in Message.__table__.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+    with db.engine.begin() as connection:
+        connection.execute(SchemaVersion.__table__.delete())
+        connection.execute(SchemaVersion.__table__.insert().values(version=SCHEMA_VERSION))
+
+# With FAST_STARTUP=1 the worker does not connect to the database until the
+# first request, which keeps scale-to-zero cold starts short
+app.config['FAST_STARTUP'] = os.environ.get('FAST_STARTUP', '0') == '1'
+schema_lock = threading.Lock()
+schema_prepared = False
+
+if not app.config['FAST_STARTUP']:
+    with app.app_context():
+        prepare_database()
+    schema_prepared = True
+
+@app.before_request
+def prepare_database_once():
+    global schema_prepared
+    if schema_prepared:
+        return
+    with schema_lock:
+        if not schema_prepared:
+            prepare_database()
+            schema_prepared = True
+
+init_metrics(app, db)
+
+tool_executor = None
+if app.config['TOOL_EXECUTION']:
+    tool_executor = ToolExecutor(
+        stub_registry(app.config['TOOL_STUB_LATENCY_SCALE']),
+        max_workers=app.config['TOOL_WORKERS'],
+        default_timeout=app.config['TOOL_TIMEOUT']
+    )
+
+idempotency = None
+if app.config['IDEMPOTENCY_MAX_KEYS']:
+    idempotency = IdempotencyGuard(
+        MemoryIdempotencyStore(app.config['IDEMPOTENCY_MAX_KEYS'], app.config['IDEMPOTENCY_MAX_BYTES']),
+        ttl=app.config['IDEMPOTENCY_TTL'],
+        wait_timeout=app.config['IDEMPOTENCY_WAIT_TIMEOUT']
+    )
+
+def idempotent(view):
+    """Honour the Idempotency-Key header on a view, per client IP address (see TRUSTED_PROXY_HOPS)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if idempotency is None:
+            return view(*args, **kwargs)
+        # Sessions are named in the body, which the key's fingerprint covers
+        return idempotency.call(view, args, kwargs, scope=request.remote_addr)
+    return wrapper
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Days /api/analytics/usage reports when no start is given
+USAGE_WINDOW_DAYS = 30
 
 # Routes
 @app.route('/api/status', methods=['GET'])
@@ -48,6 +181,7 @@ def status():
     })
 
 @app.route('/api/chat', methods=['POST'])
+@idempotent
 def chat():
     try:
         data = request.get_json()
@@ -73,44 +207,186 @@ def chat():
         db.session.add(user_msg)
         
         # Generate AI response based on user input
-        response_content = generate_response(user_message)
-        task = determine_task(user_message)
-        tools = determine_tools(user_message)
+        intent = classify_message(user_message)
+        response_content = intent['content']
+        task = intent['task']
+        tools = intent['tools']
+        tool_results = tool_executor.run(tools, user_message) if tool_executor else None
         
         # Save assistant response
+        now = datetime.utcnow()
         assistant_msg = Message(
             conversation_id=conversation.id,
             role='assistant',
             content=response_content,
+            timestamp=now,
             tools_used=json.dumps(tools) if tools else None
         )
         db.session.add(assistant_msg)
         
         # Update conversation timestamp
-        conversation.updated_at = datetime.utcnow()
+        conversation.updated_at = now
+        # Every turn of the day upserts the same usage rows: flush everything
+        # else first, so their locks are held only until the commit
+        record_usage(db.session, UsageDaily.__table__, count_usage([(now.date(), task, tools)]))
         db.session.commit()
         
-        return jsonify({
+        result = {
             'response': response_content,
             'task': task,
             'tools': tools,
             'conversation_id': conversation.id,
             'message_id': assistant_msg.id
-        })
+        }
+        if tool_results is not None:
+            result['tool_results'] = tool_results
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/chat/batch', methods=['POST'])
+@idempotent
+def chat_batch():
+    """Answer many messages in one request and persist them in one transaction.
+    
+    Items are a message string or ``{"message", "session_id"}``, the session
+    defaulting to the batch's ``session_id``. Invalid items are reported in
+    their result and skipped (207); the rest are written together.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('messages')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'messages must be a non-empty array'}), 400
+        
+        max_items = app.config['CHAT_BATCH_MAX_ITEMS']
+        if len(items) > max_items:
+            return jsonify({'error': f'A batch can hold at most {max_items} messages', 'max_items': max_items}), 413
+        
+        default_session_id = data.get('session_id', 'default')
+        results = [None] * len(items)
+        accepted = []
+        for index, item in enumerate(items):
+            if isinstance(item, str):
+                item = {'message': item}
+            if not isinstance(item, dict) or not isinstance(item.get('message'), str) or not item['message']:
+                results[index] = {'index': index, 'error': 'Message is required'}
+                continue
+            accepted.append((index, item['message'], str(item.get('session_id', default_session_id))))
+        
+        if accepted:
+            # Find or create every session's conversation up front
+            session_ids = {session_id for _, _, session_id in accepted}
+            conversations = {}
+            for conversation in Conversation.query.filter(Conversation.session_id.in_(session_ids)).order_by(Conversation.id.desc()):
+                conversations[conversation.session_id] = conversation
+            new_conversations = [Conversation(session_id=session_id) for session_id in session_ids - conversations.keys()]
+            db.session.add_all(new_conversations)
+            db.session.flush()
+            conversations.update((conversation.session_id, conversation) for conversation in new_conversations)
+            
+            intents = classify_messages([user_message for _, user_message, _ in accepted])
+            if tool_executor:
+                # Every message's tools are submitted before any is waited for
+                tool_runs = [tool_executor.start(intent['tools'], user_message) for (_, user_message, _), intent in zip(accepted, intents)]
+                for intent, tool_run in zip(intents, tool_runs):
+                    intent['tool_results'] = tool_run.collect()
+            now = datetime.utcnow()
+            staged = []
+            for (index, user_message, session_id), intent in zip(accepted, intents):
+                conversation = conversations[session_id]
+                assistant_msg = Message(
+                    conversation_id=conversation.id,
+                    role='assistant',
+                    content=intent['content'],
+                    timestamp=now,
+                    tools_used=json.dumps(intent['tools']) if intent['tools'] else None
+                )
+                db.session.add_all([
+                    Message(conversation_id=conversation.id, role='user', content=user_message),
+                    assistant_msg
+                ])
+                staged.append((index, conversation, intent, assistant_msg))
+            
+            for conversation in conversations.values():
+                conversation.updated_at = now
+            record_usage(db.session, UsageDaily.__table__, count_usage(
+                (now.date(), intent['task'], intent['tools']) for intent in intents
+            ))
+            db.session.commit()
+            
+            for index, conversation, intent, assistant_msg in staged:
+                results[index] = {
+                    'index': index,
+                    'response': intent['content'],
+                    'task': intent['task'],
+                    'tools': intent['tools'],
+                    'conversation_id': conversation.id,
+                    'message_id': assistant_msg.id
+                }
+                if 'tool_results' in intent:
+                    results[index]['tool_results'] = intent['tool_results']
+        
+        failed = len(items) - len(accepted)
+        return jsonify({'results': results, 'succeeded': len(accepted), 'failed': failed}), 207 if failed else 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def page_args():
+    """Read the before/after/limit cursor arguments, raising ValueError if invalid"""
+    before = request.args.get('before')
+    after = request.args.get('after')
+    try:
+        before = int(before) if before is not None else None
+        after = int(after) if after is not None else None
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('before, after and limit must be integers')
+    if before is not None and after is not None:
+        raise ValueError('Use either before or after, not both')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return before, after, min(limit, MAX_PAGE_SIZE)
+
+def message_page(conversation_id, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Fetch a page of messages oldest first; the most recent ones without a cursor"""
+    query = Message.query.filter_by(conversation_id=conversation_id)
+    if after is not None:
+        messages = query.filter(Message.id > after).order_by(Message.id.asc()).limit(limit + 1).all()
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+    else:
+        if before is not None:
+            query = query.filter(Message.id < before)
+        messages = query.order_by(Message.id.desc()).limit(limit + 1).all()
+        has_more = len(messages) > limit
+        messages = messages[:limit][::-1]
+    
+    return messages, {
+        'limit': limit,
+        'has_more': has_more,
+        'before': messages[0].id if messages else before,
+        'after': messages[-1].id if messages else after
+    }
+
 @app.route('/api/conversations', methods=['GET'])
 def get_conversations():
     try:
+        try:
+            before, after, limit = page_args()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         session_id = request.args.get('session_id', 'default')
         conversation = Conversation.query.filter_by(session_id=session_id).first()
         
         if not conversation:
             return jsonify({'messages': []})
         
-        messages = Message.query.filter_by(conversation_id=conversation.id).order_by(Message.timestamp).all()
+        messages, page = message_page(conversation.id, before=before, after=after, limit=limit)
         
         message_list = []
         for msg in messages:
@@ -125,63 +401,89 @@ def get_conversations():
         
         return jsonify({
             'conversation_id': conversation.id,
-            'messages': message_list
+            'messages': message_list,
+            'page': page
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def generate_response(user_message):
-    """Generate AI response based on user input"""
-    message_lower = user_message.lower()
-    
-    if any(word in message_lower for word in ['wordpress', 'theme', 'website', 'site']):
-        return "I understand your request! I'm a versatile AI agent that can help with web browsing, coding, file editing, data analysis, image generation, and much more. Let me work on this task for you."
+def admin_token_error():
+    """Return an error response unless the request carries the admin token"""
+    token = app.config.get('ADMIN_TOKEN')
+    if not token:
+        return jsonify({'error': 'Data transfer is disabled, set ADMIN_TOKEN to enable it'}), 403
     
-    elif any(word in message_lower for word in ['code', 'programming', 'develop']):
-        return "I'll help you create a website! Let me start by understanding your requirements and then build the HTML, CSS, and any necessary JavaScript. I can create responsive designs, add interactive features, and ensure your site looks professional."
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return jsonify({'error': 'Invalid admin token'}), 401
+    return None
+
+@app.route('/api/export', methods=['GET'])
+def export_data():
+    """Stream every conversation and message as NDJSON"""
+    error = admin_token_error()
+    if error:
+        return error
     
-    elif any(word in message_lower for word in ['data', 'analysis', 'chart', 'graph']):
-        return "I can help you analyze data and create visualizations! I'll process your data, identify patterns, and create insightful charts and graphs to help you understand your information better."
+    records = export_ndjson(db.session, Conversation.__table__, Message.__table__)
+    return Response(stream_with_context(records), mimetype='application/x-ndjson', headers={
+        'Content-Disposition': 'attachment; filename=openmanus-export.ndjson'
+    })
+
+@app.route('/api/import', methods=['POST'])
+def import_data():
+    """Bulk-load conversations and messages from an NDJSON export"""
+    error = admin_token_error()
+    if error:
+        return error
     
-    elif any(word in message_lower for word in ['image', 'picture', 'photo', 'generate']):
-        return "I can generate and edit images for you! Whether you need original artwork, photo editing, or visual content creation, I'll help you create exactly what you're looking for."
+    importer = NDJSONImporter(db.session, Conversation.__table__, Message.__table__, UsageDaily.__table__)
+    try:
+        importer.feed(io.TextIOWrapper(request.stream, encoding='utf-8'))
+    except Exception as e:
+        db.session.rollback()
+        # Chunks committed before the failure stay in the database
+        return jsonify({
+            'error': f'Import failed at line {importer.line}, the chunks in committed_chunks were kept',
+            'details': str(e),
+            'committed_chunks': importer.committed_chunks,
+            **importer.to_dict()
+        }), 500
     
-    else:
-        return "I understand your request! I'm a versatile AI agent that can help with web browsing, coding, file editing, data analysis, image generation, and much more. Let me work on this task for you."
+    return jsonify(importer.to_dict()), 200 if not importer.error_count else 207
+
+@app.route('/api/analytics/usage', methods=['GET'])
+def analytics_usage():
+    """Assistant turns, tool use and tasks per day, week or month, from the usage_daily rollup"""
+    try:
+        interval = request.args.get('interval', 'day')
+        try:
+            end = date.fromisoformat(request.args['end']) if 'end' in request.args else datetime.utcnow().date()
+            start = date.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=USAGE_WINDOW_DAYS - 1)
+        except ValueError:
+            return jsonify({'error': 'start and end must be dates (YYYY-MM-DD)'}), 400
+        if start > end:
+            return jsonify({'error': 'start must not be after end'}), 400
+        if interval not in INTERVALS:
+            return jsonify({'error': f"interval must be one of {', '.join(INTERVALS)}"}), 400
+        
+        return jsonify(usage_report(db.session, UsageDaily.__table__, start, end, interval))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def generate_response(user_message):
+    """Generate AI response based on user input"""
+    return classify_message(user_message)['content']
 
 def determine_task(user_message):
     """Determine the main task based on user input"""
-    message_lower = user_message.lower()
-    
-    if any(word in message_lower for word in ['wordpress', 'theme', 'website', 'site']):
-        return "Website development and design"
-    elif any(word in message_lower for word in ['code', 'programming', 'develop']):
-        return "Code development and programming"
-    elif any(word in message_lower for word in ['data', 'analysis', 'chart']):
-        return "Data analysis and visualization"
-    elif any(word in message_lower for word in ['image', 'picture', 'photo']):
-        return "Image generation and editing"
-    else:
-        return "Processing your request using available tools"
+    return classify_message(user_message)['task']
 
 def determine_tools(user_message):
     """Determine which tools to use based on user input"""
-    message_lower = user_message.lower()
-    tools = []
-    
-    if any(word in message_lower for word in ['website', 'site', 'web', 'html', 'css']):
-        tools.extend(['code', 'file', 'browser'])
-    elif any(word in message_lower for word in ['code', 'programming', 'script']):
-        tools.extend(['code', 'file', 'terminal'])
-    elif any(word in message_lower for word in ['data', 'analysis', 'chart']):
-        tools.extend(['code', 'database', 'file'])
-    elif any(word in message_lower for word in ['image', 'picture', 'photo']):
-        tools.extend(['image', 'file'])
-    else:
-        tools.extend(['terminal', 'code', 'file'])
-    
-    return tools
+    return classify_message(user_message)['tools']
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,46 @@
+from openmanus_common.intent import IntentClassifier
+
+GENERAL_RESPONSE = "I understand your request! I'm a versatile AI agent that can help with web browsing, coding, file editing, data analysis, image generation, and much more. Let me work on this task for you."
+
+# Each table is ordered; the first rule with a keyword in the message wins.
+RESPONSE_RULES = [
+    (['wordpress', 'theme', 'website', 'site'], GENERAL_RESPONSE),
+    (['code', 'programming', 'develop'], "I'll help you create a website! Let me start by understanding your requirements and then build the HTML, CSS, and any necessary JavaScript. I can create responsive designs, add interactive features, and ensure your site looks professional."),
+    (['data', 'analysis', 'chart', 'graph'], "I can help you analyze data and create visualizations! I'll process your data, identify patterns, and create insightful charts and graphs to help you understand your information better."),
+    (['image', 'picture', 'photo', 'generate'], "I can generate and edit images for you! Whether you need original artwork, photo editing, or visual content creation, I'll help you create exactly what you're looking for."),
+]
+
+TASK_RULES = [
+    (['wordpress', 'theme', 'website', 'site'], "Website development and design"),
+    (['code', 'programming', 'develop'], "Code development and programming"),
+    (['data', 'analysis', 'chart'], "Data analysis and visualization"),
+    (['image', 'picture', 'photo'], "Image generation and editing"),
+]
+
+TOOL_RULES = [
+    (['website', 'site', 'web', 'html', 'css'], ('code', 'file', 'browser')),
+    (['code', 'programming', 'script'], ('code', 'file', 'terminal')),
+    (['data', 'analysis', 'chart'], ('code', 'database', 'file')),
+    (['image', 'picture', 'photo'], ('image', 'file')),
+]
+
+classifier = IntentClassifier({
+    'content': (RESPONSE_RULES, GENERAL_RESPONSE),
+    'task': (TASK_RULES, "Processing your request using available tools"),
+    'tools': (TOOL_RULES, ('terminal', 'code', 'file')),
+})
+
+
+def classify_message(user_message):
+    """Return the response content, task and tools for a user message"""
+    result = classifier.classify(user_message)
+    result['tools'] = list(result['tools'])
+    return result
+
+
+def classify_messages(user_messages):
+    """``classify_message`` for a batch of user messages"""
+    results = classifier.classify_many(user_messages)
+    for result in results:
+        result['tools'] = list(result['tools'])
+    return results
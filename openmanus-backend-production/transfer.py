@@ -0,0 +1,64 @@
+"""This backend's side of the NDJSON export and import (openmanus_common.transfer).
+
+Its schema has no column for a conversation's title or a message's task and
+processing_time, so they are exported as null and ignored on import;
+imported tasks are still counted in the usage rollup.
+"""
+import json
+
+from sqlalchemy import select
+
+from openmanus_common import transfer
+from openmanus_common.transfer import EXPORT_CHUNK_SIZE, isoformat
+
+
+def export_records(session, conversations, messages):
+    """Yield every conversation and message as export records, streaming from the database"""
+    rows = session.execute(
+        select(conversations).order_by(conversations.c.id).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    for row in rows:
+        yield {
+            'type': 'conversation',
+            'id': row.id,
+            'session_id': row.session_id,
+            'title': None,
+            'created_at': isoformat(row.created_at),
+            'updated_at': isoformat(row.updated_at)
+        }
+
+    rows = session.execute(
+        select(messages)
+        .order_by(messages.c.conversation_id, messages.c.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    for row in rows:
+        yield {
+            'type': 'message',
+            'id': row.id,
+            'conversation_id': row.conversation_id,
+            'role': row.role,
+            'content': row.content,
+            'timestamp': isoformat(row.timestamp),
+            'task': None,
+            'tools': json.loads(row.tools_used) if row.tools_used else [],
+            'processing_time': None
+        }
+
+
+def export_ndjson(session, conversations, messages):
+    """Yield the export as NDJSON text, a chunk of lines at a time"""
+    return transfer.export_ndjson(export_records(session, conversations, messages))
+
+
+class NDJSONImporter(transfer.NDJSONImporter):
+    """Imports into this backend's tables, tools kept as JSON text"""
+
+    def message_row(self, message):
+        return {
+            'conversation_id': message['conversation_id'],
+            'role': message['role'],
+            'content': message['content'],
+            'timestamp': message['timestamp'],
+            'tools_used': json.dumps(message['tools']) if message['tools'] else None
+        }
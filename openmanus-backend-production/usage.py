@@ -0,0 +1,31 @@
+"""Backfill of the daily usage rollup (openmanus_common.usage) from this backend's messages."""
+import json
+
+from sqlalchemy import select
+
+from openmanus_common.usage import count_usage, record_usage
+
+# Messages read per round trip while backfilling
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def backfill_usage(session, usage, messages):
+    """Count turns and tools of the existing assistant messages into an empty usage table.
+
+    Messages do not store their task, so tasks are only counted from here on.
+    """
+    last_id = 0
+    while True:
+        rows = session.execute(
+            select(messages.c.id, messages.c.timestamp, messages.c.tools_used)
+            .where(messages.c.id > last_id, messages.c.role == 'assistant')
+            .order_by(messages.c.id).limit(BACKFILL_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        record_usage(session, usage, count_usage(
+            (timestamp.date(), None, json.loads(tools_used) if tools_used else None)
+            for _, timestamp, tools_used in rows if timestamp is not None
+        ))
+        session.commit()
+        last_id = rows[-1][0]
@@ -0,0 +1,6 @@
+"""Modules shared by both OpenManus backends.
+
+Nothing here imports either backend: modules take the session, tables or
+Flask-SQLAlchemy object they work on as arguments, and each backend keeps
+its own config and ``init_*`` wiring where the two differ.
+"""
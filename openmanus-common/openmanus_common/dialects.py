@@ -0,0 +1,13 @@
+"""``INSERT ... ON CONFLICT`` for the databases that have it."""
+import importlib
+
+# Imported on first use: loading the PostgreSQL dialect alone adds tens of
+# milliseconds to every cold start on SQLite
+UPSERT_DIALECTS = {'sqlite': 'sqlalchemy.dialects.sqlite', 'postgresql': 'sqlalchemy.dialects.postgresql'}
+
+
+def upsert_insert(dialect_name):
+    """The ``insert`` of a dialect, whose statements have ``on_conflict_do_update``"""
+    if dialect_name not in UPSERT_DIALECTS:
+        raise ValueError(f"No INSERT ... ON CONFLICT for {dialect_name} (supported: {', '.join(UPSERT_DIALECTS)})")
+    return importlib.import_module(UPSERT_DIALECTS[dialect_name]).insert
@@ -0,0 +1,252 @@
+"""Idempotency-Key handling for the chat endpoints.
+
+Used by both backends: the first request with a key runs, retries with the
+same key and body get its stored response back, retries arriving while it
+still runs wait for it, and reusing a key with a different body is rejected.
+Each backend decides the scope of a key and wraps its views.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, current_app, jsonify, request, session
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+# Longest Idempotency-Key accepted (a UUID is 36)
+MAX_KEY_LENGTH = 255
+
+# Headers not worth keeping for a replay: recomputed when it is sent
+UNSTORED_HEADERS = {'content-length', 'set-cookie'}
+
+
+class StoredResponse:
+    """What a replay sends back: status, headers and the complete body"""
+
+    def __init__(self, status, headers, body, session_id=None):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.session_id = session_id
+
+    @property
+    def size(self):
+        return len(self.body)
+
+
+class IdempotencyRecord:
+    """One key: the fingerprint of the request that claimed it and, once done, its response"""
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.response = None
+        self.expires_at = None
+        self.done = threading.Event()
+
+
+class MemoryIdempotencyStore:
+    """Idempotency records kept in this process, bounded by count and size.
+
+    Completed records expire after their TTL and the least recently used go
+    first when a bound is reached; records still in flight are never
+    evicted. A store shared by all workers can be used instead (the project
+    backend's ``IDEMPOTENCY_STORE``); it needs the same ``reserve``,
+    ``wait``, ``complete`` and ``release`` methods.
+    """
+
+    def __init__(self, max_entries=10000, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._in_flight = {}
+        self._records = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def reserve(self, key, fingerprint):
+        """Claim ``key``: None when the caller now owns it, otherwise the record already there"""
+        with self._lock:
+            record = self._in_flight.get(key)
+            if record is not None:
+                return record
+            record = self._records.get(key)
+            if record is not None:
+                if record.expires_at >= time.monotonic():
+                    self._records.move_to_end(key)
+                    return record
+                self._remove(key)
+                self.expirations += 1
+            self._in_flight[key] = IdempotencyRecord(fingerprint)
+            return None
+
+    def wait(self, record, timeout):
+        """Wait for an in-flight record to complete or be released; False on timeout"""
+        return record.done.wait(timeout)
+
+    def complete(self, key, response, ttl):
+        """Keep the owner's response for ``ttl`` seconds and wake everyone waiting on it"""
+        with self._lock:
+            record = self._in_flight.pop(key, None)
+            if record is None:
+                return
+            record.response = response
+            record.expires_at = time.monotonic() + ttl
+            # Waiters get the response either way; a body too large is just not kept
+            if response.size <= self.max_bytes:
+                self._records[key] = record
+                self._bytes += response.size
+                while len(self._records) > self.max_entries or self._bytes > self.max_bytes:
+                    self._remove(next(iter(self._records)))
+                    self.evictions += 1
+        record.done.set()
+
+    def release(self, key):
+        """Give up ``key`` without a response, so the next request with it runs again"""
+        with self._lock:
+            record = self._in_flight.pop(key, None)
+        if record is not None:
+            record.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._records),
+                'in_flight': len(self._in_flight),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def _remove(self, key):
+        record = self._records.pop(key)
+        self._bytes -= record.response.size
+
+
+def request_fingerprint():
+    """Hash of the request body, to tell a retry from a different request reusing its key"""
+    return hashlib.sha256(request.get_data(cache=True)).hexdigest()
+
+
+def _storable(response):
+    # Server errors and shed or rate-limited requests are worth retrying for real
+    return response.status_code < 500 and response.status_code != 429
+
+
+class IdempotencyGuard:
+    """Runs each Idempotency-Key once and replays its response to retries.
+
+    A retry that arrives while the original is still running waits for it
+    (at most ``wait_timeout`` seconds, then 409 with Retry-After) instead of
+    doing the work again. Reusing a key with a different body is answered
+    422. Server errors release the key so a retry runs again. Streamed
+    responses are recorded as they are sent and kept only when the stream
+    ran to the end.
+    """
+
+    def __init__(self, store, ttl=86400, wait_timeout=30):
+        self.store = store
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._counters = {'executed': 0, 'replayed': 0, 'joined': 0, 'conflicts': 0, 'timeouts': 0}
+
+    def call(self, view, args, kwargs, scope):
+        """Run ``view`` for the current request, once per key within ``scope``"""
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters'}), 400
+
+        # The same key on another endpoint or from another client is another request
+        store_key = f'{scope}|{request.path}|{key}'
+        fingerprint = request_fingerprint()
+        deadline = time.monotonic() + self.wait_timeout
+        joined = False
+        while True:
+            record = self.store.reserve(store_key, fingerprint)
+            if record is None:
+                break
+            if record.fingerprint != fingerprint:
+                self._count('conflicts')
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used with a different request'}), 422
+            if record.response is None:
+                if not joined:
+                    joined = True
+                    self._count('joined')
+                if not self.store.wait(record, max(0, deadline - time.monotonic())):
+                    self._count('timeouts')
+                    response = jsonify({'error': f'A request with this {IDEMPOTENCY_HEADER} is still in progress'})
+                    response.headers['Retry-After'] = '1'
+                    return response, 409
+                if record.response is None:
+                    # The original failed and let the key go: run it here instead
+                    continue
+            self._count('replayed')
+            return self._replay(record.response)
+
+        self._count('executed')
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            self.store.release(store_key)
+            raise
+        # Read now: a stream finishes after the request context is gone
+        session_id = session.get('session_id')
+        if not _storable(response):
+            self.store.release(store_key)
+        elif response.is_streamed:
+            response.response = self._record_stream(store_key, response, session_id)
+        else:
+            self.store.complete(store_key, self._stored(response, response.get_data(), session_id), self.ttl)
+        return response
+
+    def stats(self):
+        with self._lock:
+            stats = {'ttl': self.ttl, 'wait_timeout': self.wait_timeout, **self._counters}
+        if hasattr(self.store, 'stats'):
+            stats.update(self.store.stats())
+        return stats
+
+    def _stored(self, response, body, session_id):
+        headers = [(name, value) for name, value in response.headers if name.lower() not in UNSTORED_HEADERS]
+        return StoredResponse(response.status_code, headers, body, session_id)
+
+    def _record_stream(self, store_key, response, session_id):
+        iterable = response.response
+
+        def generate():
+            chunks = []
+            finished = False
+            try:
+                for chunk in iterable:
+                    chunks.append(chunk.encode() if isinstance(chunk, str) else chunk)
+                    yield chunk
+                finished = True
+            finally:
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+                if finished:
+                    self.store.complete(store_key, self._stored(response, b''.join(chunks), session_id), self.ttl)
+                else:
+                    # The client went away mid-stream, so the turn was not saved
+                    self.store.release(store_key)
+
+        return generate()
+
+    def _replay(self, stored):
+        # A retry whose first attempt never got its session cookie back picks it up here
+        if stored.session_id is not None and 'session_id' not in session:
+            session['session_id'] = stored.session_id
+        response = Response(stored.body, status=stored.status, headers=stored.headers)
+        response.headers[REPLAYED_HEADER] = 'true'
+        return response
+
+    def _count(self, key):
+        with self._lock:
+            self._counters[key] += 1
@@ -0,0 +1,117 @@
+"""First-match keyword tables resolved with one compiled regex.
+
+Used by both backends to pick the response, task and tools for a chat
+message. The message is lowercased once and scanned once for every keyword
+of every table, so long messages (pasted code, documents) cost one pass
+instead of one ``in`` per keyword and rule.
+"""
+import re
+
+
+def _trie_pattern(keywords):
+    """One regex for ``keywords`` with shared prefixes factored out.
+
+    ``web(?:site)?`` instead of ``website|web``: each position of the text
+    is tried against one branch per first character, and the greedy
+    optional suffix makes every match the longest keyword starting there.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node):
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return '(?:' + body + ')?'
+        return body
+
+    return render(trie)
+
+
+class IntentClassifier:
+    """Resolves several first-match keyword tables from one scan of a message.
+
+    ``tables`` maps a field name to ``(rules, default)`` where ``rules`` is an
+    ordered list of ``(keywords, value)`` pairs. For every field the value of
+    the first rule with a keyword present in the message wins, exactly like a
+    chain of ``if any(word in message for word in keywords)`` branches.
+
+    Every keyword is compiled into one alternation, longest match first, and
+    each keyword maps to the best rule priority it gives per field. A keyword
+    found in the message also counts for the keywords inside it (``website``
+    holds ``web`` and ``site``), and the scan resumes one character after each
+    match so overlapping keywords are found too. After a match the scan only
+    looks for keywords that can still beat a field's best rule, and it stops
+    once every field has its first rule.
+    """
+
+    def __init__(self, tables):
+        self.tables = {
+            field: ([value for _, value in rules], default)
+            for field, (rules, default) in tables.items()
+        }
+        rule_keywords = [
+            [set(keywords) for keywords, _ in rules]
+            for rules, _ in tables.values()
+        ]
+        keywords = sorted({keyword for rules in rule_keywords for keywords in rules for keyword in keywords},
+                          key=lambda keyword: (-len(keyword), keyword))
+        # Per field, the index of the first rule the keyword (or one inside it)
+        # matches; len(rules) when it matches none
+        self.priorities = {}
+        for keyword in keywords:
+            contained = {other for other in keywords if other in keyword}
+            self.priorities[keyword] = tuple(
+                next((index for index, rule in enumerate(rules) if rule & contained), len(rules))
+                for rules in rule_keywords
+            )
+        self.unmatched = tuple(len(rules) for rules in rule_keywords)
+        # The pattern for each combination of best priorities seen so far
+        self._patterns = {}
+
+    def _pattern(self, best):
+        """The compiled keywords that would improve ``best``, None when none can"""
+        try:
+            return self._patterns[best]
+        except KeyError:
+            pass
+        keywords = [
+            keyword for keyword, priorities in self.priorities.items()
+            if any(priority < current for priority, current in zip(priorities, best))
+        ]
+        self._patterns[best] = pattern = re.compile(_trie_pattern(keywords)) if keywords else None
+        return pattern
+
+    def classify(self, message):
+        return self._first_matches(message.lower())
+
+    def classify_many(self, messages):
+        """``classify`` for a batch of messages; repeated messages are classified once"""
+        texts = [message.lower() for message in messages]
+        results = {text: self._first_matches(text) for text in dict.fromkeys(texts)}
+        return [dict(results[text]) for text in texts]
+
+    def _first_matches(self, text):
+        best = self.unmatched
+        pattern = self._pattern(best)
+        position = 0
+        while pattern is not None:
+            match = pattern.search(text, position)
+            if match is None:
+                break
+            improved = tuple(map(min, best, self.priorities[match.group()]))
+            if improved != best:
+                best = improved
+                pattern = self._pattern(best)
+            position = match.start() + 1
+
+        result = {}
+        for (field, (values, default)), priority in zip(self.tables.items(), best):
+            result[field] = values[priority] if priority < len(values) else default
+        return result
@@ -0,0 +1,203 @@
+"""Per-route request metrics served at /api/metrics in Prometheus text format.
+
+Used by both backends: latency, SQL statement count and time, JSON
+serialization time and response size.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+from flask import Response, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+METRIC_PREFIX = 'openmanus'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name, help text, buckets
+HISTOGRAMS = (
+    ('http_request_duration_seconds', 'Time from the start of the request to the response being built', LATENCY_BUCKETS),
+    ('http_request_sql_queries', 'SQL statements executed while handling the request', QUERY_COUNT_BUCKETS),
+    ('http_request_sql_duration_seconds', 'Time spent executing SQL while handling the request', LATENCY_BUCKETS),
+    ('http_response_json_seconds', 'Time spent serializing JSON for the response', LATENCY_BUCKETS),
+    ('http_response_size_bytes', 'Response body size, when the response declares a Content-Length', SIZE_BUCKETS),
+)
+
+# Statements listed in a slow-request log line
+SLOW_LOG_TOP_QUERIES = 5
+
+_current_request = ContextVar('metrics_request', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    """What one request spent its time on; SQL from other threads is not included"""
+
+    def __init__(self, keep_queries=False):
+        self.started = time.perf_counter()
+        self.sql_queries = 0
+        self.sql_time = 0.0
+        self.json_time = 0.0
+        # statement -> [count, seconds], only collected for the slow-request log
+        self.queries = defaultdict(lambda: [0, 0.0]) if keep_queries else None
+
+
+class MetricsRegistry:
+    """Per-route histograms and request counters, rendered in Prometheus text format"""
+
+    def __init__(self, prefix=METRIC_PREFIX):
+        self.prefix = prefix
+        self.histograms = {}
+        self.requests = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, route, method, status, stats, duration, size):
+        values = (duration, stats.sql_queries, stats.sql_time, stats.json_time, size)
+        with self._lock:
+            self.requests[(route, method, status)] += 1
+            histograms = self.histograms.get((route, method))
+            if histograms is None:
+                histograms = self.histograms[(route, method)] = [Histogram(buckets) for _, _, buckets in HISTOGRAMS]
+            for histogram, value in zip(histograms, values):
+                if value is not None:
+                    histogram.observe(value)
+
+    def render(self):
+        lines = [
+            f'# HELP {self.prefix}_http_requests_total Requests handled, by route, method and status',
+            f'# TYPE {self.prefix}_http_requests_total counter',
+        ]
+        with self._lock:
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f'{self.prefix}_http_requests_total{_labels(route, method, status=status)} {count}')
+
+            for index, (name, help_text, _) in enumerate(HISTOGRAMS):
+                metric = f'{self.prefix}_{name}'
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} histogram')
+                for (route, method), histograms in sorted(self.histograms.items()):
+                    histogram = histograms[index]
+                    if not histogram.count:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{metric}_bucket{_labels(route, method, le=bound)} {cumulative}')
+                    lines.append(f'{metric}_sum{_labels(route, method)} {histogram.sum}')
+                    lines.append(f'{metric}_count{_labels(route, method)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(route, method, **extra):
+    labels = {'route': route, 'method': method, **extra}
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """The default JSON provider, charging serialization time to the current request"""
+
+    def dumps(self, obj, **kwargs):
+        stats = _current_request.get()
+        if stats is None:
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            stats.json_time += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_request.get()
+    started = getattr(context, '_metrics_started', None)
+    if stats is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats.sql_queries += 1
+    stats.sql_time += elapsed
+    if stats.queries is not None:
+        entry = stats.queries[statement]
+        entry[0] += 1
+        entry[1] += elapsed
+
+
+def init_metrics(app, db):
+    """Instrument every request and serve the results at /api/metrics.
+
+    ``db`` is the app's Flask-SQLAlchemy object, whose engine is timed.
+    ``METRICS_SLOW_REQUEST_MS`` logs requests slower than that with the SQL
+    statements they spent the most time in; 0 turns the log off.
+    """
+    app.config.setdefault('METRICS_ENABLED', os.environ.get('METRICS_ENABLED', '1') != '0')
+    app.config.setdefault('METRICS_SLOW_REQUEST_MS', float(os.environ.get('METRICS_SLOW_REQUEST_MS', 0)))
+
+    if not app.config['METRICS_ENABLED']:
+        return None
+
+    registry = MetricsRegistry()
+    slow_request_seconds = app.config['METRICS_SLOW_REQUEST_MS'] / 1000
+    app.extensions['metrics'] = registry
+    app.json = TimedJSONProvider(app)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_request_metrics():
+        _current_request.set(RequestStats(keep_queries=bool(slow_request_seconds)))
+
+    @app.after_request
+    def record_request_metrics(response):
+        stats = _current_request.get()
+        if stats is None:
+            return response
+        _current_request.set(None)
+        duration = time.perf_counter() - stats.started
+        current = request._get_current_object()
+        route = current.url_rule.rule if current.url_rule else 'unmatched'
+        registry.record(route, current.method, response.status_code, stats, duration, response.content_length)
+
+        if slow_request_seconds and duration >= slow_request_seconds:
+            top = sorted(stats.queries.items(), key=lambda item: item[1][1], reverse=True)[:SLOW_LOG_TOP_QUERIES]
+            app.logger.warning(
+                'Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms, JSON %.1f ms%s',
+                current.method, current.path, route, duration * 1000, stats.sql_queries,
+                stats.sql_time * 1000, stats.json_time * 1000,
+                ''.join(f'\n  {count}x {seconds * 1000:.1f} ms  {" ".join(statement.split())[:200]}'
+                        for statement, (count, seconds) in top)
+            )
+        return response
+
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    return registry
@@ -0,0 +1,258 @@
+"""Storage profiles: tuned engine settings for SQLite and PostgreSQL.
+
+Used by both backends. ``sqlite-wal`` turns on WAL with synchronous=NORMAL,
+memory-mapped reads, a busy timeout and a queue that lets this process's
+writers in one at a time; ``postgres-pooled`` sizes the connection pool,
+pings connections before use and caches statements. STORAGE_PROFILE picks one (``auto`` by
+database) and STORAGE_<SETTING> variables override single settings.
+"""
+import importlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from sqlalchemy.engine import make_url
+
+# Engine settings by profile name. Each setting can be overridden with a
+# STORAGE_<SETTING> config value or environment variable
+STORAGE_PROFILES = {
+    # The driver's and SQLAlchemy's own defaults
+    'default': {},
+    'sqlite-wal': {
+        # Readers keep going while a writer commits
+        'journal_mode': 'WAL',
+        # Safe with WAL: a power cut may lose the last commits, never the database
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        # How long a writer waits for another process before "database is locked"
+        'busy_timeout_ms': 5000,
+        # Writers of this process queue for the database one at a time
+        'single_writer': True,
+    },
+    'postgres-pooled': {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
+        # Below the usual idle timeouts of servers and proxies in between
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        # Reuse the most recent connection so the rest can be recycled when idle
+        'pool_use_lifo': True,
+        # Compiled statements SQLAlchemy keeps per engine
+        'statement_cache_size': 1000,
+        # psycopg 3 prepares a statement on the server after this many runs
+        # (0 never does, needed behind PgBouncer in transaction mode)
+        'prepare_threshold': 5,
+    },
+}
+
+# What STORAGE_PROFILE=auto picks for each database
+AUTO_PROFILES = {'sqlite': 'sqlite-wal', 'postgresql': 'postgres-pooled'}
+
+# The only database each profile applies to
+PROFILE_DIALECTS = {'sqlite-wal': 'sqlite', 'postgres-pooled': 'postgresql'}
+
+# Settings passed to create_engine as they are
+POOL_SETTINGS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping', 'pool_use_lifo')
+
+SQLITE_PRAGMAS = (('journal_mode', 'journal_mode'), ('synchronous', 'synchronous'), ('mmap_size', 'mmap_size'))
+
+# Statements that take SQLite's write lock
+WRITE_STATEMENT = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b', re.IGNORECASE)
+
+
+def _parse(value, default):
+    """A STORAGE_* value from the environment, as the type of the profile's default"""
+    if not isinstance(value, str):
+        return value
+    if isinstance(default, bool):
+        return value == '1'
+    if isinstance(default, int):
+        return int(value)
+    return value
+
+
+class SingleWriter:
+    """Queue of this process's SQLite connections waiting to write.
+
+    A connection joins at its first write statement and leaves when its
+    transaction ends. Writers get the database in the order they asked for
+    it, instead of polling in SQLite's busy handler, where a write that
+    started reading first can still fail with "database is locked".
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._mutex = threading.Lock()
+        self._held = False
+        self._waiting = deque()
+        self.writes = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+
+    def acquire(self):
+        with self._mutex:
+            self.writes += 1
+            if not self._held:
+                self._held = True
+                return
+            turn = threading.Event()
+            self._waiting.append(turn)
+            self.waits += 1
+
+        start = time.perf_counter()
+        granted = turn.wait(self.timeout)
+        with self._mutex:
+            self.wait_seconds += time.perf_counter() - start
+            if not granted and turn in self._waiting:
+                self._waiting.remove(turn)
+                self.timeouts += 1
+                raise sqlite3.OperationalError('database is locked')
+
+    def release(self):
+        with self._mutex:
+            if self._waiting:
+                # Handed straight to the next writer
+                self._waiting.popleft().set()
+            else:
+                self._held = False
+
+    def stats(self):
+        with self._mutex:
+            return {
+                'writes': self.writes,
+                'waits': self.waits,
+                'wait_ms': round(self.wait_seconds * 1000, 1),
+                'timeouts': self.timeouts,
+                'waiting': len(self._waiting)
+            }
+
+    def connection_class(self):
+        """A sqlite3.Connection that goes through this queue before writing"""
+        writer = self
+
+        class WriterCursor(sqlite3.Cursor):
+            def execute(self, sql, parameters=()):
+                return self.connection._write(sql, super().execute, sql, parameters)
+
+            def executemany(self, sql, parameters):
+                return self.connection._write(sql, super().executemany, sql, parameters)
+
+        class WriterConnection(sqlite3.Connection):
+            writing = False
+
+            def cursor(self, factory=WriterCursor):
+                return super().cursor(factory)
+
+            def _write(self, sql, execute, *args):
+                if self.writing or not WRITE_STATEMENT.match(sql):
+                    return execute(*args)
+                writer.acquire()
+                self.writing = True
+                try:
+                    return execute(*args)
+                finally:
+                    # DDL and autocommit writes end with the statement
+                    if not self.in_transaction:
+                        self._end_write()
+
+            def _end_write(self):
+                if self.writing:
+                    self.writing = False
+                    writer.release()
+
+            def commit(self):
+                try:
+                    super().commit()
+                finally:
+                    self._end_write()
+
+            def rollback(self):
+                try:
+                    super().rollback()
+                finally:
+                    self._end_write()
+
+            def close(self):
+                try:
+                    super().close()
+                finally:
+                    self._end_write()
+
+        return WriterConnection
+
+
+class Storage:
+    """A storage profile applied to one database URL.
+
+    ``profile`` is a name from STORAGE_PROFILES, ``auto`` for the one
+    matching the database, or the dotted path of a dict of settings.
+    ``lookup(name)`` returns overrides for the STORAGE_<SETTING> names.
+    """
+
+    def __init__(self, uri, profile='auto', lookup=os.environ.get):
+        url = make_url(uri)
+        self.dialect = url.get_backend_name()
+        self.driver = url.get_driver_name()
+        if profile == 'auto':
+            profile = AUTO_PROFILES.get(self.dialect, 'default')
+        if profile in STORAGE_PROFILES:
+            settings = dict(STORAGE_PROFILES[profile])
+        elif '.' in profile:
+            module_name, _, attribute = profile.rpartition('.')
+            settings = dict(getattr(importlib.import_module(module_name), attribute))
+        else:
+            raise ValueError(f"Unknown storage profile {profile!r} (choose from auto, {', '.join(STORAGE_PROFILES)})")
+        expected = PROFILE_DIALECTS.get(profile)
+        if expected and expected != self.dialect:
+            raise ValueError(f'Storage profile {profile} is for {expected} databases, not {self.dialect}')
+
+        for name, default in settings.items():
+            value = lookup(f'STORAGE_{name.upper()}')
+            if value is not None:
+                settings[name] = _parse(value, default)
+        self.profile = profile
+        self.settings = settings
+        self.writer = None
+        if self.dialect == 'sqlite' and settings.get('single_writer'):
+            self.writer = SingleWriter(settings.get('busy_timeout_ms', 5000) / 1000)
+
+    def engine_options(self):
+        """Keyword arguments for create_engine (SQLALCHEMY_ENGINE_OPTIONS)"""
+        settings = self.settings
+        options = {name: settings[name] for name in POOL_SETTINGS if name in settings}
+        connect_args = {}
+        if 'statement_cache_size' in settings:
+            options['query_cache_size'] = settings['statement_cache_size']
+        if 'prepare_threshold' in settings and self.driver == 'psycopg':
+            connect_args['prepare_threshold'] = settings['prepare_threshold'] or None
+
+        if self.dialect == 'sqlite':
+            if 'busy_timeout_ms' in settings:
+                connect_args['timeout'] = settings['busy_timeout_ms'] / 1000
+            if self.writer is not None:
+                connect_args['factory'] = self.writer.connection_class()
+            pragmas = [f'PRAGMA {pragma}={settings[name]}' for name, pragma in SQLITE_PRAGMAS if name in settings]
+            if pragmas:
+                def apply_pragmas(dbapi_connection, connection_record):
+                    cursor = dbapi_connection.cursor()
+                    for pragma in pragmas:
+                        cursor.execute(pragma)
+                    cursor.close()
+                options['pool_events'] = [(apply_pragmas, 'connect')]
+
+        if connect_args:
+            options['connect_args'] = connect_args
+        return options
+
+    def stats(self, engine):
+        stats = {'profile': self.profile, 'dialect': self.dialect, 'settings': self.settings,
+                 'pool': engine.pool.status()}
+        if self.writer is not None:
+            stats['writer'] = self.writer.stats()
+        return stats
+
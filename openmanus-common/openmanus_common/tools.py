@@ -0,0 +1,254 @@
+"""Tool registry and concurrent executor for agent turns.
+
+Used by both backends: every tool of a turn runs at once on a shared pool
+with a timeout, results come back as they complete and a run can be
+cancelled. StubTool stands in for real tools so the pipeline can be
+exercised offline.
+"""
+import random
+from abc import ABC, abstractmethod
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+# Seconds a tool may run before its result is reported as timed out
+DEFAULT_TOOL_TIMEOUT = 10
+
+# Latency range in seconds of the stub standing in for each tool the intent
+# rules name, roughly what the real tool would take
+STUB_LATENCIES = {
+    'code': (0.2, 0.8),
+    'file': (0.02, 0.1),
+    'browser': (0.5, 2.0),
+    'terminal': (0.1, 0.5),
+    'database': (0.05, 0.3),
+    'image': (1.0, 3.0),
+}
+
+
+class ToolCancelled(Exception):
+    """Raised inside a tool once its call has been cancelled or has timed out"""
+
+
+class Tool(ABC):
+    """Something the agent can call for a turn.
+
+    Subclasses set ``name`` and implement ``run``. ``timeout`` overrides the
+    executor's default. Tools with ``pool = 'process'`` run on the process
+    pool when one is configured, so CPU-bound work does not hold the GIL;
+    they must be picklable and do not get a cancellation event.
+    """
+
+    name = None
+    timeout = None
+    pool = 'thread'
+
+    @abstractmethod
+    def run(self, message, cancelled):
+        """Do the work for ``message`` and return a JSON-serializable output.
+
+        ``cancelled`` is a ``threading.Event`` set when the call is cancelled
+        or times out (None on the process pool); long-running tools should
+        wait on it instead of sleeping and raise ``ToolCancelled`` once set.
+        """
+
+
+class StubTool(Tool):
+    """Offline stand-in for a real tool: waits a random latency and returns canned output"""
+
+    def __init__(self, name, latency=(0.1, 0.5), timeout=None, pool='thread', failure_rate=0):
+        self.name = name
+        self.latency = latency
+        self.timeout = timeout
+        self.pool = pool
+        self.failure_rate = failure_rate
+
+    def run(self, message, cancelled):
+        delay = random.uniform(*self.latency)
+        if cancelled is None:
+            time.sleep(delay)
+        elif cancelled.wait(delay):
+            raise ToolCancelled()
+        if random.random() < self.failure_rate:
+            raise RuntimeError(f'{self.name} stub failed')
+        return {'summary': f'{self.name} finished', 'latency': round(delay, 3)}
+
+
+class ToolRegistry:
+    """Tools by name"""
+
+    def __init__(self, tools=()):
+        self._tools = {}
+        for tool in tools:
+            self.register(tool)
+
+    def register(self, tool):
+        self._tools[tool.name] = tool
+        return tool
+
+    def get(self, name):
+        return self._tools.get(name)
+
+    def names(self):
+        return sorted(self._tools)
+
+
+def stub_registry(latency_scale=1.0):
+    """A registry with a StubTool for every tool the intent rules name, latencies scaled"""
+    return ToolRegistry(
+        StubTool(name, latency=(low * latency_scale, high * latency_scale))
+        for name, (low, high) in STUB_LATENCIES.items()
+    )
+
+
+class _Call:
+    def __init__(self, index, name, deadline):
+        self.index = index
+        self.name = name
+        self.deadline = deadline
+        self.cancelled = threading.Event()
+        self.submitted_at = time.perf_counter()
+
+
+def _result(call, status, output=None, error=None):
+    return {'index': call.index, 'tool': call.name, 'status': status, 'output': output, 'error': error,
+            'elapsed': round(time.perf_counter() - call.submitted_at, 4)}
+
+
+class ToolRun:
+    """The tools of one turn, running concurrently.
+
+    Iterate it to get each result as soon as its tool completes, fails or
+    times out; ``cancel`` stops whatever is still running, from any thread.
+    Results are dicts of ``tool``, ``status`` (``succeeded``, ``failed``,
+    ``timed_out`` or ``cancelled``), ``output``, ``error`` and ``elapsed``.
+    """
+
+    def __init__(self, executor):
+        self._executor = executor
+        self._pending = {}
+        self._ready = []
+        # Resolved by cancel(), so a wait for the next result wakes up at once
+        self._cancel_signal = Future()
+        self.results = []
+
+    @property
+    def cancelled(self):
+        return self._cancel_signal.done()
+
+    def cancel(self):
+        if not self._cancel_signal.done():
+            self._cancel_signal.set_result(None)
+            for call in list(self._pending.values()):
+                call.cancelled.set()
+
+    def collect(self):
+        """Wait for every tool and return the results in the order they were asked for"""
+        for _ in self:
+            pass
+        return sorted(self.results, key=lambda result: result['index'])
+
+    def __iter__(self):
+        while self._ready:
+            yield self._record(self._ready.pop(0))
+
+        while self._pending:
+            if self.cancelled:
+                for future, call in list(self._pending.items()):
+                    future.cancel()
+                    yield self._record(self._finish(future, call, 'cancelled'))
+                return
+
+            timeout = max(0, min(call.deadline for call in self._pending.values()) - time.monotonic())
+            done, _ = wait([*self._pending, self._cancel_signal], timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future is not self._cancel_signal:
+                    yield self._record(self._finish(future, self._pending[future]))
+
+            now = time.monotonic()
+            for future, call in list(self._pending.items()):
+                if call.deadline <= now and not future.done():
+                    future.cancel()
+                    call.cancelled.set()
+                    yield self._record(self._finish(future, call, 'timed_out'))
+
+    def _record(self, result):
+        self.results.append(result)
+        self._executor._count(result['status'])
+        return result
+
+    def _finish(self, future, call, status=None):
+        """The result of a call, from its completed future unless a status is forced"""
+        del self._pending[future]
+        if status == 'timed_out':
+            return _result(call, status, error='Tool timed out')
+        if status is not None:
+            return _result(call, status)
+        try:
+            output = future.result()
+        except ToolCancelled:
+            return _result(call, 'cancelled')
+        except Exception as e:
+            return _result(call, 'failed', error=str(e))
+        return _result(call, 'succeeded', output=output)
+
+
+class ToolExecutor:
+    """Runs the tools of agent turns on shared bounded pools.
+
+    Every tool of a turn is independent of the others, so they are all
+    submitted at once; a turn then takes as long as its slowest tool rather
+    than the sum of them, as long as the pool has free workers.
+    """
+
+    def __init__(self, registry, max_workers=16, process_workers=0, default_timeout=DEFAULT_TOOL_TIMEOUT):
+        self.registry = registry
+        self.max_workers = max_workers
+        self.process_workers = process_workers
+        self.default_timeout = default_timeout
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tool')
+        self._processes = None
+        self._lock = threading.Lock()
+        self._counters = {'started': 0, 'succeeded': 0, 'failed': 0, 'timed_out': 0, 'cancelled': 0}
+
+    def start(self, names, message, timeout=None):
+        """Submit every named tool for ``message`` and return the ToolRun to read results from"""
+        run = ToolRun(self)
+        for index, name in enumerate(names):
+            tool = self.registry.get(name)
+            if tool is None:
+                run._ready.append(_result(_Call(index, name, None), 'failed', error=f'No tool named {name!r}'))
+                continue
+            call = _Call(index, name, time.monotonic() + (timeout or tool.timeout or self.default_timeout))
+            if tool.pool == 'process' and self.process_workers:
+                future = self._process_pool().submit(tool.run, message, None)
+            else:
+                future = self._threads.submit(tool.run, message, call.cancelled)
+            run._pending[future] = call
+            self._count('started')
+        return run
+
+    def run(self, names, message, timeout=None):
+        """Run the named tools and return their results once all are done"""
+        return self.start(names, message, timeout).collect()
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.max_workers, 'process_workers': self.process_workers,
+                    'tools': self.registry.names(), **self._counters}
+
+    def shutdown(self, wait=True):
+        self._threads.shutdown(wait=wait, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=wait, cancel_futures=True)
+
+    def _process_pool(self):
+        with self._lock:
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.process_workers)
+            return self._processes
+
+    def _count(self, key):
+        with self._lock:
+            self._counters[key] += 1
+
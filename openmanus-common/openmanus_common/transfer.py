@@ -0,0 +1,227 @@
+"""NDJSON export and bulk import of conversations and messages.
+
+Used by both backends, which share the format: every conversation first,
+then every message ordered by conversation.
+
+    {"type": "conversation", "id", "session_id", "title", "created_at", "updated_at"}
+    {"type": "message", "id", "conversation_id", "role", "content", "timestamp",
+     "task", "tools", "processing_time"}
+
+Each backend turns its rows into these records for ``export_ndjson`` and
+maps checked messages onto its own columns in an ``NDJSONImporter``
+subclass. Fields a backend has no column for are exported as null and
+ignored on import, except that imported tasks are counted in the usage
+rollup.
+"""
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from openmanus_common.usage import count_usage, record_usage
+
+# Rows fetched per round trip while exporting, and lines per response chunk
+EXPORT_CHUNK_SIZE = 1000
+# Rows per multi-row INSERT while importing
+IMPORT_CHUNK_SIZE = 1000
+# Stop listing individual bad lines after this many
+MAX_REPORTED_ERRORS = 100
+
+
+def isoformat(value):
+    return value.isoformat() if value else None
+
+
+def parse_datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def record_field(record, name, types, column=None, required=False):
+    """``record[name]`` if it is one of ``types`` and fits ``column``, else ValueError"""
+    value = record.get(name)
+    if value is None:
+        if required:
+            raise ValueError(f'{name} is required')
+        return None
+    # bool is an int to isinstance but never a valid id or number here
+    if isinstance(value, bool) or not isinstance(value, types):
+        raise ValueError(f'{name} must be {" or ".join(t.__name__ for t in types)}, not {type(value).__name__}')
+    length = getattr(getattr(column, 'type', None), 'length', None)
+    if length and len(value) > length:
+        raise ValueError(f'{name} is longer than {length} characters')
+    return value
+
+
+def _tools(record):
+    tools = record_field(record, 'tools', (list,))
+    if tools and not all(isinstance(tool, str) for tool in tools):
+        raise ValueError('tools must be a list of strings')
+    return tools
+
+
+def export_ndjson(records):
+    """Yield export records as NDJSON text, a chunk of lines at a time"""
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record, separators=(',', ':')))
+        if len(lines) >= EXPORT_CHUNK_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+class NDJSONImporter(ABC):
+    """Bulk-inserts export records in chunks, remapping conversation ids.
+
+    Conversations get fresh ids in the target database; messages are
+    attached through the mapping, so a message must come after its
+    conversation. Bad lines are skipped and reported by line number;
+    every field is checked before a line is staged, so a chunk's INSERT
+    only fails on the database's side. Each chunk is committed on its own
+    and listed in ``committed_chunks``.
+
+    Subclasses implement ``message_row`` for their messages table.
+    """
+
+    def __init__(self, session, conversations, messages, usage=None, chunk_size=IMPORT_CHUNK_SIZE):
+        self.session = session
+        self.conversations_table = conversations
+        self.messages_table = messages
+        # Imported assistant turns are added to this usage table, if given
+        self.usage_table = usage
+        self._task_column = usage.c.name if usage is not None else None
+        self.chunk_size = chunk_size
+        self.conversation_ids = {}
+        self.conversations = 0
+        self.messages = 0
+        self.errors = []
+        self.error_count = 0
+        # {'kind', 'rows', 'first_line', 'last_line'} of each committed chunk
+        self.committed_chunks = []
+        self.line = 0
+        self._pending_lines = {'conversations': [], 'messages': []}
+        self._pending_conversations = []
+        self._pending_messages = []
+        self._pending_usage = []
+
+    def feed(self, lines):
+        for number, line in enumerate(lines, 1):
+            self.line = number
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError('line is not a JSON object')
+                self._add(record)
+            except (ValueError, KeyError, TypeError) as e:
+                self.error_count += 1
+                if len(self.errors) < MAX_REPORTED_ERRORS:
+                    self.errors.append({'line': number, 'error': str(e)})
+        self.flush()
+        return self
+
+    def conversation_row(self, record):
+        """The conversations row for a conversation record; ``title`` only where the table has one"""
+        table = self.conversations_table
+        row = {
+            'session_id': record_field(record, 'session_id', (str,), table.c.session_id, required=True),
+            'created_at': parse_datetime(record.get('created_at')) or datetime.utcnow(),
+            'updated_at': parse_datetime(record.get('updated_at')) or datetime.utcnow()
+        }
+        if 'title' in table.c:
+            row['title'] = record_field(record, 'title', (str,), table.c.title)
+        return row
+
+    @abstractmethod
+    def message_row(self, message):
+        """The messages row for a checked message.
+
+        ``message`` has ``conversation_id`` (already remapped), ``role``,
+        ``content``, ``timestamp``, ``task``, ``tools`` and
+        ``processing_time``.
+        """
+
+    def _add(self, record):
+        kind = record.get('type')
+        if kind == 'conversation':
+            row = self.conversation_row(record)
+            self._pending_conversations.append((record_field(record, 'id', (int, str), required=True), row))
+            self._pending_lines['conversations'].append(self.line)
+            if len(self._pending_conversations) >= self.chunk_size:
+                self._flush_conversations()
+        elif kind == 'message':
+            role = record_field(record, 'role', (str,), required=True)
+            if role not in ('user', 'assistant'):
+                raise ValueError(f'unknown role {role!r}')
+            message = {
+                'role': role,
+                'content': record_field(record, 'content', (str,), required=True),
+                # Counted in the usage rollup, so it must fit a usage name
+                'task': record_field(record, 'task', (str,), self._task_column),
+                'tools': _tools(record),
+                'processing_time': record_field(record, 'processing_time', (int, float)),
+                'timestamp': parse_datetime(record.get('timestamp')) or datetime.utcnow()
+            }
+            old_id = record_field(record, 'conversation_id', (int, str), required=True)
+
+            # Conversations are flushed first so the id mapping is complete
+            self._flush_conversations()
+            message['conversation_id'] = self.conversation_ids.get(old_id)
+            if message['conversation_id'] is None:
+                raise KeyError(f'unknown conversation {old_id}')
+            self._pending_messages.append(self.message_row(message))
+            self._pending_lines['messages'].append(self.line)
+            if role == 'assistant':
+                self._pending_usage.append((message['timestamp'].date(), message['task'], message['tools']))
+            if len(self._pending_messages) >= self.chunk_size:
+                self._flush_messages()
+        else:
+            raise ValueError(f'unknown record type {kind!r}')
+
+    def flush(self):
+        self._flush_conversations()
+        self._flush_messages()
+
+    def _flush_conversations(self):
+        if not self._pending_conversations:
+            return
+        table = self.conversations_table
+        old_ids = [old_id for old_id, _ in self._pending_conversations]
+        new_ids = self.session.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            [row for _, row in self._pending_conversations]
+        ).scalars().all()
+        self.session.commit()
+        self.conversation_ids.update(zip(old_ids, new_ids))
+        self.conversations += len(new_ids)
+        self._committed('conversations')
+        self._pending_conversations = []
+
+    def _flush_messages(self):
+        if not self._pending_messages:
+            return
+        self.session.execute(insert(self.messages_table), self._pending_messages)
+        if self.usage_table is not None:
+            record_usage(self.session, self.usage_table, count_usage(self._pending_usage))
+        self.session.commit()
+        self.messages += len(self._pending_messages)
+        self._committed('messages')
+        self._pending_messages = []
+        self._pending_usage = []
+
+    def _committed(self, kind):
+        lines = self._pending_lines[kind]
+        self.committed_chunks.append({'kind': kind, 'rows': len(lines), 'first_line': lines[0], 'last_line': lines[-1]})
+        self._pending_lines[kind] = []
+
+    def to_dict(self):
+        return {
+            'conversations': self.conversations,
+            'messages': self.messages,
+            'error_count': self.error_count,
+            'errors': self.errors
+        }
@@ -0,0 +1,110 @@
+"""Daily usage rollup behind /api/analytics/usage.
+
+Used by both backends, on the same ``usage_daily`` rows: assistant turns,
+tools and tasks counted per day, ``(day, kind, name)`` with kind ``turn``
+(name ``''``), ``tool`` or ``task``. Every write adds its counts in the
+same transaction, so reports read a few rows per day instead of scanning
+messages.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from sqlalchemy import func, select
+
+from openmanus_common.dialects import upsert_insert
+
+# Bit i of a tools mask is TOOLS[i]; only append, never reorder
+TOOLS = ('code', 'file', 'browser', 'terminal', 'database', 'image')
+TOOL_BITS = {tool: 1 << index for index, tool in enumerate(TOOLS)}
+
+INTERVALS = ('day', 'week', 'month')
+
+
+def tools_mask(tools):
+    """The bitmask of a tools list, None without tools; tools outside TOOLS are left out"""
+    if not tools:
+        return None
+    mask = 0
+    for tool in tools:
+        mask |= TOOL_BITS.get(tool, 0)
+    return mask
+
+
+def mask_tools(mask):
+    return [tool for tool in TOOLS if mask and mask & TOOL_BITS[tool]]
+
+
+def count_usage(entries):
+    """Counts keyed by ``(day, kind, name)`` for ``(day, task, tools)`` of assistant turns.
+
+    Tools go through their mask, so a tool outside TOOLS or named twice is
+    counted the way a rebuild from stored masks would count it.
+    """
+    counts = Counter()
+    for day, task, tools in entries:
+        counts[(day, 'turn', '')] += 1
+        if task:
+            counts[(day, 'task', task)] += 1
+        for tool in mask_tools(tools_mask(tools)):
+            counts[(day, 'tool', tool)] += 1
+    return counts
+
+
+def record_usage(session, usage, counts):
+    """Add counts to the usage table in one statement, within the session's transaction"""
+    if not counts:
+        return
+    stmt = upsert_insert(session.get_bind().dialect.name)(usage)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[usage.c.day, usage.c.kind, usage.c.name],
+        set_={'count': usage.c.count + stmt.excluded.count}
+    )
+    session.execute(stmt, [
+        {'day': day, 'kind': kind, 'name': name, 'count': count}
+        for (day, kind, name), count in counts.items()
+    ])
+
+
+def _bucket(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _add(entry, kind, name, count):
+    if kind == 'turn':
+        entry['turns'] += count
+    else:
+        group = entry['tools' if kind == 'tool' else 'tasks']
+        group[name] = group.get(name, 0) + count
+
+
+def usage_report(session, usage, start, end, interval='day'):
+    """Turn, tool and task counts from ``start`` to ``end`` (inclusive), in total and per interval"""
+    in_window = (usage.c.day >= start, usage.c.day <= end)
+    totals = {'turns': 0, 'tools': {}, 'tasks': {}}
+    for kind, name, count in session.execute(
+        select(usage.c.kind, usage.c.name, func.sum(usage.c.count))
+        .where(*in_window).group_by(usage.c.kind, usage.c.name)
+    ):
+        _add(totals, kind, name, count)
+
+    series = {}
+    for day, kind, name, count in session.execute(
+        select(usage.c.day, usage.c.kind, usage.c.name, usage.c.count)
+        .where(*in_window).order_by(usage.c.day)
+    ):
+        bucket = _bucket(day, interval)
+        if bucket not in series:
+            series[bucket] = {'start': bucket.isoformat(), 'turns': 0, 'tools': {}, 'tasks': {}}
+        _add(series[bucket], kind, name, count)
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'interval': interval,
+        'totals': totals,
+        'series': list(series.values())
+    }
@@ -3,44 +3,97 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from src.models.user import db
-from src.models.chat import Conversation, Message, AgentSession  # Import chat models
-from src.routes.user import user_bp
-from src.routes.chat import chat_bp
+from src.models.chat import Conversation, ConversationArchive, Message, AgentSession, UsageDaily  # Import chat models
+from src.services.retention import init_retention, start_retention
+from src.services.schema import init_schema
+from src.services.startup import LazySetup
+from src.services.storage import init_storage
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+# Bearer token for the /api/export and /api/import endpoints (disabled when unset)
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN')
+# Set AGENT_SIMULATED_DELAY=0 to skip the fake 1-2 s of agent work (benchmarks)
+app.config['AGENT_SIMULATED_DELAY'] = os.environ.get('AGENT_SIMULATED_DELAY', '1') != '0'
+# Most messages accepted by one /api/chat/batch request
+app.config['CHAT_BATCH_MAX_ITEMS'] = int(os.environ.get('CHAT_BATCH_MAX_ITEMS', 100))
+# Most users accepted by one /api/users/bulk request
+app.config['USERS_BULK_MAX_ITEMS'] = int(os.environ.get('USERS_BULK_MAX_ITEMS', 10000))
 
 # Enable CORS for all routes
 CORS(app)
 
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(chat_bp, url_prefix='/api')
-
 # uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URL', f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Engine settings of the STORAGE_PROFILE, so before db.init_app
+init_storage(app)
 db.init_app(app)
-with app.app_context():
-    db.create_all()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+init_schema(app)
+# At import, so `flask archive-conversations` exists without a request; the
+# background worker starts with the other services
+init_retention(app, start=False)
+
+
+def setup_services(app):
+    """Blueprints and the services behind them, imported and set up on the first request"""
+    from src.routes.user import user_bp
+    from src.routes.chat import chat_bp
+    from src.routes.transfer import transfer_bp
+    from src.routes.analytics import analytics_bp
+    from src.services.activity import init_activity
+    from src.services.admission import init_admission
+    from src.services.cache import init_cache
+    from src.services.context import init_context
+    from src.services.idempotency import init_idempotency
+    from src.services.jobs import init_jobs
+    from src.services.metrics import init_metrics
+    from src.services.persistence import init_persistence
+    from src.services.search import init_search
+    from src.services.static import init_static
+    from src.services.tools import init_tools
+
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(chat_bp, url_prefix='/api')
+    app.register_blueprint(transfer_bp, url_prefix='/api')
+    app.register_blueprint(analytics_bp, url_prefix='/api')
+
+    init_cache(app)
+    # Before init_persistence, so the group-commit writer is closed first at exit
+    init_activity(app)
+    init_persistence(app)
+    start_retention(app)
+    init_jobs(app)
+    init_tools(app)
+    init_context(app)
+    init_search(app)
+    init_metrics(app)
+    init_admission(app)
+    init_idempotency(app)
+
+    static_manifest = init_static(app)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if static_manifest is None:
+                return "Static folder not configured", 404
+
+        static_file = static_manifest.get(path) if path != "" else None
+        if static_file is None:
+            static_file = static_manifest.get('index.html')
+            if static_file is None:
+                return "index.html not found", 404
+        return static_manifest.send(static_file)
+
+
+# Cold starts answer sooner when the chat stack loads with the first request
+lazy_setup = LazySetup(app, setup_services)
 
 
 if __name__ == '__main__':
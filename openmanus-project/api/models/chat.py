@@ -4,6 +4,10 @@ from src.models.user import db
 class Conversation(db.Model):
     """Model for chat conversations"""
     __tablename__ = 'conversations'
+    __table_args__ = (
+        # Finds cold conversations still to be archived (src.services.retention)
+        db.Index('ix_conversations_archived_at_updated_at', 'archived_at', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     session_id = db.Column(db.String(255), nullable=False, index=True)
@@ -11,6 +15,20 @@ class Conversation(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Summary kept current by every write, so listings never touch messages
+    message_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_message_preview = db.Column(db.String(200), nullable=True)
+    last_message_at = db.Column(db.DateTime, nullable=True)
+    
+    # Rolling summary of the messages up to summary_through_id, which have
+    # dropped out of the model's context window (src.services.context)
+    summary = db.Column(db.Text, nullable=True)
+    summary_through_id = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    summary_token_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Set while the messages live compressed in conversation_archives
+    archived_at = db.Column(db.DateTime, nullable=True)
+    
     # Relationship to messages
     messages = db.relationship('Message', backref='conversation', lazy=True, cascade='all, delete-orphan')
     
@@ -21,12 +39,20 @@ class Conversation(db.Model):
             'title': self.title,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
-            'message_count': len(self.messages)
+            'message_count': self.message_count,
+            'last_message_preview': self.last_message_preview,
+            'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None
         }
 
 class Message(db.Model):
     """Model for individual chat messages"""
     __tablename__ = 'messages'
+    __table_args__ = (
+        # Keyset pagination of a conversation's history
+        db.Index('ix_messages_conversation_id_id', 'conversation_id', 'id'),
+        # Covers recounting tool usage over a time window (rebuild_usage)
+        db.Index('ix_messages_type_timestamp_tools_mask', 'message_type', 'timestamp', 'tools_mask'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
@@ -38,6 +64,10 @@ class Message(db.Model):
     task_description = db.Column(db.String(1000), nullable=True)
     tools_used = db.Column(db.JSON, nullable=True)  # Store as JSON array
     processing_time = db.Column(db.Float, nullable=True)  # Time taken to process
+    # tools_used as bits of openmanus_common.usage.TOOLS, for SQL aggregates
+    tools_mask = db.Column(db.Integer, nullable=True)
+    # Tokens in content by src.services.context.count_tokens, counted once on write
+    token_count = db.Column(db.Integer, nullable=True)
     
     def to_dict(self):
         return {
@@ -51,6 +81,26 @@ class Message(db.Model):
             'processing_time': self.processing_time
         }
 
+class UsageDaily(db.Model):
+    """Assistant turns, tools and tasks counted per day, kept current by every write"""
+    __tablename__ = 'usage_daily'
+    
+    day = db.Column(db.Date, primary_key=True)
+    kind = db.Column(db.String(10), primary_key=True)  # 'turn', 'tool' or 'task'
+    name = db.Column(db.String(1000), primary_key=True)  # '' for turns
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class ConversationArchive(db.Model):
+    """Every message of a cold conversation, serialized and compressed into one row"""
+    __tablename__ = 'conversation_archives'
+    
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), primary_key=True)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    codec = db.Column(db.String(10), nullable=False)  # 'zlib' or 'zstd'
+    message_count = db.Column(db.Integer, nullable=False)
+    raw_size = db.Column(db.Integer, nullable=False)  # Bytes before compression
+    payload = db.Column(db.LargeBinary, nullable=False)
+
 class AgentSession(db.Model):
     """Model for tracking agent sessions and capabilities"""
     __tablename__ = 'agent_sessions'
@@ -0,0 +1,31 @@
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, jsonify, request
+from flask_cors import cross_origin
+
+from src.services.usage import INTERVALS, usage_report
+
+analytics_bp = Blueprint('analytics', __name__)
+
+# Days reported when no start is given
+DEFAULT_WINDOW_DAYS = 30
+
+@analytics_bp.route('/analytics/usage', methods=['GET'])
+@cross_origin()
+def usage():
+    """Assistant turns, tool use and tasks per day, week or month, from the usage_daily rollup"""
+    try:
+        interval = request.args.get('interval', 'day')
+        try:
+            end = date.fromisoformat(request.args['end']) if 'end' in request.args else datetime.utcnow().date()
+            start = date.fromisoformat(request.args['start']) if 'start' in request.args else end - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+        except ValueError:
+            return jsonify({'error': 'start and end must be dates (YYYY-MM-DD)'}), 400
+        if start > end:
+            return jsonify({'error': 'start must not be after end'}), 400
+        if interval not in INTERVALS:
+            return jsonify({'error': f"interval must be one of {', '.join(INTERVALS)}"}), 400
+
+        return jsonify(usage_report(start, end, interval))
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
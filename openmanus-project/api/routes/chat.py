@@ -1,173 +1,399 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, current_app, request, jsonify, session, stream_with_context, url_for
 from flask_cors import cross_origin
 from datetime import datetime
+import json
+import re
 import uuid
 import time
 import random
 
 from src.models.user import db
-from src.models.chat import Conversation, Message, AgentSession
+from src.models.chat import Conversation, Message
+from src.services.intent import classify_message, classify_messages
+from src.services.activity import session_stats
+from src.services.admission import admission_control
+from src.services.cache import CachedTranscript
+from src.services.idempotency import idempotent
+from src.services.jobs import JobQueueFull
+from src.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_page, list_page, page_args
+from src.services.persistence import ChatTurn, save_chat_turn, save_chat_turns
+from src.services.retention import archived_messages, retention_stats
 
 chat_bp = Blueprint('chat', __name__)
 
+# Words sent per content event when streaming a response
+STREAM_WORDS_PER_CHUNK = 4
+
+# Most messages one /api/chat/batch request may carry (CHAT_BATCH_MAX_ITEMS)
+CHAT_BATCH_MAX_ITEMS = 100
+
 def get_or_create_session():
     """Get or create a session ID for the user"""
     if 'session_id' not in session:
         session['session_id'] = str(uuid.uuid4())
     return session['session_id']
 
-def get_or_create_agent_session(session_id, user_agent=None, ip_address=None):
-    """Get or create an agent session record"""
-    agent_session = AgentSession.query.filter_by(session_id=session_id).first()
-    if not agent_session:
-        agent_session = AgentSession(
-            session_id=session_id,
-            user_agent=user_agent,
-            ip_address=ip_address
-        )
-        db.session.add(agent_session)
-    else:
-        agent_session.last_active = datetime.utcnow()
+def start_agent_tools(user_message, response_data):
+    """Start the response's tools on the tool executor, None when TOOL_EXECUTION is off"""
+    executor = current_app.extensions.get('tool_executor')
+    if executor is None:
+        return None
+    return executor.start(response_data["tools"], user_message)
+
+def answer_in_context(session_id, user_message, response_data):
+    """Replace the keyword response with the AGENT_LLM's answer given the conversation so far"""
+    builder = current_app.extensions.get('context_builder')
+    if builder is None or session_id is None:
+        return
     
-    db.session.commit()
-    return agent_session
+    # The conversation the turn will be saved to
+    conversation = Conversation.query.with_entities(Conversation.id).filter_by(session_id=session_id).order_by(Conversation.updated_at.desc()).first()
+    window = builder.build(conversation.id if conversation else None, user_message)
+    response_data["content"] = builder.llm.complete(window, user_message)
+    response_data["context"] = window.to_dict()
 
-def generate_agent_response(user_message, conversation_id):
+def generate_agent_response(user_message, session_id=None, job=None, run_tools=True):
     """Generate an appropriate agent response based on user input"""
     start_time = time.time()
     
     # Analyze user message and determine response
-    user_message_lower = user_message.lower()
-    
-    if any(keyword in user_message_lower for keyword in ['website', 'web', 'browse', 'url', 'html', 'css']):
-        response_data = {
-            "content": "I'll help you create a website! Let me start by understanding your requirements and then build the HTML, CSS, and any necessary JavaScript. I can create responsive designs, add interactive features, and ensure your site looks professional.",
-            "task": "Website development and design",
-            "tools": ["code", "file", "browser"]
-        }
-    elif any(keyword in user_message_lower for keyword in ['code', 'program', 'script', 'python', 'javascript', 'app']):
-        response_data = {
-            "content": "I'll help you with coding! I can write, debug, and optimize code in various programming languages. Let me analyze your requirements and create the solution you need.",
-            "task": "Code development and programming",
-            "tools": ["code", "terminal", "file"]
-        }
-    elif any(keyword in user_message_lower for keyword in ['file', 'document', 'edit', 'write', 'text']):
-        response_data = {
-            "content": "I'll help you work with files and documents. I can create, edit, organize, and manage various types of files. Let me handle the file operations for you.",
-            "task": "File management and document editing",
-            "tools": ["file", "terminal"]
-        }
-    elif any(keyword in user_message_lower for keyword in ['data', 'analyze', 'chart', 'graph', 'database', 'csv', 'excel']):
-        response_data = {
-            "content": "I'll help you analyze data and create visualizations! I can process datasets, generate insights, create charts and graphs, and help you understand your data better.",
-            "task": "Data analysis and visualization",
-            "tools": ["database", "code", "image"]
-        }
-    elif any(keyword in user_message_lower for keyword in ['image', 'picture', 'generate', 'create', 'photo', 'design']):
-        response_data = {
-            "content": "I'll help you work with images! I can generate new images, edit existing ones, create designs, and handle various image processing tasks.",
-            "task": "Image generation and processing",
-            "tools": ["image", "file"]
-        }
-    elif any(keyword in user_message_lower for keyword in ['search', 'find', 'lookup', 'research', 'information']):
-        response_data = {
-            "content": "I'll help you research and find information! I can browse the web, search for specific topics, gather data, and provide you with comprehensive research results.",
-            "task": "Web research and information gathering",
-            "tools": ["browser", "file"]
-        }
-    else:
-        # General response
-        response_data = {
-            "content": "I understand your request! I'm a versatile AI agent that can help with web browsing, coding, file editing, data analysis, image generation, and much more. Let me work on this task for you.",
-            "task": "Processing your request using available tools",
-            "tools": ["terminal", "code", "file"]
-        }
-    
-    processing_time = time.time() - start_time
-    
-    # Create and save the assistant message
-    assistant_message = Message(
-        conversation_id=conversation_id,
-        message_type='assistant',
-        content=response_data["content"],
-        task_description=response_data["task"],
-        tools_used=response_data["tools"],
-        processing_time=processing_time
-    )
+    response_data = classify_message(user_message)
+    answer_in_context(session_id, user_message, response_data)
+    
+    tool_run = start_agent_tools(user_message, response_data) if run_tools else None
+    if tool_run is not None:
+        if job is not None:
+            job.on_cancel(tool_run.cancel)
+        response_data["tool_results"] = tool_run.collect()
+    
+    response_data["processing_time"] = time.time() - start_time
+    return response_data
+
+def generate_agent_responses(user_messages):
+    """Generate agent responses for a batch of messages, classified in a single pass"""
+    start_time = time.time()
+    
+    responses = classify_messages(user_messages)
+    
+    # Every message's tools are submitted before any is waited for
+    tool_runs = [start_agent_tools(user_message, response_data) for user_message, response_data in zip(user_messages, responses)]
+    for response_data, tool_run in zip(responses, tool_runs):
+        if tool_run is not None:
+            response_data["tool_results"] = tool_run.collect()
+    
+    # Each response is charged an equal share of the batch
+    processing_time = (time.time() - start_time) / len(user_messages)
+    for response_data in responses:
+        response_data["processing_time"] = processing_time
+    return responses
+
+def simulated_processing_time():
+    """Seconds of simulated agent work, 0 when AGENT_SIMULATED_DELAY is turned off"""
+    if not current_app.config.get('AGENT_SIMULATED_DELAY', True):
+        return 0
+    return random.uniform(1, 2)
+
+def read_user_message():
+    """Return the trimmed chat message from the request body, or an error response"""
+    data = request.get_json()
+    if not data or 'message' not in data:
+        return None, (jsonify({'error': 'Message is required'}), 400)
     
-    db.session.add(assistant_message)
-    db.session.commit()
+    user_message = data['message'].strip()
+    if not user_message:
+        return None, (jsonify({'error': 'Message cannot be empty'}), 400)
     
-    return assistant_message
+    return user_message, None
+
+def build_chat_turn(session_id, user_message, response_data, received_at, **target):
+    return ChatTurn(
+        session_id=session_id,
+        user_message=user_message,
+        response_data=response_data,
+        user_agent=request.headers.get('User-Agent'),
+        ip_address=request.remote_addr,
+        received_at=received_at,
+        **target
+    )
+
+def chat_result(turn):
+    response_data = turn.response_data
+    result = {
+        'response': response_data["content"],
+        'task': response_data["task"],
+        'tools': response_data["tools"],
+        'conversation_id': turn.conversation_id,
+        'message_id': turn.message_id,
+        'processing_time': response_data["processing_time"]
+    }
+    if "tool_results" in response_data:
+        result['tool_results'] = response_data["tool_results"]
+    if "context" in response_data:
+        result['context'] = response_data["context"]
+    return result
+
+def wants_event_stream():
+    return request.accept_mimetypes.best == 'text/event-stream'
+
+def wants_async():
+    data = request.get_json(silent=True) or {}
+    return 'respond-async' in request.headers.get('Prefer', '') or data.get('async') is True
 
 @chat_bp.route('/chat', methods=['POST'])
 @cross_origin()
+@idempotent
+@admission_control
 def chat():
     try:
-        data = request.get_json()
-        if not data or 'message' not in data:
-            return jsonify({'error': 'Message is required'}), 400
+        user_message, error = read_user_message()
+        if error:
+            return error
+        
+        if wants_event_stream():
+            return stream_chat_response(user_message)
         
-        user_message = data['message'].strip()
-        if not user_message:
-            return jsonify({'error': 'Message cannot be empty'}), 400
+        if wants_async():
+            return submit_chat_job(user_message)
         
         # Get session information
         session_id = get_or_create_session()
-        user_agent = request.headers.get('User-Agent')
-        ip_address = request.remote_addr
+        received_at = datetime.utcnow()
         
-        # Get or create agent session
-        agent_session = get_or_create_agent_session(session_id, user_agent, ip_address)
+        # Simulate processing time (1-3 seconds)
+        time.sleep(simulated_processing_time())
         
-        # Get or create conversation for this session
-        conversation = Conversation.query.filter_by(session_id=session_id).order_by(Conversation.updated_at.desc()).first()
+        # Generate agent response
+        response_data = generate_agent_response(user_message, session_id)
         
-        if not conversation:
-            # Create new conversation
-            conversation = Conversation(
-                session_id=session_id,
-                title=user_message[:50] + "..." if len(user_message) > 50 else user_message
-            )
-            db.session.add(conversation)
-            db.session.commit()
-            agent_session.total_conversations += 1
-        
-        # Save user message
-        user_msg = Message(
-            conversation_id=conversation.id,
-            message_type='user',
-            content=user_message
-        )
-        db.session.add(user_msg)
-        db.session.commit()
+        # Write the session, conversation and both messages in one transaction
+        turn = save_chat_turn(build_chat_turn(session_id, user_message, response_data, received_at))
         
-        # Update conversation timestamp
-        conversation.updated_at = datetime.utcnow()
-        agent_session.total_messages += 1
-        db.session.commit()
+        return jsonify(chat_result(turn))
         
-        # Simulate processing time (1-3 seconds)
-        time.sleep(random.uniform(1, 2))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@chat_bp.route('/chat/stream', methods=['POST'])
+@cross_origin()
+@idempotent
+@admission_control
+def chat_stream():
+    """Stream the agent response as Server-Sent Events"""
+    try:
+        user_message, error = read_user_message()
+        if error:
+            return error
         
-        # Generate agent response
-        assistant_message = generate_agent_response(user_message, conversation.id)
-        agent_session.total_messages += 1
-        db.session.commit()
+        return stream_chat_response(user_message)
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+def read_batch_item(item):
+    """Return the message and target conversation of a batch item, raising ValueError if invalid"""
+    if isinstance(item, str):
+        item = {'message': item}
+    if not isinstance(item, dict) or not isinstance(item.get('message'), str):
+        raise ValueError('Message is required')
+    
+    user_message = item['message'].strip()
+    if not user_message:
+        raise ValueError('Message cannot be empty')
+    
+    conversation_id = item.get('conversation_id')
+    if conversation_id is not None and type(conversation_id) is not int:
+        raise ValueError('conversation_id must be an integer')
+    return user_message, {'conversation_id': conversation_id, 'start_conversation': item.get('new_conversation') is True}
+
+def batch_cost():
+    """Rate limit tokens a batch takes: one per message, as if sent one by one"""
+    data = request.get_json(silent=True)
+    items = data.get('messages') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return 1
+    return min(len(items), current_app.config.get('CHAT_BATCH_MAX_ITEMS', CHAT_BATCH_MAX_ITEMS))
+
+@chat_bp.route('/chat/batch', methods=['POST'])
+@cross_origin()
+@idempotent
+@admission_control(cost=batch_cost)
+def chat_batch():
+    """Answer many messages in one request and persist every turn in one transaction.
+    
+    Items are a message string or ``{"message", "conversation_id", "new_conversation"}``
+    and are applied in order. Invalid items are reported in their result and
+    skipped (207); the rest are written together or not at all.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('messages')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'messages must be a non-empty array'}), 400
         
-        return jsonify({
-            'response': assistant_message.content,
-            'task': assistant_message.task_description,
-            'tools': assistant_message.tools_used,
-            'conversation_id': conversation.id,
-            'message_id': assistant_message.id,
-            'processing_time': assistant_message.processing_time
-        })
+        max_items = current_app.config.get('CHAT_BATCH_MAX_ITEMS', CHAT_BATCH_MAX_ITEMS)
+        if len(items) > max_items:
+            return jsonify({'error': f'A batch can hold at most {max_items} messages', 'max_items': max_items}), 413
+        
+        session_id = get_or_create_session()
+        received_at = datetime.utcnow()
+        results = [None] * len(items)
+        accepted = []
+        for index, item in enumerate(items):
+            try:
+                accepted.append((index, *read_batch_item(item)))
+            except ValueError as e:
+                results[index] = {'index': index, 'error': str(e)}
+        
+        # Items may only add to this session's own conversations
+        targets = {target['conversation_id'] for _, _, target in accepted if target['conversation_id'] is not None}
+        owned = set()
+        if targets:
+            owned = {conversation_id for (conversation_id,) in Conversation.query.with_entities(Conversation.id).filter(
+                Conversation.id.in_(targets), Conversation.session_id == session_id
+            )}
+        for index, _, target in accepted:
+            if target['conversation_id'] is not None and target['conversation_id'] not in owned:
+                results[index] = {'index': index, 'error': 'Conversation not found'}
+        accepted = [entry for entry in accepted if results[entry[0]] is None]
+        
+        if accepted:
+            # One simulated agent run for the whole batch
+            time.sleep(simulated_processing_time())
+            
+            responses = generate_agent_responses([user_message for _, user_message, _ in accepted])
+            turns = [
+                build_chat_turn(session_id, user_message, response_data, received_at, **target)
+                for (_, user_message, target), response_data in zip(accepted, responses)
+            ]
+            save_chat_turns(turns)
+            for (index, _, _), turn in zip(accepted, turns):
+                results[index] = {'index': index, **chat_result(turn)}
+        
+        failed = len(items) - len(accepted)
+        return jsonify({'results': results, 'succeeded': len(accepted), 'failed': failed}), 207 if failed else 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
+def run_chat_job(job, turn):
+    """Do the agent work for a submitted chat turn on the job pool"""
+    # Simulate processing time (1-3 seconds)
+    job.sleep(simulated_processing_time())
+    
+    turn.response_data = generate_agent_response(turn.user_message, turn.session_id, job=job)
+    job.check_cancelled()
+    
+    try:
+        save_chat_turn(turn)
+    except Exception:
+        db.session.rollback()
+        raise
+    return chat_result(turn)
+
+def submit_chat_job(user_message):
+    """Queue a chat turn and answer 202 with the job to poll"""
+    session_id = get_or_create_session()
+    turn = build_chat_turn(session_id, user_message, None, datetime.utcnow())
+    
+    try:
+        job = current_app.extensions['chat_jobs'].submit(session_id, run_chat_job, turn)
+    except JobQueueFull:
+        response = jsonify({'error': 'Too many pending requests, try again later'})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+    
+    status_url = url_for('chat.get_job', job_id=job.id)
+    response = jsonify({'job_id': job.id, 'status': job.status, 'status_url': status_url})
+    response.headers['Location'] = status_url
+    return response, 202
+
+def get_session_job(job_id):
+    job = current_app.extensions['chat_jobs'].get(job_id)
+    if job is None or job.session_id != get_or_create_session():
+        return None
+    return job
+
+@chat_bp.route('/jobs/<job_id>', methods=['GET'])
+@cross_origin()
+def get_job(job_id):
+    """Get the status, and once finished the result, of a chat job"""
+    job = get_session_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@chat_bp.route('/jobs/<job_id>', methods=['DELETE'])
+@cross_origin()
+def cancel_job(job_id):
+    """Cancel a queued or running chat job"""
+    job = get_session_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    current_app.extensions['chat_jobs'].cancel(job)
+    return jsonify(job.to_dict()), 202
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def split_content(content, words_per_chunk=STREAM_WORDS_PER_CHUNK):
+    """Split a response into word groups that keep their trailing whitespace"""
+    words = re.findall(r'\S+\s*', content)
+    return [''.join(words[i:i + words_per_chunk]) for i in range(0, len(words), words_per_chunk)] or [content]
+
+def stream_chat_response(user_message):
+    """Send the task and tools at once, then the content, then the saved ids.
+
+    Events are ``task`` (task and tools), ``tool`` (each tool's result as it
+    completes, with TOOL_EXECUTION on), ``content`` (a ``delta`` of the
+    response text), ``done`` (message_id, conversation_id, processing_time)
+    and ``error`` if the turn could not be completed.
+    """
+    # The session cookie has to be set before the first byte goes out
+    session_id = get_or_create_session()
+    received_at = datetime.utcnow()
+    response_data = generate_agent_response(user_message, session_id, run_tools=False)
+    
+    def generate():
+        yield sse_event('task', {'task': response_data["task"], 'tools': response_data["tools"]})
+        
+        tool_run = start_agent_tools(user_message, response_data)
+        if tool_run is not None:
+            tools_started = time.time()
+            try:
+                for result in tool_run:
+                    yield sse_event('tool', result)
+            finally:
+                # Also runs when the client disconnects and the server closes this generator
+                tool_run.cancel()
+                response_data["tool_results"] = tool_run.collect()
+            response_data["processing_time"] += time.time() - tools_started
+        
+        # Simulate processing time (1-3 seconds), spread across the chunks
+        chunks = split_content(response_data["content"])
+        delay = simulated_processing_time() / len(chunks)
+        for chunk in chunks:
+            time.sleep(delay)
+            yield sse_event('content', {'delta': chunk})
+        
+        try:
+            turn = save_chat_turn(build_chat_turn(session_id, user_message, response_data, received_at))
+        except Exception as e:
+            db.session.rollback()
+            yield sse_event('error', {'error': 'Internal server error', 'details': str(e)})
+            return
+        
+        yield sse_event('done', {
+            'message_id': turn.message_id,
+            'conversation_id': turn.conversation_id,
+            'processing_time': response_data["processing_time"]
+        })
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @chat_bp.route('/conversations', methods=['GET'])
 @cross_origin()
 def get_conversations():
@@ -185,23 +411,153 @@ def get_conversations():
 @chat_bp.route('/conversations/<int:conversation_id>/messages', methods=['GET'])
 @cross_origin()
 def get_conversation_messages(conversation_id):
-    """Get all messages for a specific conversation"""
+    """Get a page of messages for a specific conversation, oldest first (ascending id).
+    
+    Without a cursor the page holds the most recent ``limit`` messages;
+    ``before`` pages back to older ones and ``after`` forward to newer ones.
+    """
     try:
+        try:
+            before, after, limit = page_args()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         session_id = get_or_create_session()
-        conversation = Conversation.query.filter_by(id=conversation_id, session_id=session_id).first()
+        cache = current_app.extensions.get('transcript_cache')
+        transcript = None
+        if cache is not None:
+            cache_key, transcript = cache.lookup(conversation_id, f'{before}:{after}:{limit}')
+        
+        if transcript is None:
+            conversation = Conversation.query.filter_by(id=conversation_id).first()
+            if not conversation:
+                return jsonify({'error': 'Conversation not found'}), 404
+            
+            if conversation.archived_at is not None:
+                # Cold: rehydrated from its compressed archive, without moving it back
+                messages, page = list_page(
+                    archived_messages(conversation_id), 'id', before=before, after=after, limit=limit
+                )
+            else:
+                messages, page = keyset_page(
+                    Message.query.filter_by(conversation_id=conversation_id),
+                    Message.id,
+                    before=before,
+                    after=after,
+                    limit=limit
+                )
+                messages = [msg.to_dict() for msg in messages]
+            
+            transcript = CachedTranscript(
+                current_app.json.dumps({
+                    'conversation': conversation.to_dict(),
+                    'messages': messages,
+                    'page': page
+                }),
+                conversation.session_id,
+                conversation.updated_at
+            )
+            if cache is not None:
+                cache.put(cache_key, transcript)
         
-        if not conversation:
+        if transcript.session_id != session_id:
             return jsonify({'error': 'Conversation not found'}), 404
         
-        messages = Message.query.filter_by(conversation_id=conversation_id).order_by(Message.timestamp.asc()).all()
+        response = current_app.response_class(transcript.body, mimetype='application/json')
+        response.set_etag(transcript.etag)
+        response.last_modified = transcript.last_modified
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@chat_bp.route('/session', methods=['GET'])
+@cross_origin()
+def get_session_stats():
+    """Activity counters of the current session"""
+    try:
+        stats = session_stats(get_or_create_session())
+        if stats is None:
+            return jsonify({'error': 'No activity in this session yet'}), 404
+        return jsonify({'session': stats})
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@chat_bp.route('/search', methods=['GET'])
+@cross_origin()
+def search_messages():
+    """Full-text search over the current session's messages, best match first"""
+    try:
+        query = request.args.get('q', '').strip()
+        role = request.args.get('role')
+        try:
+            limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            offset = int(request.args.get('offset', 0))
+        except ValueError:
+            return jsonify({'error': 'limit and offset must be integers'}), 400
+        if not query:
+            return jsonify({'error': 'Query is required'}), 400
+        if limit < 1 or offset < 0:
+            return jsonify({'error': 'limit must be positive and offset not negative'}), 400
+        if role not in (None, 'user', 'assistant'):
+            return jsonify({'error': 'role must be user or assistant'}), 400
         
-        return jsonify({
-            'conversation': conversation.to_dict(),
-            'messages': [msg.to_dict() for msg in messages]
-        })
+        session_id = get_or_create_session()
+        results, page = current_app.extensions['message_search'].search(
+            session_id, query, role=role, limit=limit, offset=offset
+        )
+        return jsonify({'query': query, 'results': results, 'page': page})
     except Exception as e:
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
+@chat_bp.route('/cache/stats', methods=['GET'])
+@cross_origin()
+def cache_stats():
+    """Hit, miss and eviction counters of the transcript cache"""
+    cache = current_app.extensions.get('transcript_cache')
+    return jsonify({'enabled': cache is not None, **(cache.stats() if cache else {})})
+
+@chat_bp.route('/tools/stats', methods=['GET'])
+@cross_origin()
+def tool_stats():
+    """Registered tools and call counters of this worker's tool executor"""
+    executor = current_app.extensions.get('tool_executor')
+    return jsonify({'enabled': executor is not None, **(executor.stats() if executor else {})})
+
+@chat_bp.route('/idempotency/stats', methods=['GET'])
+@cross_origin()
+def idempotency_stats():
+    """Executed, replayed and joined counters of this worker's Idempotency-Key store"""
+    guard = current_app.extensions.get('idempotency')
+    return jsonify({'enabled': guard is not None, **(guard.stats() if guard else {})})
+
+@chat_bp.route('/retention/stats', methods=['GET'])
+@cross_origin()
+def retention_status():
+    """Conversations and bytes in the archive, and this worker's last retention pass"""
+    try:
+        worker = current_app.extensions.get('retention')
+        return jsonify({'enabled': worker is not None, 'archive': retention_stats(), **(worker.stats() if worker else {})})
+    except Exception as e:
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
+@chat_bp.route('/admission/stats', methods=['GET'])
+@cross_origin()
+def admission_stats():
+    """Rate limit and load shedding counters of this worker"""
+    controller = current_app.extensions.get('admission')
+    return jsonify({'enabled': controller is not None, **(controller.stats() if controller else {})})
+
+@chat_bp.route('/storage/stats', methods=['GET'])
+@cross_origin()
+def storage_stats():
+    """The storage profile in use, the connection pool and the single-writer queue"""
+    storage = current_app.extensions.get('storage')
+    if storage is None:
+        return jsonify({'profile': None, 'dialect': db.engine.dialect.name, 'pool': db.engine.pool.status()})
+    return jsonify(storage.stats(db.engine))
+
 @chat_bp.route('/status', methods=['GET'])
 @cross_origin()
 def status():
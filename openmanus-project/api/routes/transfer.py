@@ -0,0 +1,53 @@
+import hmac
+import io
+
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+
+from src.models.user import db
+from src.services.transfer import NDJSONImporter, export_ndjson
+
+transfer_bp = Blueprint('transfer', __name__)
+
+def admin_token_error():
+    """Return an error response unless the request carries the admin token"""
+    token = current_app.config.get('ADMIN_TOKEN')
+    if not token:
+        return jsonify({'error': 'Data transfer is disabled, set ADMIN_TOKEN to enable it'}), 403
+    
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        return jsonify({'error': 'Invalid admin token'}), 401
+    return None
+
+@transfer_bp.route('/export', methods=['GET'])
+def export_data():
+    """Stream every conversation and message as NDJSON"""
+    error = admin_token_error()
+    if error:
+        return error
+    
+    return Response(stream_with_context(export_ndjson()), mimetype='application/x-ndjson', headers={
+        'Content-Disposition': 'attachment; filename=openmanus-export.ndjson'
+    })
+
+@transfer_bp.route('/import', methods=['POST'])
+def import_data():
+    """Bulk-load conversations and messages from an NDJSON export"""
+    error = admin_token_error()
+    if error:
+        return error
+    
+    importer = NDJSONImporter()
+    try:
+        importer.feed(io.TextIOWrapper(request.stream, encoding='utf-8'))
+    except Exception as e:
+        db.session.rollback()
+        # Chunks committed before the failure stay in the database
+        return jsonify({
+            'error': f'Import failed at line {importer.line}, the chunks in committed_chunks were kept',
+            'details': str(e),
+            'committed_chunks': importer.committed_chunks,
+            **importer.to_dict()
+        }), 500
+    
+    return jsonify(importer.to_dict()), 200 if not importer.error_count else 207
@@ -1,12 +1,31 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from src.models.user import User, db
+from src.services.pagination import keyset_page, page_args
+from src.services.users import BULK_MODES, bulk_upsert_users, user_fields
 
 user_bp = Blueprint('user', __name__)
 
+# Most users one /api/users/bulk request may carry (USERS_BULK_MAX_ITEMS)
+USERS_BULK_MAX_ITEMS = 10000
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """A page of users in id order, from the first unless ``after``/``before`` is given.
+
+    ``fields`` is a comma-separated subset of id, username and email.
+    """
+    try:
+        before, after, limit = page_args()
+        columns = user_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if before is None and after is None:
+        after = 0
+    users, page = keyset_page(
+        User.query.with_entities(*columns), User.id, before=before, after=after, limit=limit
+    )
+    return jsonify({'users': [dict(user._mapping) for user in users], 'page': page})
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -17,6 +36,44 @@ def create_user():
     db.session.commit()
     return jsonify(user.to_dict()), 201
 
+@user_bp.route('/users/bulk', methods=['POST'])
+def bulk_users():
+    """Create many users at once, or with ``"mode": "upsert"`` update existing usernames' emails.
+    
+    Rows whose username or email is already taken are reported in their
+    result and skipped (207); the rest are written in one transaction.
+    """
+    try:
+        data = request.get_json(silent=True)
+        if isinstance(data, list):
+            # A bare array is the rows, created with the default mode
+            data = {'users': data}
+        elif not isinstance(data, dict):
+            return jsonify({'error': 'Body must be a JSON object with users, or an array of users'}), 400
+        rows = data.get('users')
+        if not isinstance(rows, list) or not rows:
+            return jsonify({'error': 'users must be a non-empty array'}), 400
+        mode = data.get('mode', 'create')
+        if mode not in BULK_MODES:
+            return jsonify({'error': f"mode must be one of {', '.join(BULK_MODES)}"}), 400
+        
+        max_items = current_app.config.get('USERS_BULK_MAX_ITEMS', USERS_BULK_MAX_ITEMS)
+        if len(rows) > max_items:
+            return jsonify({'error': f'A bulk request can hold at most {max_items} users', 'max_items': max_items}), 413
+        
+        results = bulk_upsert_users(rows, mode)
+        db.session.commit()
+        
+        counts = {status: 0 for status in ('created', 'updated', 'unchanged', 'conflict', 'invalid')}
+        for result in results:
+            counts[result['status']] += 1
+        failed = counts['conflict'] + counts['invalid']
+        return jsonify({'results': results, **counts}), 207 if failed else 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
+
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
     user = User.query.get_or_404(user_id)
@@ -0,0 +1,217 @@
+import atexit
+import os
+import threading
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import case
+
+from openmanus_common.dialects import upsert_insert
+
+from src.models.user import db
+from src.models.chat import AgentSession
+
+class SessionActivity:
+    """Activity of one session not yet written to agent_sessions"""
+
+    def __init__(self, first_seen, user_agent=None, ip_address=None):
+        self.first_seen = first_seen
+        self.last_active = first_seen
+        self.user_agent = user_agent
+        self.ip_address = ip_address
+        self.messages = 0
+        self.conversations = 0
+
+    def add(self, other):
+        self.first_seen = min(self.first_seen, other.first_seen)
+        self.last_active = max(self.last_active, other.last_active)
+        self.messages += other.messages
+        self.conversations += other.conversations
+
+    def to_row(self, session_id):
+        return {
+            'session_id': session_id,
+            'user_agent': self.user_agent,
+            'ip_address': self.ip_address,
+            'created_at': self.first_seen,
+            'last_active': self.last_active,
+            'total_messages': self.messages,
+            'total_conversations': self.conversations
+        }
+
+
+def upsert_activity(rows):
+    """Create or bump agent_sessions rows in one statement within the current transaction"""
+    table = AgentSession.__table__
+    stmt = upsert_insert(db.engine.dialect.name)(table)
+    stmt = stmt.on_conflict_do_update(index_elements=[table.c.session_id], set_={
+        'last_active': case(
+            (stmt.excluded.last_active > table.c.last_active, stmt.excluded.last_active),
+            else_=table.c.last_active
+        ),
+        'total_messages': table.c.total_messages + stmt.excluded.total_messages,
+        'total_conversations': table.c.total_conversations + stmt.excluded.total_conversations
+    })
+    db.session.execute(stmt, rows)
+
+
+class ActivityTracker:
+    """Accumulates session activity in memory and writes it in batched upserts.
+
+    Chat turns only bump in-memory counters; a background thread flushes
+    them at most ``flush_interval`` seconds later (sooner once
+    ``max_pending`` sessions are waiting) as one upsert, and ``close()``
+    flushes on shutdown. Counters are per worker, so the database is always
+    behind by at most one interval; ``session_stats`` adds what is pending.
+    """
+
+    def __init__(self, app, flush_interval=5.0, max_pending=1000):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.flushes = 0
+        self._pending = {}
+        self._flushing = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name='session-activity', daemon=True)
+        self._thread.start()
+
+    def record(self, session_id, messages=0, conversations=0, at=None, user_agent=None, ip_address=None):
+        activity = SessionActivity(at or datetime.utcnow(), user_agent, ip_address)
+        activity.messages = messages
+        activity.conversations = conversations
+        with self._lock:
+            if session_id in self._pending:
+                self._pending[session_id].add(activity)
+            else:
+                self._pending[session_id] = activity
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.set()
+
+    def pending(self, session_id):
+        """Activity of a session that is not in the database yet, or None"""
+        with self._lock:
+            merged = None
+            for source in (self._flushing, self._pending):
+                activity = source.get(session_id)
+                if activity is None:
+                    continue
+                if merged is None:
+                    merged = SessionActivity(activity.first_seen, activity.user_agent, activity.ip_address)
+                merged.add(activity)
+            return merged
+
+    def flush(self):
+        """Write all pending activity; returns the number of sessions written"""
+        with self._flush_lock:
+            with self._lock:
+                self._flushing, self._pending = self._pending, {}
+            if not self._flushing:
+                return 0
+            rows = [activity.to_row(session_id) for session_id, activity in self._flushing.items()]
+            try:
+                writer = self.app.extensions.get('chat_writer')
+                if writer is not None and writer.running:
+                    # A second SQLite writer would make group-committed turns fail
+                    # with "database is locked", so ride along in the next batch
+                    writer.submit(lambda: upsert_activity(rows)).result(timeout=writer.result_timeout)
+                else:
+                    with self.app.app_context():
+                        try:
+                            upsert_activity(rows)
+                            db.session.commit()
+                        finally:
+                            db.session.remove()
+            except Exception:
+                # Keep the counts for the next attempt
+                with self._lock:
+                    for session_id, activity in self._flushing.items():
+                        if session_id in self._pending:
+                            activity.add(self._pending[session_id])
+                        self._pending[session_id] = activity
+                    self._flushing = {}
+                raise
+            with self._lock:
+                written, self._flushing = len(self._flushing), {}
+            self.flushes += 1
+            return written
+
+    def close(self):
+        """Stop the flush thread and write whatever is still pending"""
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopping:
+                return
+            try:
+                self.flush()
+            except Exception:
+                pass  # Retried on the next interval
+
+
+def record_activity(turn, app=None):
+    """Count a committed chat turn towards its session's activity"""
+    tracker = (app or current_app).extensions.get('session_activity')
+    if tracker is not None:
+        tracker.record(
+            turn.session_id,
+            messages=2,
+            conversations=1 if turn.new_conversation else 0,
+            at=turn.received_at,
+            user_agent=turn.user_agent,
+            ip_address=turn.ip_address
+        )
+
+
+def session_stats(session_id):
+    """Persisted session stats with not yet flushed activity added, or None"""
+    agent_session = AgentSession.query.filter_by(session_id=session_id).first()
+    tracker = current_app.extensions.get('session_activity')
+    pending = tracker.pending(session_id) if tracker is not None else None
+    if agent_session is None and pending is None:
+        return None
+
+    if agent_session is None:
+        stats = {
+            'id': None,
+            'session_id': session_id,
+            'created_at': pending.first_seen.isoformat(),
+            'last_active': pending.last_active.isoformat(),
+            'total_messages': 0,
+            'total_conversations': 0
+        }
+    else:
+        stats = agent_session.to_dict()
+        if pending is not None and pending.last_active > agent_session.last_active:
+            stats['last_active'] = pending.last_active.isoformat()
+    if pending is not None:
+        stats['total_messages'] += pending.messages
+        stats['total_conversations'] += pending.conversations
+    return stats
+
+
+def init_activity(app):
+    """Start the session activity tracker; an interval of 0 writes activity with each turn"""
+    app.config.setdefault('SESSION_ACTIVITY_FLUSH_INTERVAL', float(os.environ.get('SESSION_ACTIVITY_FLUSH_INTERVAL', 5)))
+    app.config.setdefault('SESSION_ACTIVITY_MAX_PENDING', int(os.environ.get('SESSION_ACTIVITY_MAX_PENDING', 1000)))
+
+    if not app.config['SESSION_ACTIVITY_FLUSH_INTERVAL']:
+        return None
+
+    tracker = ActivityTracker(
+        app,
+        flush_interval=app.config['SESSION_ACTIVITY_FLUSH_INTERVAL'],
+        max_pending=app.config['SESSION_ACTIVITY_MAX_PENDING']
+    )
+    app.extensions['session_activity'] = tracker
+    atexit.register(tracker.close)
+    return tracker
@@ -0,0 +1,263 @@
+import importlib
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify, request, session
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+
+class MemoryRateLimitStore:
+    """Token buckets kept in this process.
+
+    A store shared by all workers (for example Redis running the same
+    check-then-take arithmetic over all keys in one Lua script) can be
+    configured instead through ``RATE_LIMIT_STORE``; it only needs the same
+    ``take`` method.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        # Least recently used first
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, buckets, cost=1):
+        """Take ``cost`` tokens from every one of ``buckets``, or from none of them.
+
+        ``buckets`` are ``(key, rate, burst)`` with ``rate`` in tokens per
+        second. Every bucket is refilled and checked before any is charged,
+        so a request one limit refuses does not spend another's tokens. A
+        cost above ``burst`` is allowed from a full bucket and leaves it in
+        debt, so the tokens are still paid back before the next request.
+        Returns None when the tokens were taken, otherwise ``(key,
+        retry_after)`` for the bucket with the longest wait until enough
+        tokens are back.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            refused = None
+            for key, rate, burst in buckets:
+                # Popped and put back so the dict stays in least recently used order
+                tokens, updated = self._buckets.pop(key, None) or (burst, now)
+                tokens = min(burst, tokens + (now - updated) * rate)
+                levels.append((key, tokens))
+                needed = min(cost, burst)
+                if tokens < needed and (refused is None or (needed - tokens) / rate > refused[1]):
+                    refused = (key, (needed - tokens) / rate)
+            for key, tokens in levels:
+                self._buckets[key] = (tokens if refused else tokens - cost, now)
+            self._prune()
+            return refused
+
+    def _prune(self):
+        # The least recently used buckets go first; they are the ones most
+        # likely to have refilled anyway
+        while len(self._buckets) > self.max_keys:
+            del self._buckets[next(iter(self._buckets))]
+
+
+class ConcurrencyLimiter:
+    """Caps requests in flight, with a bounded queue of requests waiting for a slot"""
+
+    def __init__(self, max_in_flight, max_queued, max_wait):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Take a slot, waiting up to ``max_wait``; False means shed the request"""
+        with self._condition:
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                return True
+            if self.waiting >= self.max_queued:
+                return False
+            self.waiting += 1
+            try:
+                if not self._condition.wait_for(lambda: self.in_flight < self.max_in_flight, self.max_wait):
+                    return False
+                self.in_flight += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+
+class AdmissionController:
+    """Per-session and per-IP token buckets in front of a concurrency cap"""
+
+    def __init__(self, store, limits, limiter=None, retry_after=1):
+        self.store = store
+        # kind -> (tokens per second, burst)
+        self.limits = limits
+        self.limiter = limiter
+        self.retry_after = retry_after
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed = 0
+
+    def check_rate_limits(self, keys, cost=1):
+        """Charge every limited bucket of ``keys`` or none; ``(kind, retry_after)`` when one is exhausted, else None"""
+        buckets = {}
+        for kind, value in keys:
+            if value is None or kind not in self.limits:
+                continue
+            rate, burst = self.limits[kind]
+            buckets[f'rate:{kind}:{value}'] = (kind, rate, burst)
+        if not buckets:
+            return None
+        refused = self.store.take([(key, rate, burst) for key, (_, rate, burst) in buckets.items()], cost)
+        if refused is None:
+            return None
+        self.rate_limited += 1
+        key, retry_after = refused
+        return buckets[key][0], retry_after
+
+    def stats(self):
+        stats = {
+            'admitted': self.admitted,
+            'rate_limited': self.rate_limited,
+            'shed': self.shed,
+            'limits': {kind: {'per_minute': rate * 60, 'burst': burst} for kind, (rate, burst) in self.limits.items()}
+        }
+        if self.limiter is not None:
+            stats.update({
+                'in_flight': self.limiter.in_flight,
+                'waiting': self.limiter.waiting,
+                'max_in_flight': self.limiter.max_in_flight,
+                'max_queued': self.limiter.max_queued
+            })
+        return stats
+
+
+def _retry_after_response(body, status, seconds):
+    response = jsonify(body)
+    response.headers['Retry-After'] = str(max(1, math.ceil(seconds)))
+    return response, status
+
+
+def admission_control(view=None, cost=None):
+    """Rate-limit a view per session and IP, and cap how many run at once.
+
+    Requests without a session share a session bucket per address. Exhausted
+    buckets answer 429, a full server 503, both with Retry-After.
+    A streamed response keeps its slot until the stream is closed. ``cost``
+    returns how many tokens the current request takes (default 1), for
+    views doing the work of several requests at once.
+    """
+    if view is None:
+        return lambda view: admission_control(view, cost)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        controller = current_app.extensions.get('admission')
+        if controller is None:
+            return view(*args, **kwargs)
+
+        # A client without a session cookie (yet) is limited by its address
+        session_key = session.get('session_id') or f'address:{request.remote_addr}'
+        limited = controller.check_rate_limits(
+            (('session', session_key), ('ip', request.remote_addr)), cost() if cost else 1
+        )
+        if limited:
+            kind, retry_after = limited
+            return _retry_after_response(
+                {'error': 'Rate limit exceeded, slow down', 'limit': kind, 'retry_after': math.ceil(retry_after)},
+                429, retry_after
+            )
+
+        limiter = controller.limiter
+        if limiter is None:
+            controller.admitted += 1
+            return view(*args, **kwargs)
+        if not limiter.acquire():
+            controller.shed += 1
+            return _retry_after_response(
+                {'error': 'Server is busy, try again shortly'}, 503, controller.retry_after
+            )
+
+        controller.admitted += 1
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+        except Exception:
+            limiter.release()
+            raise
+        if response.is_streamed:
+            response.call_on_close(limiter.release)
+        else:
+            limiter.release()
+        return response
+
+    return wrapper
+
+
+def _per_second(per_minute):
+    return per_minute / 60
+
+
+def trust_proxies(app):
+    """Take the client address from X-Forwarded-For when TRUSTED_PROXY_HOPS proxies sit in front.
+
+    Without it every client behind a load balancer has the balancer's
+    address, so per-IP limits and idempotency scopes would be shared by all.
+    """
+    app.config.setdefault('TRUSTED_PROXY_HOPS', int(os.environ.get('TRUSTED_PROXY_HOPS', 0)))
+    hops = app.config['TRUSTED_PROXY_HOPS']
+    if hops and not isinstance(app.wsgi_app, ProxyFix):
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+
+def init_admission(app):
+    """Set up chat rate limits and the in-flight cap; a limit of 0 turns it off.
+
+    Behind a proxy the per-IP limit needs TRUSTED_PROXY_HOPS, which makes
+    ``remote_addr`` the real client; otherwise every client shares the
+    proxy's bucket.
+    """
+    trust_proxies(app)
+    app.config.setdefault('RATE_LIMIT_SESSION_PER_MINUTE', float(os.environ.get('RATE_LIMIT_SESSION_PER_MINUTE', 20)))
+    app.config.setdefault('RATE_LIMIT_SESSION_BURST', int(os.environ.get('RATE_LIMIT_SESSION_BURST', 5)))
+    app.config.setdefault('RATE_LIMIT_IP_PER_MINUTE', float(os.environ.get('RATE_LIMIT_IP_PER_MINUTE', 60)))
+    app.config.setdefault('RATE_LIMIT_IP_BURST', int(os.environ.get('RATE_LIMIT_IP_BURST', 15)))
+    app.config.setdefault('RATE_LIMIT_STORE', os.environ.get('RATE_LIMIT_STORE'))
+    app.config.setdefault('CHAT_MAX_IN_FLIGHT', int(os.environ.get('CHAT_MAX_IN_FLIGHT', 16)))
+    app.config.setdefault('CHAT_MAX_QUEUED', int(os.environ.get('CHAT_MAX_QUEUED', 8)))
+    app.config.setdefault('CHAT_QUEUE_TIMEOUT', float(os.environ.get('CHAT_QUEUE_TIMEOUT', 1)))
+
+    limits = {}
+    if app.config['RATE_LIMIT_SESSION_PER_MINUTE']:
+        limits['session'] = (_per_second(app.config['RATE_LIMIT_SESSION_PER_MINUTE']), app.config['RATE_LIMIT_SESSION_BURST'])
+    if app.config['RATE_LIMIT_IP_PER_MINUTE']:
+        limits['ip'] = (_per_second(app.config['RATE_LIMIT_IP_PER_MINUTE']), app.config['RATE_LIMIT_IP_BURST'])
+
+    limiter = None
+    if app.config['CHAT_MAX_IN_FLIGHT']:
+        limiter = ConcurrencyLimiter(
+            app.config['CHAT_MAX_IN_FLIGHT'],
+            app.config['CHAT_MAX_QUEUED'],
+            app.config['CHAT_QUEUE_TIMEOUT']
+        )
+
+    if not limits and limiter is None:
+        return None
+
+    if app.config['RATE_LIMIT_STORE']:
+        module_name, _, class_name = app.config['RATE_LIMIT_STORE'].rpartition('.')
+        store = getattr(importlib.import_module(module_name), class_name)()
+    else:
+        store = MemoryRateLimitStore()
+
+    controller = AdmissionController(store, limits, limiter, retry_after=app.config['CHAT_QUEUE_TIMEOUT'])
+    app.extensions['admission'] = controller
+    return controller
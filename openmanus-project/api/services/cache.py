@@ -0,0 +1,177 @@
+import hashlib
+import importlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import current_app
+
+# Default TTL of cached pages with and without a shared TRANSCRIPT_CACHE_BACKEND
+SHARED_CACHE_TTL = 60
+LOCAL_CACHE_TTL = 5
+
+
+class LRUCacheBackend:
+    """In-process LRU store bounded by entry count and total size.
+
+    Any object with the same ``get(key)`` / ``set(key, value, ttl, size)``
+    methods (for example a thin Redis wrapper) can be configured instead
+    through ``TRANSCRIPT_CACHE_BACKEND`` to share the cache between workers.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None, size=0):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            expires_at = time.monotonic() + ttl if ttl else None
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+
+class CachedTranscript:
+    """A serialized response body with the validators sent alongside it"""
+
+    def __init__(self, body, session_id, last_modified):
+        self.body = body
+        self.session_id = session_id
+        self.last_modified = last_modified
+        self.etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+
+
+class TranscriptCache:
+    """Read-through cache of serialized conversation transcripts.
+
+    Entries are keyed on the conversation's current generation, a token that
+    every write replaces. Invalidating a conversation therefore only rewrites
+    one small key; superseded pages are never read again and age out of the
+    backend by LRU or TTL.
+    """
+
+    def __init__(self, backend, ttl=SHARED_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _generation(self, conversation_id):
+        key = f'transcript-generation:{conversation_id}'
+        generation = self.backend.get(key)
+        if generation is None:
+            # A fresh token rather than a counter, so an evicted generation
+            # can never bring old pages back to life.
+            generation = uuid.uuid4().hex
+            self.backend.set(key, generation, None, 0)
+        return generation
+
+    def lookup(self, conversation_id, page_key):
+        """Return ``(key, transcript)``; store a miss with ``put(key, ...)``.
+
+        The key pins the generation seen before the database is read, so a
+        write that lands in between can't get its stale page cached.
+        """
+        key = f'transcript:{conversation_id}:{self._generation(conversation_id)}:{page_key}'
+        transcript = self.backend.get(key)
+        if transcript is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return key, transcript
+
+    def put(self, key, transcript):
+        self.backend.set(key, transcript, self.ttl, len(transcript.body))
+
+    def invalidate(self, conversation_id):
+        self.backend.set(f'transcript-generation:{conversation_id}', uuid.uuid4().hex, None, 0)
+
+    def stats(self):
+        stats = {'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl}
+        if hasattr(self.backend, 'stats'):
+            stats.update(self.backend.stats())
+        return stats
+
+
+def invalidate_transcript(conversation_id, app=None):
+    """Drop cached transcripts of a conversation after it has been written to"""
+    cache = (app or current_app).extensions.get('transcript_cache')
+    if cache is not None:
+        cache.invalidate(conversation_id)
+
+
+def _load_backend(path, **kwargs):
+    module_name, _, class_name = path.rpartition('.')
+    return getattr(importlib.import_module(module_name), class_name)(**kwargs)
+
+
+def init_cache(app):
+    """Create the transcript cache; a size of 0 disables it.
+
+    Generations live in the cache backend, so with the default in-process
+    LRU each worker only sees its own invalidations: a write handled by one
+    worker leaves the other workers serving their cached pages until the TTL
+    expires. The TTL therefore defaults to a few seconds unless
+    ``TRANSCRIPT_CACHE_BACKEND`` names a store shared between workers.
+    """
+    app.config.setdefault('TRANSCRIPT_CACHE_SIZE', int(os.environ.get('TRANSCRIPT_CACHE_SIZE', 1024)))
+    app.config.setdefault('TRANSCRIPT_CACHE_MAX_BYTES', int(os.environ.get('TRANSCRIPT_CACHE_MAX_BYTES', 64 * 1024 * 1024)))
+    app.config.setdefault('TRANSCRIPT_CACHE_BACKEND', os.environ.get('TRANSCRIPT_CACHE_BACKEND'))
+    default_ttl = SHARED_CACHE_TTL if app.config['TRANSCRIPT_CACHE_BACKEND'] else LOCAL_CACHE_TTL
+    app.config.setdefault('TRANSCRIPT_CACHE_TTL', float(os.environ.get('TRANSCRIPT_CACHE_TTL', default_ttl)))
+
+    if not app.config['TRANSCRIPT_CACHE_SIZE']:
+        return None
+
+    if app.config['TRANSCRIPT_CACHE_BACKEND']:
+        backend = _load_backend(app.config['TRANSCRIPT_CACHE_BACKEND'])
+    else:
+        backend = LRUCacheBackend(
+            max_entries=app.config['TRANSCRIPT_CACHE_SIZE'],
+            max_bytes=app.config['TRANSCRIPT_CACHE_MAX_BYTES']
+        )
+
+    cache = TranscriptCache(backend, ttl=app.config['TRANSCRIPT_CACHE_TTL'])
+    app.extensions['transcript_cache'] = cache
+    return cache
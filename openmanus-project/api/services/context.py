@@ -0,0 +1,240 @@
+import importlib
+import os
+import re
+import time
+
+from flask import current_app
+from sqlalchemy import select
+
+from src.models.user import db
+from src.models.chat import Conversation, Message
+from src.services.intent import classify_message
+from src.services.retention import restore_conversation
+
+# Words and single punctuation marks: close enough to a subword tokenizer's
+# count for budgeting, and cheap enough to run on every write
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Tokens every message costs on top of its content (role and separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Messages read per round trip while walking a conversation
+CONTEXT_PAGE_SIZE = 50
+
+# Messages read per chunk while backfilling token_count
+BACKFILL_CHUNK_SIZE = 1000
+
+SENTENCE_PATTERN = re.compile(r'[^.!?\n]*[.!?]?')
+
+
+def _commit(write):
+    """Run ``write`` and commit it, inside the group-commit writer's next batch when it is running"""
+    writer = current_app.extensions.get('chat_writer')
+    if writer is not None and writer.running:
+        # A second SQLite writer would make group-committed turns fail
+        # with "database is locked"
+        return writer.submit(write).result(timeout=writer.result_timeout)
+    result = write()
+    db.session.commit()
+    return result
+
+
+def count_tokens(text):
+    return sum(1 for _ in TOKEN_PATTERN.finditer(text)) if text else 0
+
+
+def last_tokens(text, max_tokens):
+    """The end of ``text`` holding at most ``max_tokens`` tokens"""
+    if max_tokens <= 0:
+        return ''
+    starts = [match.start() for match in TOKEN_PATTERN.finditer(text)]
+    if len(starts) <= max_tokens:
+        return text
+    return text[starts[-max_tokens]:]
+
+
+class ContextWindow:
+    """What the model sees for a turn: the rolling summary, then the latest messages oldest first"""
+
+    def __init__(self, summary=None, summary_tokens=0, messages=()):
+        self.summary = summary
+        self.summary_tokens = summary_tokens
+        self.messages = list(messages)
+
+    @property
+    def token_count(self):
+        return self.summary_tokens + sum(message['tokens'] for message in self.messages)
+
+    def to_dict(self):
+        return {
+            'tokens': self.token_count,
+            'summary_tokens': self.summary_tokens,
+            'messages': len(self.messages),
+            'oldest_message_id': self.messages[0]['id'] if self.messages else None
+        }
+
+
+class StubLLM:
+    """Offline stand-in for a model backend.
+
+    Answers with the intent rules' response and summarizes extractively (the
+    first sentence of each message), optionally taking as long as a model
+    would for the prompt, so the context pipeline can be load-tested
+    without one. A real backend needs the same ``complete`` and
+    ``summarize`` methods.
+    """
+
+    def __init__(self, seconds_per_1k_tokens=0):
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+
+    def complete(self, window, user_message):
+        prompt_tokens = window.token_count + count_tokens(user_message)
+        if self.seconds_per_1k_tokens:
+            time.sleep(prompt_tokens / 1000 * self.seconds_per_1k_tokens)
+        return classify_message(user_message)['content']
+
+    def summarize(self, summary, messages, max_tokens):
+        """Fold ``messages`` into ``summary``, keeping at most ``max_tokens`` of the newest tokens"""
+        lines = [summary] if summary else []
+        for message in messages:
+            lines.append(f"{message['role']}: {SENTENCE_PATTERN.match(message['content']).group(0)[:200]}")
+        return last_tokens('\n'.join(lines), max_tokens)
+
+
+class ContextBuilder:
+    """Builds token-budgeted context windows for conversations.
+
+    The latest messages are read newest first in keyset pages over
+    (conversation_id, id) until the budget is used up, so a turn costs the
+    same however long its conversation is. Messages that drop out of the
+    window are folded into the conversation's rolling summary once, a turn's
+    worth at a time, and never read again.
+    """
+
+    def __init__(self, llm, budget=3000, summary_tokens=500, page_size=CONTEXT_PAGE_SIZE):
+        self.llm = llm
+        self.budget = budget
+        self.summary_tokens = summary_tokens
+        self.page_size = page_size
+
+    def build(self, conversation_id, user_message=''):
+        """The context for the next turn of a conversation, empty for a new one"""
+        if conversation_id is None:
+            return ContextWindow()
+        state = db.session.execute(
+            select(Conversation.summary, Conversation.summary_through_id, Conversation.summary_token_count,
+                   Conversation.archived_at)
+            .where(Conversation.id == conversation_id)
+        ).one_or_none()
+        if state is None:
+            return ContextWindow()
+        summary, through_id, summary_tokens, archived_at = state
+        if archived_at is not None:
+            # The turn being answered is about to be saved to it anyway
+            _commit(lambda: restore_conversation(conversation_id))
+
+        # Room for the summary at its largest and for the new message
+        available = self.budget - self.summary_tokens - count_tokens(user_message) - MESSAGE_OVERHEAD_TOKENS
+        messages = []
+        used = 0
+        evicted_through = None
+        before = None
+        while evicted_through is None:
+            query = select(Message.id, Message.message_type, Message.content, Message.token_count).where(
+                Message.conversation_id == conversation_id, Message.id > through_id
+            )
+            if before is not None:
+                query = query.where(Message.id < before)
+            rows = db.session.execute(query.order_by(Message.id.desc()).limit(self.page_size)).all()
+            for message_id, role, content, tokens in rows:
+                tokens = (count_tokens(content) if tokens is None else tokens) + MESSAGE_OVERHEAD_TOKENS
+                if used + tokens > available:
+                    evicted_through = message_id
+                    break
+                used += tokens
+                messages.append({'id': message_id, 'role': role, 'content': content, 'tokens': tokens})
+            if len(rows) < self.page_size:
+                break
+            before = rows[-1][0]
+        messages.reverse()
+
+        if evicted_through is not None:
+            summary, summary_tokens = self._fold(conversation_id, summary, through_id, evicted_through)
+        return ContextWindow(summary, summary_tokens, messages)
+
+    def _fold(self, conversation_id, summary, through_id, new_through_id):
+        """Summarize the messages after ``through_id`` up to ``new_through_id`` into the rolling summary"""
+        start = through_id
+        while start < new_through_id:
+            rows = db.session.execute(
+                select(Message.id, Message.message_type, Message.content)
+                .where(Message.conversation_id == conversation_id, Message.id > start, Message.id <= new_through_id)
+                .order_by(Message.id).limit(self.page_size)
+            ).all()
+            if not rows:
+                break
+            summary = self.llm.summarize(
+                summary, [{'role': role, 'content': content} for _, role, content in rows], self.summary_tokens
+            )
+            start = rows[-1][0]
+        summary_tokens = count_tokens(summary)
+
+        conversations = Conversation.__table__
+        # A concurrent turn that already moved the summary on wins; this one
+        # still uses what it folded
+        _commit(lambda: db.session.execute(
+            conversations.update()
+            .where(conversations.c.id == conversation_id, conversations.c.summary_through_id == through_id)
+            .values(summary=summary, summary_through_id=new_through_id, summary_token_count=summary_tokens,
+                    # Not an activity, keep the original timestamp
+                    updated_at=conversations.c.updated_at)
+        ))
+        return summary, summary_tokens
+
+
+def backfill_token_counts():
+    """Count the tokens of every message stored before token_count existed"""
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Message.id, Message.content)
+            .where(Message.id > last_id).order_by(Message.id).limit(BACKFILL_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        db.session.execute(
+            Message.__table__.update().where(Message.__table__.c.id == db.bindparam('message_id')),
+            [{'message_id': message_id, 'token_count': count_tokens(content)} for message_id, content in rows]
+        )
+        db.session.commit()
+        last_id = rows[-1][0]
+
+
+def init_context(app):
+    """Create the context builder when AGENT_LLM names a model backend.
+
+    ``AGENT_LLM`` is ``stub`` for StubLLM or the dotted path of a function
+    returning an object with the same methods; unset keeps the keyword
+    responses.
+    """
+    app.config.setdefault('AGENT_LLM', os.environ.get('AGENT_LLM', ''))
+    app.config.setdefault('CONTEXT_TOKEN_BUDGET', int(os.environ.get('CONTEXT_TOKEN_BUDGET', 3000)))
+    app.config.setdefault('CONTEXT_SUMMARY_TOKENS', int(os.environ.get('CONTEXT_SUMMARY_TOKENS', 500)))
+    app.config.setdefault('STUB_LLM_SECONDS_PER_1K_TOKENS', float(os.environ.get('STUB_LLM_SECONDS_PER_1K_TOKENS', 0)))
+
+    if not app.config['AGENT_LLM']:
+        return None
+
+    if app.config['AGENT_LLM'] == 'stub':
+        llm = StubLLM(app.config['STUB_LLM_SECONDS_PER_1K_TOKENS'])
+    else:
+        module_name, _, function_name = app.config['AGENT_LLM'].rpartition('.')
+        llm = getattr(importlib.import_module(module_name), function_name)()
+
+    builder = ContextBuilder(
+        llm,
+        budget=app.config['CONTEXT_TOKEN_BUDGET'],
+        summary_tokens=app.config['CONTEXT_SUMMARY_TOKENS']
+    )
+    app.extensions['context_builder'] = builder
+    return builder
@@ -0,0 +1,49 @@
+import importlib
+import os
+from functools import wraps
+
+from flask import current_app, request, session
+
+from openmanus_common.idempotency import IdempotencyGuard, MemoryIdempotencyStore
+
+from src.services.admission import trust_proxies
+
+
+def idempotent(view):
+    """Honour the Idempotency-Key header on a view, per session (or client address before there is one).
+
+    The client address is only the real one behind a proxy with
+    TRUSTED_PROXY_HOPS set; otherwise first requests share the proxy's scope.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        guard = current_app.extensions.get('idempotency')
+        if guard is None:
+            return view(*args, **kwargs)
+        return guard.call(view, args, kwargs, scope=session.get('session_id') or request.remote_addr)
+
+    return wrapper
+
+
+def init_idempotency(app):
+    """Set up Idempotency-Key handling; IDEMPOTENCY_MAX_KEYS=0 turns it off"""
+    # Scopes of requests without a session go by the client address
+    trust_proxies(app)
+    app.config.setdefault('IDEMPOTENCY_TTL', float(os.environ.get('IDEMPOTENCY_TTL', 86400)))
+    app.config.setdefault('IDEMPOTENCY_MAX_KEYS', int(os.environ.get('IDEMPOTENCY_MAX_KEYS', 10000)))
+    app.config.setdefault('IDEMPOTENCY_MAX_BYTES', int(os.environ.get('IDEMPOTENCY_MAX_BYTES', 32 * 1024 * 1024)))
+    app.config.setdefault('IDEMPOTENCY_WAIT_TIMEOUT', float(os.environ.get('IDEMPOTENCY_WAIT_TIMEOUT', 30)))
+    app.config.setdefault('IDEMPOTENCY_STORE', os.environ.get('IDEMPOTENCY_STORE'))
+
+    if not app.config['IDEMPOTENCY_MAX_KEYS']:
+        return None
+
+    if app.config['IDEMPOTENCY_STORE']:
+        module_name, _, class_name = app.config['IDEMPOTENCY_STORE'].rpartition('.')
+        store = getattr(importlib.import_module(module_name), class_name)()
+    else:
+        store = MemoryIdempotencyStore(app.config['IDEMPOTENCY_MAX_KEYS'], app.config['IDEMPOTENCY_MAX_BYTES'])
+
+    guard = IdempotencyGuard(store, ttl=app.config['IDEMPOTENCY_TTL'], wait_timeout=app.config['IDEMPOTENCY_WAIT_TIMEOUT'])
+    app.extensions['idempotency'] = guard
+    return guard
@@ -0,0 +1,58 @@
+from openmanus_common.intent import IntentClassifier
+
+# Ordered from most to least specific; the first matching rule wins.
+AGENT_RULES = [
+    (['website', 'web', 'browse', 'url', 'html', 'css'], {
+        "content": "I'll help you create a website! Let me start by understanding your requirements and then build the HTML, CSS, and any necessary JavaScript. I can create responsive designs, add interactive features, and ensure your site looks professional.",
+        "task": "Website development and design",
+        "tools": ["code", "file", "browser"]
+    }),
+    (['code', 'program', 'script', 'python', 'javascript', 'app'], {
+        "content": "I'll help you with coding! I can write, debug, and optimize code in various programming languages. Let me analyze your requirements and create the solution you need.",
+        "task": "Code development and programming",
+        "tools": ["code", "terminal", "file"]
+    }),
+    (['file', 'document', 'edit', 'write', 'text'], {
+        "content": "I'll help you work with files and documents. I can create, edit, organize, and manage various types of files. Let me handle the file operations for you.",
+        "task": "File management and document editing",
+        "tools": ["file", "terminal"]
+    }),
+    (['data', 'analyze', 'chart', 'graph', 'database', 'csv', 'excel'], {
+        "content": "I'll help you analyze data and create visualizations! I can process datasets, generate insights, create charts and graphs, and help you understand your data better.",
+        "task": "Data analysis and visualization",
+        "tools": ["database", "code", "image"]
+    }),
+    (['image', 'picture', 'generate', 'create', 'photo', 'design'], {
+        "content": "I'll help you work with images! I can generate new images, edit existing ones, create designs, and handle various image processing tasks.",
+        "task": "Image generation and processing",
+        "tools": ["image", "file"]
+    }),
+    (['search', 'find', 'lookup', 'research', 'information'], {
+        "content": "I'll help you research and find information! I can browse the web, search for specific topics, gather data, and provide you with comprehensive research results.",
+        "task": "Web research and information gathering",
+        "tools": ["browser", "file"]
+    }),
+]
+
+DEFAULT_RESPONSE = {
+    "content": "I understand your request! I'm a versatile AI agent that can help with web browsing, coding, file editing, data analysis, image generation, and much more. Let me work on this task for you.",
+    "task": "Processing your request using available tools",
+    "tools": ["terminal", "code", "file"]
+}
+
+
+classifier = IntentClassifier({'response': (AGENT_RULES, DEFAULT_RESPONSE)})
+
+
+def _copy(response):
+    return dict(response, tools=list(response['tools']))
+
+
+def classify_message(user_message):
+    """Return the content, task and tools for a user message"""
+    return _copy(classifier.classify(user_message)['response'])
+
+
+def classify_messages(user_messages):
+    """``classify_message`` for a batch of user messages; repeated messages are classified once"""
+    return [_copy(result['response']) for result in classifier.classify_many(user_messages)]
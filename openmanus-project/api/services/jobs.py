@@ -0,0 +1,169 @@
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the pool and its queue are full"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once cancellation has been requested"""
+
+
+class Job:
+    """A unit of agent work running on the job pool"""
+
+    def __init__(self, session_id):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_requested = threading.Event()
+        self._cancel_callbacks = []
+        self._future = None
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_requested.is_set()
+
+    def sleep(self, seconds):
+        """Wait like time.sleep, but stop early if the job gets cancelled"""
+        if self._cancel_requested.wait(seconds):
+            raise JobCancelled()
+
+    def check_cancelled(self):
+        if self.cancel_requested:
+            raise JobCancelled()
+
+    def on_cancel(self, callback):
+        """Call ``callback`` once cancellation is requested, right away if it already was"""
+        self._cancel_callbacks.append(callback)
+        if self.cancel_requested:
+            callback()
+
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed', 'cancelled')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class JobManager:
+    """Runs jobs on a bounded thread pool and keeps their results for polling.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queued`` more
+    wait for a worker; submitting beyond that raises ``JobQueueFull``.
+    Finished jobs are kept for ``result_ttl`` seconds.
+    """
+
+    def __init__(self, app, max_workers=4, max_queued=64, result_ttl=300):
+        self.app = app
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.result_ttl = timedelta(seconds=result_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chat-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def submit(self, session_id, fn, *args):
+        """Queue ``fn(job, *args)`` to run inside an app context"""
+        with self._lock:
+            self._prune()
+            if self._active >= self.max_workers + self.max_queued:
+                raise JobQueueFull()
+            job = Job(session_id)
+            self._jobs[job.id] = job
+            self._active += 1
+        job._future = self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def cancel(self, job):
+        """Cancel a job; queued jobs never start, running ones stop at their next check"""
+        job._cancel_requested.set()
+        for callback in list(job._cancel_callbacks):
+            callback()
+        if job._future is not None and job._future.cancel():
+            self._finish(job, 'cancelled')
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == 'running')
+            return {
+                'workers': self.max_workers,
+                'queue_depth': self.max_queued,
+                'running': running,
+                'queued': self._active - running
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job, fn, args):
+        if job.cancel_requested:
+            self._finish(job, 'cancelled')
+            return
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        try:
+            with self.app.app_context():
+                result = fn(job, *args)
+        except JobCancelled:
+            self._finish(job, 'cancelled')
+        except Exception as e:
+            self._finish(job, 'failed', error=str(e))
+        else:
+            self._finish(job, 'succeeded', result=result)
+
+    def _finish(self, job, status, result=None, error=None):
+        with self._lock:
+            if job.finished:
+                return
+            job.status = status
+            job.result = result
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            self._active -= 1
+
+    def _prune(self):
+        cutoff = datetime.utcnow() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+def init_jobs(app):
+    """Create the job pool used by asynchronous chat submissions"""
+    app.config.setdefault('CHAT_JOB_WORKERS', int(os.environ.get('CHAT_JOB_WORKERS', 4)))
+    app.config.setdefault('CHAT_JOB_QUEUE_DEPTH', int(os.environ.get('CHAT_JOB_QUEUE_DEPTH', 64)))
+    app.config.setdefault('CHAT_JOB_RESULT_TTL', int(os.environ.get('CHAT_JOB_RESULT_TTL', 300)))
+
+    manager = JobManager(
+        app,
+        max_workers=app.config['CHAT_JOB_WORKERS'],
+        max_queued=app.config['CHAT_JOB_QUEUE_DEPTH'],
+        result_ttl=app.config['CHAT_JOB_RESULT_TTL']
+    )
+    app.extensions['chat_jobs'] = manager
+    return manager
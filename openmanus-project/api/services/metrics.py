@@ -0,0 +1,8 @@
+from openmanus_common import metrics
+
+from src.models.user import db
+
+
+def init_metrics(app):
+    """Instrument every request and serve the results at /api/metrics (see openmanus_common.metrics)"""
+    return metrics.init_metrics(app, db)
@@ -0,0 +1,70 @@
+from flask import request
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def page_args():
+    """Read ``before``/``after``/``limit`` from the query string.
+
+    Raises ValueError when the cursors are malformed or both are given.
+    """
+    before = request.args.get('before')
+    after = request.args.get('after')
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE)
+
+    try:
+        before = int(before) if before is not None else None
+        after = int(after) if after is not None else None
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError('before, after and limit must be integers')
+    if before is not None and after is not None:
+        raise ValueError('Use either before or after, not both')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+
+    return before, after, min(limit, MAX_PAGE_SIZE)
+
+
+def keyset_page(query, column, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """Fetch one page of ``query`` keyed on ``column``, oldest first.
+
+    Without a cursor the page is the most recent ``limit`` rows. ``before``
+    walks back to older rows and ``after`` forward to newer ones; one extra
+    row is fetched to tell whether more exist in that direction.
+    """
+    if after is not None:
+        rows = query.filter(column > after).order_by(column.asc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    else:
+        if before is not None:
+            query = query.filter(column < before)
+        rows = query.order_by(column.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+
+    return rows, {
+        'limit': limit,
+        'has_more': has_more,
+        'before': getattr(rows[0], column.key) if rows else before,
+        'after': getattr(rows[-1], column.key) if rows else after
+    }
+
+
+def list_page(items, key, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """``keyset_page`` over dicts already in memory, sorted by ``key`` ascending"""
+    if after is not None:
+        selected = [item for item in items if item[key] > after]
+        rows = selected[:limit]
+    else:
+        selected = [item for item in items if before is None or item[key] < before]
+        rows = selected[-limit:]
+
+    return rows, {
+        'limit': limit,
+        'has_more': len(selected) > limit,
+        'before': rows[0][key] if rows else before,
+        'after': rows[-1][key] if rows else after
+    }
@@ -0,0 +1,311 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event
+
+from src.models.user import db
+from src.models.chat import Conversation, Message
+from src.services.activity import SessionActivity, record_activity, upsert_activity
+from src.services.cache import invalidate_transcript
+from src.services.context import count_tokens
+from src.services.retention import restore_conversation
+from src.services.usage import count_usage, record_usage, tools_mask
+
+# Length of the last-message preview stored on each conversation
+MESSAGE_PREVIEW_LENGTH = 200
+
+
+class ChatTurn:
+    """Everything one /api/chat request writes, persisted as a single unit"""
+
+    def __init__(self, session_id, user_message, response_data,
+                 user_agent=None, ip_address=None, received_at=None,
+                 conversation_id=None, start_conversation=False):
+        self.session_id = session_id
+        self.user_message = user_message
+        self.response_data = response_data
+        self.user_agent = user_agent
+        self.ip_address = ip_address
+        self.received_at = received_at or datetime.utcnow()
+        # Without either, the turn goes to the session's latest conversation
+        self.conversation_id = conversation_id
+        self.start_conversation = start_conversation
+
+        # Filled in once the turn has been written
+        self.new_conversation = False
+        self.user_message_id = None
+        self.message_id = None
+
+
+def _new_conversation(turn):
+    user_message = turn.user_message
+    conversation = Conversation(
+        session_id=turn.session_id,
+        title=user_message[:50] + "..." if len(user_message) > 50 else user_message
+    )
+    db.session.add(conversation)
+    turn.new_conversation = True
+    return conversation
+
+
+def _stage_turns(turns, usage=None):
+    """Add every row of some chat turns to the current session with a single flush.
+
+    Turns are applied in order, so a turn without a conversation goes to
+    whichever conversation the previous turn of its session wrote to, exactly
+    as if they had been sent one by one. Their usage counts are upserted last,
+    or added to the ``usage`` Counter for the caller to record.
+    """
+    targets = {turn.conversation_id for turn in turns if turn.conversation_id is not None}
+    conversations = {}
+    if targets:
+        conversations = {
+            conversation.id: conversation
+            for conversation in Conversation.query.filter(Conversation.id.in_(targets))
+        }
+    latest = {}
+    added = {}
+    staged = []
+    now = datetime.utcnow()
+    for turn in turns:
+        if turn.start_conversation:
+            conversation = _new_conversation(turn)
+        elif turn.conversation_id is not None:
+            conversation = conversations[turn.conversation_id]
+        else:
+            if turn.session_id not in latest:
+                latest[turn.session_id] = Conversation.query.filter_by(session_id=turn.session_id).order_by(Conversation.updated_at.desc()).first()
+            conversation = latest[turn.session_id] or _new_conversation(turn)
+        latest[turn.session_id] = conversation
+        if conversation.archived_at is not None:
+            # Written to again, so it is hot: its messages go back to the table
+            restore_conversation(conversation.id)
+            conversation.archived_at = None
+
+        user_msg = Message(
+            conversation=conversation,
+            message_type='user',
+            content=turn.user_message,
+            token_count=count_tokens(turn.user_message),
+            timestamp=turn.received_at
+        )
+        assistant_msg = Message(
+            conversation=conversation,
+            message_type='assistant',
+            content=turn.response_data["content"],
+            token_count=count_tokens(turn.response_data["content"]),
+            task_description=turn.response_data["task"],
+            tools_used=turn.response_data["tools"],
+            tools_mask=tools_mask(turn.response_data["tools"]),
+            processing_time=turn.response_data.get("processing_time"),
+            # The day usage_daily counts this turn under
+            timestamp=now
+        )
+        db.session.add_all([user_msg, assistant_msg])
+        added[conversation] = added.get(conversation, 0) + 2
+        conversation.last_message_preview = assistant_msg.content[:MESSAGE_PREVIEW_LENGTH]
+        staged.append((turn, conversation, user_msg, assistant_msg))
+
+    for conversation, count in added.items():
+        conversation.updated_at = now
+        conversation.last_message_at = now
+        if conversation.id is None:
+            conversation.message_count = count
+        else:
+            # Increment in SQL so concurrent turns on one conversation add up
+            conversation.message_count = Conversation.message_count + count
+    db.session.flush()
+
+    if 'session_activity' not in current_app.extensions:
+        activities = {}
+        for turn in turns:
+            activity = SessionActivity(turn.received_at, turn.user_agent, turn.ip_address)
+            activity.messages = 2
+            activity.conversations = 1 if turn.new_conversation else 0
+            if turn.session_id in activities:
+                activities[turn.session_id].add(activity)
+            else:
+                activities[turn.session_id] = activity
+        upsert_activity([activity.to_row(session_id) for session_id, activity in activities.items()])
+
+    for turn, conversation, user_msg, assistant_msg in staged:
+        turn.conversation_id = conversation.id
+        turn.user_message_id = user_msg.id
+        turn.message_id = assistant_msg.id
+
+    counts = count_usage(
+        (now.date(), turn.response_data["task"], turn.response_data["tools"]) for turn in turns
+    )
+    if usage is None:
+        # Every turn of the day updates the same rows; the last write holds their locks the shortest
+        record_usage(counts)
+    else:
+        usage.update(counts)
+    return turns
+
+
+def _stage_turn(turn):
+    """Add every row of a chat turn to the current session and flush it"""
+    return _stage_turns([turn])[0]
+
+
+def save_chat_turn(turn):
+    """Persist a chat turn in one transaction and return it with its ids.
+
+    When group commit is enabled the turn is handed to the background writer
+    and this call blocks until the batch containing it has been committed.
+    """
+    writer = current_app.extensions.get('chat_writer')
+    if writer is not None:
+        return writer.submit(turn).result(timeout=writer.result_timeout)
+
+    _stage_turn(turn)
+    db.session.commit()
+    invalidate_transcript(turn.conversation_id)
+    record_activity(turn)
+    return turn
+
+
+def save_chat_turns(turns):
+    """Persist many chat turns in one transaction: all of them are written or none"""
+    writer = current_app.extensions.get('chat_writer')
+    if writer is not None:
+        writer.submit(lambda: _stage_turns(turns)).result(timeout=writer.result_timeout)
+    else:
+        _stage_turns(turns)
+        db.session.commit()
+
+    for conversation_id in {turn.conversation_id for turn in turns}:
+        invalidate_transcript(conversation_id)
+    for turn in turns:
+        record_activity(turn)
+    return turns
+
+
+class GroupCommitWriter:
+    """Background writer that coalesces chat turns into batched transactions.
+
+    Turns submitted by concurrent requests are collected for at most
+    ``max_delay`` seconds (or until ``max_batch`` are waiting) and written
+    together with a single commit. Each turn is staged inside a savepoint, so
+    a bad turn fails only its own request and not the rest of the batch. The
+    usage_daily counts of the batch's turns go in with one upsert at the end,
+    so concurrent turns don't queue on the same rollup rows.
+    """
+
+    def __init__(self, app, max_batch=64, max_delay=0.005, result_timeout=30):
+        self.app = app
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.result_timeout = result_timeout
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='chat-group-commit', daemon=True)
+        self._thread.start()
+
+    def submit(self, turn):
+        """Queue a chat turn, or a callable to run inside the next batch's transaction"""
+        future = Future()
+        self._queue.put((turn, future))
+        return future
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def close(self):
+        """Commit everything already submitted and stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stopping = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _commit(self, batch):
+        with self.app.app_context():
+            staged = []
+            usage = Counter()
+            for item, future in batch:
+                counts = Counter()
+                try:
+                    with db.session.begin_nested():
+                        result = _stage_turns([item], counts)[0] if isinstance(item, ChatTurn) else item()
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    usage.update(counts)
+                    staged.append((item, result, future))
+
+            try:
+                record_usage(usage)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                for _, _, future in staged:
+                    future.set_exception(e)
+            else:
+                for item, result, future in staged:
+                    if isinstance(item, ChatTurn):
+                        invalidate_transcript(item.conversation_id, self.app)
+                        record_activity(item, self.app)
+                    future.set_result(result)
+            finally:
+                db.session.remove()
+
+
+def _enable_wal(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.close()
+
+
+def init_persistence(app):
+    """Configure chat persistence, starting the group-commit writer if enabled"""
+    app.config.setdefault('CHAT_GROUP_COMMIT', os.environ.get('CHAT_GROUP_COMMIT', '0') == '1')
+    app.config.setdefault('CHAT_GROUP_COMMIT_MAX_BATCH', int(os.environ.get('CHAT_GROUP_COMMIT_MAX_BATCH', 64)))
+    app.config.setdefault('CHAT_GROUP_COMMIT_MAX_DELAY_MS', float(os.environ.get('CHAT_GROUP_COMMIT_MAX_DELAY_MS', 5)))
+
+    if not app.config['CHAT_GROUP_COMMIT']:
+        return None
+
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            # Readers keep going while the writer commits a batch
+            event.listen(engine, 'connect', _enable_wal)
+            engine.dispose()
+
+    writer = GroupCommitWriter(
+        app,
+        max_batch=app.config['CHAT_GROUP_COMMIT_MAX_BATCH'],
+        max_delay=app.config['CHAT_GROUP_COMMIT_MAX_DELAY_MS'] / 1000
+    )
+    app.extensions['chat_writer'] = writer
+    atexit.register(writer.close)
+    return writer
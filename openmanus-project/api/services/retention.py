@@ -0,0 +1,319 @@
+import atexit
+import json
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import delete, func, insert, select, text
+
+from src.models.user import db
+from src.models.chat import Conversation, ConversationArchive, Message
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, zlib is always there
+    zstandard = None
+
+# Conversations archived per transaction
+RETENTION_BATCH_SIZE = 10
+
+# Archives are written once and read rarely, so compress hard
+COMPRESSION_LEVELS = {'zlib': 9, 'zstd': 12}
+
+# Message columns kept in an archive, in payload order
+ARCHIVED_COLUMNS = ('id', 'message_type', 'content', 'timestamp', 'task_description',
+                    'tools_used', 'processing_time', 'tools_mask', 'token_count')
+
+
+def compress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=COMPRESSION_LEVELS['zstd']).compress(data)
+    return zlib.compress(data, COMPRESSION_LEVELS['zlib'])
+
+
+def decompress(data, codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('This archive is zstd-compressed, install zstandard to read it')
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def archived_rows(codec, payload):
+    """The message rows of an archive payload as dicts of ARCHIVED_COLUMNS, timestamps as ISO strings"""
+    return [dict(zip(ARCHIVED_COLUMNS, values)) for values in json.loads(decompress(payload, codec))]
+
+
+def _load_archive(conversation_id):
+    return db.session.execute(
+        select(ConversationArchive.codec, ConversationArchive.payload)
+        .where(ConversationArchive.conversation_id == conversation_id)
+    ).one_or_none()
+
+
+def archive_batch(cutoff, batch_size=RETENTION_BATCH_SIZE, codec='zlib'):
+    """Archive up to ``batch_size`` conversations not updated since ``cutoff``, in the current transaction.
+
+    Each conversation's messages are serialized into one compressed
+    conversation_archives row and deleted from messages, which also drops
+    them from the search index. Returns the counts of what was archived and
+    how many candidates there were.
+    """
+    conversations = Conversation.__table__
+    messages = Message.__table__
+    result = {'candidates': 0, 'conversations': 0, 'messages': 0, 'raw_bytes': 0, 'archived_bytes': 0}
+
+    # SQLite hands out the highest id plus one, so the conversation holding
+    # the newest message stays put; otherwise its ids could be reused
+    # before it is restored
+    newest = db.session.execute(
+        select(messages.c.conversation_id).order_by(messages.c.id.desc()).limit(1)
+    ).scalar()
+    candidates = db.session.execute(
+        select(conversations.c.id)
+        .where(conversations.c.archived_at.is_(None), conversations.c.updated_at < cutoff,
+               conversations.c.message_count > 0, conversations.c.id != newest)
+        .order_by(conversations.c.updated_at).limit(batch_size)
+    ).scalars().all()
+    result['candidates'] = len(candidates)
+
+    now = datetime.utcnow()
+    columns = [messages.c[name] for name in ARCHIVED_COLUMNS]
+    for conversation_id in candidates:
+        # Claim it before reading: on SQLite this takes the write lock, so no
+        # turn can land between reading the messages and deleting them
+        claimed = db.session.execute(
+            conversations.update()
+            .where(conversations.c.id == conversation_id, conversations.c.archived_at.is_(None),
+                   conversations.c.updated_at < cutoff)
+            .values(archived_at=now,
+                    # Not an activity, keep the original timestamp
+                    updated_at=conversations.c.updated_at)
+        ).rowcount
+        if not claimed:
+            continue
+
+        rows = db.session.execute(
+            select(*columns).where(messages.c.conversation_id == conversation_id).order_by(messages.c.id)
+        ).all()
+        data = json.dumps([list(row) for row in rows], separators=(',', ':'), default=_isoformat).encode()
+        payload = compress(data, codec)
+        db.session.execute(insert(ConversationArchive.__table__).values(
+            conversation_id=conversation_id, archived_at=now, codec=codec,
+            message_count=len(rows), raw_size=len(data), payload=payload
+        ))
+        if rows:
+            db.session.execute(delete(messages).where(
+                messages.c.conversation_id == conversation_id, messages.c.id <= rows[-1].id
+            ))
+
+        result['conversations'] += 1
+        result['messages'] += len(rows)
+        result['raw_bytes'] += len(data)
+        result['archived_bytes'] += len(payload)
+    return result
+
+
+def restore_conversation(conversation_id):
+    """Move an archived conversation's messages back into messages, in the current transaction.
+
+    Messages keep their ids, so cursors, ``summary_through_id`` and anything
+    else pointing at them stay valid.
+    """
+    conversations = Conversation.__table__
+    archive = _load_archive(conversation_id)
+    if archive is not None:
+        rows = archived_rows(archive.codec, archive.payload)
+        for row in rows:
+            row['conversation_id'] = conversation_id
+            row['timestamp'] = datetime.fromisoformat(row['timestamp']) if row['timestamp'] else None
+        if rows:
+            db.session.execute(insert(Message.__table__), rows)
+        db.session.execute(
+            delete(ConversationArchive.__table__).where(ConversationArchive.conversation_id == conversation_id)
+        )
+    db.session.execute(
+        conversations.update().where(conversations.c.id == conversation_id)
+        .values(archived_at=None, updated_at=conversations.c.updated_at)
+    )
+
+
+def archived_messages(conversation_id):
+    """Every message of an archived conversation, shaped like ``Message.to_dict()``, oldest first"""
+    archive = _load_archive(conversation_id)
+    messages = []
+    if archive is not None:
+        for row in archived_rows(archive.codec, archive.payload):
+            messages.append({
+                'id': row['id'],
+                'conversation_id': conversation_id,
+                'type': row['message_type'],
+                'content': row['content'],
+                'timestamp': row['timestamp'],
+                'task': row['task_description'],
+                'tools': row['tools_used'] or [],
+                'processing_time': row['processing_time']
+            })
+    # A turn that raced the archiving on a database without SQLite's single
+    # writer is still in messages, until the next turn restores the rest
+    messages.extend(message.to_dict() for message in Message.query.filter_by(conversation_id=conversation_id))
+    return sorted(messages, key=lambda message: message['id'])
+
+
+def retention_stats():
+    """How much the archive holds, and its size before and after compression"""
+    archives = ConversationArchive.__table__
+    row = db.session.execute(select(
+        func.count(), func.coalesce(func.sum(archives.c.message_count), 0),
+        func.coalesce(func.sum(archives.c.raw_size), 0), func.coalesce(func.sum(func.length(archives.c.payload)), 0)
+    )).one()
+    return {'conversations': row[0], 'messages': row[1], 'raw_bytes': row[2], 'archived_bytes': row[3]}
+
+
+class RetentionWorker:
+    """Archives conversations untouched for ``days`` days in small batches.
+
+    A pass runs at start and then every ``interval`` seconds. Each batch of
+    ``batch_size`` conversations is its own short transaction, followed by
+    a ``pause`` so waiting writers get the database in between; with group
+    commit on, batches ride along in the writer's transactions instead of
+    competing with it.
+    """
+
+    def __init__(self, app, days, interval=3600, batch_size=RETENTION_BATCH_SIZE, codec='zlib', pause=0.05, start=True):
+        self.app = app
+        self.days = days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.codec = codec
+        self.pause = pause
+        self.passes = 0
+        self.last_pass = None
+        self._pass_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        if start:
+            self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+            self._thread.start()
+
+    def run_once(self, days=None):
+        """Archive everything that is cold right now; returns the totals of the pass"""
+        with self._pass_lock:
+            cutoff = datetime.utcnow() - timedelta(days=self.days if days is None else days)
+            totals = {'conversations': 0, 'messages': 0, 'raw_bytes': 0, 'archived_bytes': 0}
+            started = time.perf_counter()
+            while not self._stopping:
+                batch = self._run_batch(cutoff)
+                for key in totals:
+                    totals[key] += batch[key]
+                if batch['candidates'] < self.batch_size or not batch['conversations']:
+                    break
+                time.sleep(self.pause)
+            totals['seconds'] = round(time.perf_counter() - started, 3)
+            self.passes += 1
+            self.last_pass = totals
+            return totals
+
+    def stats(self):
+        return {'days': self.days, 'interval': self.interval, 'batch_size': self.batch_size, 'codec': self.codec,
+                'passes': self.passes, 'last_pass': self.last_pass}
+
+    def close(self):
+        """Stop after the current batch"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run_batch(self, cutoff):
+        writer = self.app.extensions.get('chat_writer')
+        if writer is not None and writer.running:
+            # A second SQLite writer would make group-committed turns fail
+            # with "database is locked"
+            return writer.submit(
+                lambda: archive_batch(cutoff, self.batch_size, self.codec)
+            ).result(timeout=writer.result_timeout)
+        with self.app.app_context():
+            try:
+                batch = archive_batch(cutoff, self.batch_size, self.codec)
+                db.session.commit()
+                return batch
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                self.run_once()
+            except Exception:
+                pass  # Retried on the next pass
+            self._wakeup.wait(self.interval)
+
+
+def _make_worker(app, days, start):
+    return RetentionWorker(
+        app, days,
+        interval=app.config['RETENTION_INTERVAL'],
+        batch_size=app.config['RETENTION_BATCH_SIZE'],
+        codec=app.config['RETENTION_CODEC'],
+        pause=app.config['RETENTION_BATCH_PAUSE_MS'] / 1000,
+        start=start
+    )
+
+
+def start_retention(app):
+    """Start archiving cold conversations in the background when RETENTION_DAYS is set"""
+    if not app.config['RETENTION_DAYS']:
+        return None
+
+    worker = _make_worker(app, app.config['RETENTION_DAYS'], start=True)
+    app.extensions['retention'] = worker
+    atexit.register(worker.close)
+    return worker
+
+
+def init_retention(app, start=True):
+    """Set up conversation archiving and the ``flask archive-conversations`` command.
+
+    The command runs one pass in the foreground. The background worker
+    starts here, or with ``start=False`` once ``start_retention`` is called.
+    """
+    app.config.setdefault('RETENTION_DAYS', float(os.environ.get('RETENTION_DAYS', 0)))
+    app.config.setdefault('RETENTION_INTERVAL', float(os.environ.get('RETENTION_INTERVAL', 3600)))
+    app.config.setdefault('RETENTION_BATCH_SIZE', int(os.environ.get('RETENTION_BATCH_SIZE', RETENTION_BATCH_SIZE)))
+    app.config.setdefault('RETENTION_BATCH_PAUSE_MS', float(os.environ.get('RETENTION_BATCH_PAUSE_MS', 50)))
+    app.config.setdefault('RETENTION_CODEC', os.environ.get('RETENTION_CODEC', 'zlib'))
+
+    codec = app.config['RETENTION_CODEC']
+    if codec not in COMPRESSION_LEVELS:
+        raise ValueError(f"RETENTION_CODEC must be one of {', '.join(COMPRESSION_LEVELS)}")
+    if codec == 'zstd' and zstandard is None:
+        raise ValueError('RETENTION_CODEC=zstd needs the zstandard package')
+
+    @app.cli.command('archive-conversations')
+    @click.option('--days', type=float, default=None, help='Archive conversations untouched for this many days (default RETENTION_DAYS).')
+    @click.option('--vacuum', is_flag=True, help='Give the freed space back to the filesystem afterwards (SQLite).')
+    def archive_conversations_command(days, vacuum):
+        """Archive cold conversations now, in small batches."""
+        days = app.config['RETENTION_DAYS'] if days is None else days
+        if not days:
+            raise click.UsageError('Pass --days or set RETENTION_DAYS')
+        totals = _make_worker(app, days, start=False).run_once()
+        click.echo(f"Archived {totals['messages']} messages of {totals['conversations']} conversations: "
+                   f"{totals['raw_bytes']} bytes stored in {totals['archived_bytes']}")
+        if vacuum and db.engine.dialect.name == 'sqlite':
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                connection.execute(text('VACUUM'))
+
+    return start_retention(app) if start else None
@@ -0,0 +1,152 @@
+import os
+import threading
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+
+from src.models.user import db
+from src.models.chat import Conversation, Message
+
+# Bump whenever a model, an index or the search index changes, so existing
+# databases go through create_all and upgrade_schema once more. While the
+# stored version matches, startup skips reflecting the schema altogether.
+SCHEMA_VERSION = 4
+
+schema_version = db.Table('schema_version', db.Column('version', db.Integer, nullable=False))
+
+
+def _add_column(table, column):
+    dialect = db.engine.dialect
+    preparer = dialect.identifier_preparer
+    ddl = f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=dialect)}'
+    if column.server_default is not None:
+        ddl += f" DEFAULT '{column.server_default.arg}'"
+    if not column.nullable:
+        ddl += ' NOT NULL'
+    with db.engine.begin() as connection:
+        connection.execute(text(ddl))
+
+
+def backfill_conversation_summaries(conversation_ids=None):
+    """Recompute message_count and the last-message columns from messages"""
+    from src.services.persistence import MESSAGE_PREVIEW_LENGTH
+
+    messages = Message.__table__
+    conversations = Conversation.__table__
+    in_conversation = messages.c.conversation_id == conversations.c.id
+    update = conversations.update().values(
+        message_count=select(func.count()).where(in_conversation).scalar_subquery(),
+        last_message_at=select(func.max(messages.c.timestamp)).where(in_conversation).scalar_subquery(),
+        last_message_preview=select(func.substr(messages.c.content, 1, MESSAGE_PREVIEW_LENGTH))
+            .where(in_conversation).order_by(messages.c.id.desc()).limit(1).scalar_subquery(),
+        # Not an activity, keep the original timestamp
+        updated_at=conversations.c.updated_at
+    )
+
+    # Archived conversations have no rows in messages to count
+    update = update.where(conversations.c.archived_at.is_(None))
+
+    with db.engine.begin() as connection:
+        if conversation_ids is None:
+            connection.execute(update)
+            return
+        conversation_ids = list(conversation_ids)
+        for start in range(0, len(conversation_ids), 500):
+            connection.execute(update.where(conversations.c.id.in_(conversation_ids[start:start + 500])))
+
+
+def backfills():
+    """What to run once when any of these columns had to be added to an existing table.
+
+    The services are imported here, not at the top: main.py imports this
+    module at startup and leaves them for the first request.
+    """
+    from src.services.context import backfill_token_counts
+    from src.services.usage import backfill_tool_usage
+
+    return {
+        ('conversations', 'message_count'): backfill_conversation_summaries,
+        ('messages', 'tools_mask'): backfill_tool_usage,
+        ('messages', 'token_count'): backfill_token_counts,
+    }
+
+
+def upgrade_schema():
+    """Bring an existing database up to date with the models.
+
+    ``db.create_all()`` only creates missing tables, so columns and indexes
+    added to a model after its table exists are created here, and derived
+    columns are backfilled from the existing rows.
+    """
+    inspector = inspect(db.engine)
+    added = set()
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                _add_column(table, column)
+                added.add((table.name, column.name))
+
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=db.engine)
+
+    for key, backfill in backfills().items():
+        if key in added:
+            backfill()
+
+
+def schema_is_current():
+    """True when the database was last prepared with this SCHEMA_VERSION"""
+    try:
+        with db.engine.connect() as connection:
+            return connection.execute(select(schema_version.c.version)).scalar() == SCHEMA_VERSION
+    except DBAPIError:
+        # No marker table yet
+        return False
+
+
+def prepare_database():
+    """Create and upgrade the schema unless the version marker says it is current"""
+    if schema_is_current():
+        return False
+
+    from src.services.search import create_search_index
+
+    db.create_all()
+    upgrade_schema()
+    create_search_index()
+    with db.engine.begin() as connection:
+        connection.execute(schema_version.delete())
+        connection.execute(schema_version.insert().values(version=SCHEMA_VERSION))
+    return True
+
+
+def init_schema(app):
+    """Prepare the database at startup, or on the first request with FAST_STARTUP.
+
+    With ``FAST_STARTUP`` the worker does not connect to the database at all
+    until a request arrives, which keeps scale-to-zero cold starts short.
+    """
+    app.config.setdefault('FAST_STARTUP', os.environ.get('FAST_STARTUP', '0') == '1')
+
+    if not app.config['FAST_STARTUP']:
+        with app.app_context():
+            prepare_database()
+        return
+
+    lock = threading.Lock()
+    prepared = False
+
+    @app.before_request
+    def prepare_database_once():
+        nonlocal prepared
+        if prepared:
+            return
+        with lock:
+            if not prepared:
+                prepare_database()
+                prepared = True
@@ -0,0 +1,253 @@
+import re
+
+import click
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import OperationalError
+
+from src.models.user import db
+from src.models.chat import Conversation, ConversationArchive, Message
+from src.services.retention import archived_rows
+
+# Matched terms are wrapped in these in result snippets
+SNIPPET_OPEN = '**'
+SNIPPET_CLOSE = '**'
+SNIPPET_TOKENS = 16
+
+# Characters of context around the first match in the LIKE fallback
+FALLBACK_SNIPPET_CHARS = 60
+
+SEARCH_TERM = re.compile(r"[\w'’-]+\*?")
+
+# The index reads message content and the owning session through this view,
+# so session scoping is part of the MATCH. The session id is hex-encoded to
+# make it a single token whatever characters it contains. Triggers on
+# messages keep the index current in the same transaction as every insert.
+SEARCH_DDL = (
+    """CREATE VIEW IF NOT EXISTS messages_search_source AS
+       SELECT messages.id AS id, messages.content AS content, hex(conversations.session_id) AS session_key
+       FROM messages JOIN conversations ON conversations.id = messages.conversation_id""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+       content, session_key, content='messages_search_source', content_rowid='id', tokenize='unicode61')""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+       INSERT INTO messages_fts(rowid, content, session_key)
+       VALUES (new.id, new.content, (SELECT hex(session_id) FROM conversations WHERE id = new.conversation_id));
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+       INSERT INTO messages_fts(messages_fts, rowid, content, session_key)
+       VALUES ('delete', old.id, old.content, (SELECT hex(session_id) FROM conversations WHERE id = old.conversation_id));
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+       INSERT INTO messages_fts(messages_fts, rowid, content, session_key)
+       VALUES ('delete', old.id, old.content, (SELECT hex(session_id) FROM conversations WHERE id = old.conversation_id));
+       INSERT INTO messages_fts(rowid, content, session_key)
+       VALUES (new.id, new.content, (SELECT hex(session_id) FROM conversations WHERE id = new.conversation_id));
+       END""",
+    # Rank on content only, the session column is just a filter
+    "INSERT INTO messages_fts(messages_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0)')",
+)
+
+
+def match_expression(query):
+    """Turn free text into an FTS5 query: every term must match, ``term*`` is a prefix"""
+    terms = []
+    for term in SEARCH_TERM.findall(query):
+        prefix = term.endswith('*')
+        term = term.rstrip('*')
+        if term:
+            terms.append(f'"{term}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def session_key(session_id):
+    return session_id.encode('utf-8').hex()
+
+
+class MessageSearch:
+    """Ranked full-text search over a session's messages.
+
+    Uses the SQLite FTS5 index when it is available and falls back to a
+    ``LIKE`` scan (newest first, unranked) on other databases. Archived
+    conversations are no longer in the index; their messages are matched
+    like the fallback, read from the session's archives, and come after
+    every live match.
+    """
+
+    def __init__(self, fts=None):
+        self._fts = fts
+
+    @property
+    def fts(self):
+        """Whether the FTS5 index exists, looked up on first use"""
+        if self._fts is None:
+            self._fts = db.engine.dialect.name == 'sqlite' and inspect(db.engine).has_table('messages_fts')
+        return self._fts
+
+    def search(self, session_id, query, role=None, limit=20, offset=0):
+        """Return ``(results, page)`` for one page of matches"""
+        match = match_expression(query)
+        if not match:
+            return [], {'limit': limit, 'offset': offset, 'has_more': False, 'next_offset': None}
+
+        if self.fts:
+            rows = self._search_fts(session_id, match, role, limit + 1, offset)
+        else:
+            rows = self._search_like(session_id, query, role, limit + 1, offset)
+
+        if len(rows) <= limit:
+            # The live matches end on this page, carry on into the archives
+            live_total = offset + len(rows) if rows or not offset else self._count_live(session_id, match, query, role)
+            start = max(0, offset - live_total)
+            rows += self._search_archived(session_id, query, role)[start:start + limit + 1 - len(rows)]
+
+        has_more = len(rows) > limit
+        return rows[:limit], {
+            'limit': limit,
+            'offset': offset,
+            'has_more': has_more,
+            'next_offset': offset + limit if has_more else None
+        }
+
+    def _fts_params(self, session_id, match, role):
+        return {'match': f'session_key : {session_key(session_id)} AND content : ({match})', 'role': role}
+
+    def _search_fts(self, session_id, match, role, limit, offset):
+        sql = f"""
+            SELECT messages_fts.rowid AS message_id, messages.conversation_id, messages.message_type,
+                   messages.timestamp, messages_fts.rank AS rank,
+                   snippet(messages_fts, 0, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet
+            FROM messages_fts JOIN messages ON messages.id = messages_fts.rowid
+            WHERE messages_fts MATCH :match {'AND messages.message_type = :role' if role else ''}
+            ORDER BY messages_fts.rank
+            LIMIT :limit OFFSET :offset
+        """
+        rows = db.session.execute(text(sql).columns(timestamp=db.DateTime), {
+            **self._fts_params(session_id, match, role),
+            'open': SNIPPET_OPEN,
+            'close': SNIPPET_CLOSE,
+            'limit': limit,
+            'offset': offset
+        })
+        return [{
+            'message_id': row.message_id,
+            'conversation_id': row.conversation_id,
+            'message_type': row.message_type,
+            'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+            'snippet': row.snippet,
+            'rank': row.rank
+        } for row in rows]
+
+    def _like_query(self, session_id, terms, role):
+        messages = Message.query.join(Conversation).filter(Conversation.session_id == session_id)
+        for term in terms:
+            messages = messages.filter(Message.content.ilike(f'%{term}%'))
+        if role:
+            messages = messages.filter(Message.message_type == role)
+        return messages
+
+    def _search_like(self, session_id, query, role, limit, offset):
+        terms = _terms(query)
+        messages = self._like_query(session_id, terms, role).order_by(Message.id.desc()).limit(limit).offset(offset)
+        return [{
+            'message_id': message.id,
+            'conversation_id': message.conversation_id,
+            'message_type': message.message_type,
+            'timestamp': message.timestamp.isoformat() if message.timestamp else None,
+            'snippet': _like_snippet(message.content, terms[0]),
+            'rank': None
+        } for message in messages]
+
+    def _count_live(self, session_id, match, query, role):
+        if not self.fts:
+            return self._like_query(session_id, _terms(query), role).count()
+        sql = f"""
+            SELECT count(*) FROM messages_fts JOIN messages ON messages.id = messages_fts.rowid
+            WHERE messages_fts MATCH :match {'AND messages.message_type = :role' if role else ''}
+        """
+        return db.session.execute(text(sql), self._fts_params(session_id, match, role)).scalar()
+
+    def _search_archived(self, session_id, query, role):
+        """Every match in the session's archived conversations, newest first"""
+        terms = _terms(query)
+        lowered = [term.lower() for term in terms]
+        archives = db.session.execute(
+            select(ConversationArchive.conversation_id, ConversationArchive.codec, ConversationArchive.payload)
+            .join(Conversation, Conversation.id == ConversationArchive.conversation_id)
+            .where(Conversation.session_id == session_id)
+        )
+        results = []
+        for conversation_id, codec, payload in archives:
+            for row in archived_rows(codec, payload):
+                content = row['content'].lower()
+                if (role and row['message_type'] != role) or not all(term in content for term in lowered):
+                    continue
+                results.append({
+                    'message_id': row['id'],
+                    'conversation_id': conversation_id,
+                    'message_type': row['message_type'],
+                    'timestamp': row['timestamp'],
+                    'snippet': _like_snippet(row['content'], terms[0]),
+                    'rank': None
+                })
+        return sorted(results, key=lambda result: result['message_id'], reverse=True)
+
+    def rebuild(self):
+        """Re-index every message, for databases that predate the index"""
+        if self.fts:
+            with db.engine.begin() as connection:
+                connection.execute(text("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')"))
+
+
+def _terms(query):
+    return [term.rstrip('*') for term in SEARCH_TERM.findall(query)]
+
+
+def _like_snippet(content, term):
+    position = content.lower().find(term.lower())
+    start = max(0, position - FALLBACK_SNIPPET_CHARS)
+    end = position + len(term)
+    return (
+        ('…' if start else '') + content[start:position]
+        + SNIPPET_OPEN + content[position:end] + SNIPPET_CLOSE
+        + content[end:end + FALLBACK_SNIPPET_CHARS] + ('…' if end + FALLBACK_SNIPPET_CHARS < len(content) else '')
+    )
+
+
+def _create_fts_index():
+    """Create the FTS5 table and triggers; False when SQLite lacks FTS5"""
+    created = not inspect(db.engine).has_table('messages_fts')
+    try:
+        with db.engine.begin() as connection:
+            for statement in SEARCH_DDL:
+                connection.execute(text(statement))
+    except OperationalError:
+        return False, False
+    return True, created
+
+
+def create_search_index():
+    """Create the search index on SQLite, indexing existing messages when it is new.
+
+    Part of the schema preparation in ``src.services.schema``, so it only
+    runs when the schema version marker is out of date.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return
+    fts, created = _create_fts_index()
+    if fts and created and Message.query.first() is not None:
+        MessageSearch(fts).rebuild()
+
+
+def init_search(app):
+    """Set up message search and add the ``flask rebuild-search-index`` command"""
+    search = MessageSearch()
+    app.extensions['message_search'] = search
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Re-index all messages for full-text search."""
+        if db.engine.dialect.name == 'sqlite':
+            _create_fts_index()
+        search.rebuild()
+        click.echo(f"Indexed {Message.query.count()} messages" if search.fts else 'FTS5 is not available, nothing to do')
+
+    return search
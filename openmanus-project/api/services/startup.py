@@ -0,0 +1,36 @@
+import threading
+import time
+
+
+class LazySetup:
+    """WSGI middleware that finishes setting up the app when its first request arrives.
+
+    ``setup(app)`` runs once, under a lock, before that request reaches
+    Flask, so it can still register blueprints, routes and hooks; requests
+    arriving meanwhile wait for it. Middleware that ``setup`` installs
+    around ``app.wsgi_app`` (ProxyFix) sees the first request too.
+    ``seconds`` is how long ``setup`` took, None until it has run.
+    """
+
+    def __init__(self, app, setup):
+        self.app = app
+        self.setup = setup
+        self.seconds = None
+        self._wsgi_app = app.wsgi_app
+        self._lock = threading.Lock()
+        app.wsgi_app = self
+
+    def run(self):
+        """Run ``setup`` now if it has not run yet, for scripts that use the app without requests"""
+        with self._lock:
+            if self.seconds is None:
+                started = time.perf_counter()
+                self.setup(self.app)
+                self.seconds = time.perf_counter() - started
+
+    def __call__(self, environ, start_response):
+        if self.seconds is None:
+            self.run()
+            if self.app.wsgi_app is not self:
+                return self.app.wsgi_app(environ, start_response)
+        return self._wsgi_app(environ, start_response)
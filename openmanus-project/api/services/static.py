@@ -0,0 +1,136 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from datetime import datetime, timezone
+from functools import cached_property
+
+import click
+from flask import request, send_file
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, .gz siblings are enough
+    brotli = None
+
+# Vite emits content-hashed names such as assets/index-CtBIkMh_.js
+HASHED_ASSET = re.compile(r'^assets/.+-[0-9A-Za-z_-]{8}\.[0-9a-z]+$')
+
+# Preference order when the client accepts several encodings
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+
+def _file_etag(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StaticFile:
+    """A file of the static folder with its precompressed siblings"""
+
+    def __init__(self, root, name):
+        self.name = name
+        self.path = os.path.join(root, name)
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self.last_modified = datetime.fromtimestamp(os.path.getmtime(self.path), timezone.utc)
+        self.immutable = bool(HASHED_ASSET.match(name))
+        self.variants = {}
+        for encoding, suffix in ENCODINGS:
+            variant = self.path + suffix
+            if os.path.isfile(variant):
+                self.variants[encoding] = variant
+
+    @cached_property
+    def etag(self):
+        # Hashed on first use rather than at startup, to keep cold starts short
+        return _file_etag(self.path)
+
+
+class StaticManifest:
+    """In-memory index of the static folder built once at startup.
+
+    Requests are answered from the index instead of probing the filesystem,
+    so files added after startup are only served after a restart.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.files = {}
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                    continue
+                name = os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, '/')
+                self.files[name] = StaticFile(root, name)
+
+    def get(self, name):
+        return self.files.get(name)
+
+    def send(self, static_file):
+        """Send a file, preferring a precompressed variant the client accepts"""
+        path, etag, encoding = static_file.path, static_file.etag, None
+        for candidate, _ in ENCODINGS:
+            if candidate in static_file.variants and request.accept_encodings[candidate]:
+                path, etag, encoding = static_file.variants[candidate], f'{etag}-{candidate}', candidate
+                break
+
+        response = send_file(
+            path,
+            mimetype=static_file.mimetype,
+            download_name=os.path.basename(static_file.name),
+            etag=etag,
+            last_modified=static_file.last_modified,
+            max_age=IMMUTABLE_MAX_AGE if static_file.immutable else None,
+            conditional=True
+        )
+        if static_file.immutable:
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if static_file.variants:
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+def compress_static(root, min_size=1024):
+    """Write .gz (and .br when brotli is installed) next to compressible files"""
+    written = []
+    for static_file in StaticManifest(root).files.values():
+        if not static_file.mimetype.startswith(COMPRESSIBLE_TYPES) or os.path.getsize(static_file.path) < min_size:
+            continue
+        with open(static_file.path, 'rb') as f:
+            data = f.read()
+        outputs = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            outputs.append(('.br', brotli.compress(data, quality=11)))
+        for suffix, compressed in outputs:
+            if len(compressed) < len(data):
+                with open(static_file.path + suffix, 'wb') as f:
+                    f.write(compressed)
+                written.append(static_file.name + suffix)
+    return written
+
+
+def init_static(app):
+    """Index the static folder and add the ``flask compress-static`` command"""
+    manifest = StaticManifest(app.static_folder) if app.static_folder and os.path.isdir(app.static_folder) else None
+    app.extensions['static_manifest'] = manifest
+
+    @app.cli.command('compress-static')
+    @click.option('--min-size', default=1024, help='Skip files smaller than this many bytes.')
+    def compress_static_command(min_size):
+        """Precompress the static folder for serving with Content-Encoding."""
+        for name in compress_static(app.static_folder, min_size):
+            click.echo(name)
+
+    return manifest
@@ -0,0 +1,21 @@
+import os
+
+from openmanus_common.storage import Storage
+
+
+def init_storage(app):
+    """Apply the storage profile to the engine; call before ``db.init_app``.
+
+    STORAGE_PROFILE is a profile name, ``auto`` (sqlite-wal or
+    postgres-pooled, by database) or the dotted path of a dict of settings.
+    """
+    app.config.setdefault('STORAGE_PROFILE', os.environ.get('STORAGE_PROFILE', 'auto'))
+    storage = Storage(
+        app.config['SQLALCHEMY_DATABASE_URI'], app.config['STORAGE_PROFILE'],
+        lookup=lambda name: app.config.get(name, os.environ.get(name))
+    )
+    options = storage.engine_options()
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    app.extensions['storage'] = storage
+    return storage
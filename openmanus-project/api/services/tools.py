@@ -0,0 +1,37 @@
+import importlib
+import os
+
+from openmanus_common.tools import DEFAULT_TOOL_TIMEOUT, ToolExecutor, stub_registry
+
+
+def init_tools(app):
+    """Create the tool executor when TOOL_EXECUTION is on.
+
+    ``TOOL_REGISTRY`` is the dotted path of a function returning the
+    ToolRegistry to use; by default every tool is a StubTool, with
+    latencies scaled by ``TOOL_STUB_LATENCY_SCALE``.
+    """
+    app.config.setdefault('TOOL_EXECUTION', os.environ.get('TOOL_EXECUTION', '0') == '1')
+    app.config.setdefault('TOOL_REGISTRY', os.environ.get('TOOL_REGISTRY'))
+    app.config.setdefault('TOOL_STUB_LATENCY_SCALE', float(os.environ.get('TOOL_STUB_LATENCY_SCALE', 1)))
+    app.config.setdefault('TOOL_WORKERS', int(os.environ.get('TOOL_WORKERS', 16)))
+    app.config.setdefault('TOOL_PROCESS_WORKERS', int(os.environ.get('TOOL_PROCESS_WORKERS', 0)))
+    app.config.setdefault('TOOL_TIMEOUT', float(os.environ.get('TOOL_TIMEOUT', DEFAULT_TOOL_TIMEOUT)))
+
+    if not app.config['TOOL_EXECUTION']:
+        return None
+
+    if app.config['TOOL_REGISTRY']:
+        module_name, _, function_name = app.config['TOOL_REGISTRY'].rpartition('.')
+        registry = getattr(importlib.import_module(module_name), function_name)()
+    else:
+        registry = stub_registry(app.config['TOOL_STUB_LATENCY_SCALE'])
+
+    executor = ToolExecutor(
+        registry,
+        max_workers=app.config['TOOL_WORKERS'],
+        process_workers=app.config['TOOL_PROCESS_WORKERS'],
+        default_timeout=app.config['TOOL_TIMEOUT']
+    )
+    app.extensions['tool_executor'] = executor
+    return executor
@@ -0,0 +1,102 @@
+from sqlalchemy import select
+
+from openmanus_common import transfer
+from openmanus_common.transfer import EXPORT_CHUNK_SIZE, isoformat
+
+from src.models.user import db
+from src.models.chat import Conversation, ConversationArchive, Message, UsageDaily
+from src.services.context import count_tokens
+from src.services.retention import archived_rows
+from src.services.schema import backfill_conversation_summaries
+from src.services.usage import tools_mask
+
+# Archived conversations decompressed per round trip while exporting
+EXPORT_ARCHIVE_CHUNK_SIZE = 50
+
+# The NDJSON format of openmanus_common.transfer, shared with the production
+# backend; archived conversations' messages come after all the others.
+
+
+def export_records():
+    """Yield every conversation and message as export records, streaming from the database"""
+    conversations = Conversation.__table__
+    messages = Message.__table__
+
+    rows = db.session.execute(
+        select(conversations).order_by(conversations.c.id).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    for row in rows:
+        yield {
+            'type': 'conversation',
+            'id': row.id,
+            'session_id': row.session_id,
+            'title': row.title,
+            'created_at': isoformat(row.created_at),
+            'updated_at': isoformat(row.updated_at)
+        }
+
+    rows = db.session.execute(
+        select(messages)
+        .order_by(messages.c.conversation_id, messages.c.id)
+        .execution_options(yield_per=EXPORT_CHUNK_SIZE)
+    )
+    for row in rows:
+        yield {
+            'type': 'message',
+            'id': row.id,
+            'conversation_id': row.conversation_id,
+            'role': row.message_type,
+            'content': row.content,
+            'timestamp': isoformat(row.timestamp),
+            'task': row.task_description,
+            'tools': row.tools_used or [],
+            'processing_time': row.processing_time
+        }
+
+    archives = db.session.execute(
+        select(ConversationArchive.conversation_id, ConversationArchive.codec, ConversationArchive.payload)
+        .order_by(ConversationArchive.conversation_id)
+        .execution_options(yield_per=EXPORT_ARCHIVE_CHUNK_SIZE)
+    )
+    for conversation_id, codec, payload in archives:
+        for row in archived_rows(codec, payload):
+            yield {
+                'type': 'message',
+                'id': row['id'],
+                'conversation_id': conversation_id,
+                'role': row['message_type'],
+                'content': row['content'],
+                'timestamp': row['timestamp'],
+                'task': row['task_description'],
+                'tools': row['tools_used'] or [],
+                'processing_time': row['processing_time']
+            }
+
+
+def export_ndjson():
+    """Yield the export as NDJSON text, a chunk of lines at a time"""
+    return transfer.export_ndjson(export_records())
+
+
+class NDJSONImporter(transfer.NDJSONImporter):
+    """Imports into this app's tables through ``db.session``, counting usage and summarising conversations"""
+
+    def __init__(self, chunk_size=transfer.IMPORT_CHUNK_SIZE):
+        super().__init__(db.session, Conversation.__table__, Message.__table__, UsageDaily.__table__, chunk_size)
+
+    def message_row(self, message):
+        return {
+            'conversation_id': message['conversation_id'],
+            'message_type': message['role'],
+            'content': message['content'],
+            'token_count': count_tokens(message['content']),
+            'timestamp': message['timestamp'],
+            'task_description': message['task'],
+            'tools_used': message['tools'] or None,
+            'tools_mask': tools_mask(message['tools']),
+            'processing_time': message['processing_time']
+        }
+
+    def flush(self):
+        super().flush()
+        backfill_conversation_summaries(self.conversation_ids.values())
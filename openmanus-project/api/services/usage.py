@@ -0,0 +1,113 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, func, or_, select
+
+from openmanus_common import usage
+from openmanus_common.usage import INTERVALS, TOOL_BITS, TOOLS, count_usage, mask_tools, tools_mask  # noqa: F401
+
+from src.models.user import db
+from src.models.chat import Conversation, ConversationArchive, Message, UsageDaily
+from src.services.retention import archived_rows
+
+# Messages read per chunk while backfilling tools_mask
+BACKFILL_CHUNK_SIZE = 1000
+# Archives decompressed per round trip while recounting usage
+ARCHIVE_CHUNK_SIZE = 50
+
+
+def record_usage(counts):
+    """Add counts to usage_daily in one statement within the current transaction"""
+    usage.record_usage(db.session, UsageDaily.__table__, counts)
+
+
+def _as_date(value):
+    # SQLite's date() returns text, PostgreSQL's a date
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def aggregate_usage(start=None, end=None):
+    """Count assistant turns, tools and tasks per day straight from messages, with SQL aggregates"""
+    day = func.date(Message.timestamp)
+    in_range = [Message.message_type == 'assistant']
+    if start is not None:
+        in_range.append(Message.timestamp >= start)
+    if end is not None:
+        in_range.append(Message.timestamp < end + timedelta(days=1))
+
+    counts = Counter()
+    # COUNT skips the NULLs of the messages without that tool's bit
+    tool_columns = [func.count(case((Message.tools_mask.op('&')(bit) != 0, 1))) for bit in TOOL_BITS.values()]
+    for row in db.session.execute(select(day, func.count(), *tool_columns).where(*in_range).group_by(day)):
+        row_day = _as_date(row[0])
+        counts[(row_day, 'turn', '')] = row[1]
+        for tool, count in zip(TOOLS, row[2:]):
+            if count:
+                counts[(row_day, 'tool', tool)] = count
+    tasks = select(day, Message.task_description, func.count()).where(
+        *in_range, Message.task_description.isnot(None)
+    ).group_by(day, Message.task_description)
+    for row_day, task, count in db.session.execute(tasks):
+        counts[(_as_date(row_day), 'task', task)] = count
+    return counts
+
+
+def aggregate_archived_usage(start=None, end=None):
+    """``aggregate_usage`` for archived conversations, whose messages are only in their archives"""
+    archives = select(ConversationArchive.codec, ConversationArchive.payload)
+    if start is not None:
+        # Skip the conversations whose last message is older than the range
+        archives = archives.join(Conversation, Conversation.id == ConversationArchive.conversation_id).where(
+            or_(Conversation.last_message_at.is_(None), Conversation.last_message_at >= start)
+        )
+
+    def entries():
+        for codec, payload in db.session.execute(archives.execution_options(yield_per=ARCHIVE_CHUNK_SIZE)):
+            for row in archived_rows(codec, payload):
+                if row['message_type'] != 'assistant' or not row['timestamp']:
+                    continue
+                day = datetime.fromisoformat(row['timestamp']).date()
+                if (start is None or day >= start) and (end is None or day <= end):
+                    # Tools through the mask, as aggregate_usage counts them
+                    yield day, row['task_description'], mask_tools(row['tools_mask'])
+
+    return count_usage(entries())
+
+
+def rebuild_usage(start=None, end=None):
+    """Recount usage_daily from messages and archives, for all days or the days from ``start`` to ``end``"""
+    counts = aggregate_usage(start, end)
+    counts.update(aggregate_archived_usage(start, end))
+    stale = UsageDaily.__table__.delete()
+    if start is not None:
+        stale = stale.where(UsageDaily.day >= start)
+    if end is not None:
+        stale = stale.where(UsageDaily.day <= end)
+    db.session.execute(stale)
+    record_usage(counts)
+    db.session.commit()
+
+
+def backfill_tool_usage():
+    """Fill tools_mask from tools_used for existing messages, then count usage_daily from scratch"""
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Message.id, Message.tools_used)
+            .where(Message.id > last_id, Message.message_type == 'assistant')
+            .order_by(Message.id).limit(BACKFILL_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        db.session.execute(
+            Message.__table__.update().where(Message.__table__.c.id == db.bindparam('message_id')),
+            [{'message_id': message_id, 'tools_mask': tools_mask(tools)} for message_id, tools in rows]
+        )
+        db.session.commit()
+        last_id = rows[-1][0]
+    rebuild_usage()
+
+
+def usage_report(start, end, interval='day'):
+    """Turn, tool and task counts from ``start`` to ``end`` (inclusive), in total and per interval"""
+    return usage.usage_report(db.session, UsageDaily.__table__, start, end, interval)
@@ -0,0 +1,125 @@
+from sqlalchemy import or_, select
+
+from openmanus_common.dialects import upsert_insert
+
+from src.models.user import User, db
+
+# Fields a listing may ask for; id is always returned since it is the cursor
+USER_FIELDS = ('id', 'username', 'email')
+
+# Users written per multi-row INSERT (two bound values each)
+BULK_CHUNK_SIZE = 500
+
+BULK_MODES = ('create', 'upsert')
+
+# Longest value each written column takes
+FIELD_LENGTHS = {field: User.__table__.c[field].type.length for field in ('username', 'email')}
+
+
+def user_fields(value):
+    """The columns named by a comma-separated ``fields`` value, raising ValueError for unknown ones"""
+    if not value:
+        return [getattr(User, field) for field in USER_FIELDS]
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = sorted(set(names) - set(USER_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (choose from {', '.join(USER_FIELDS)})")
+    return [getattr(User, field) for field in USER_FIELDS if field == 'id' or field in names]
+
+
+def _invalid(row):
+    """Why a bulk row cannot be written, or None"""
+    if not isinstance(row, dict):
+        return 'Each user must be an object with username and email'
+    for field, length in FIELD_LENGTHS.items():
+        value = row.get(field)
+        if not isinstance(value, str) or not value.strip():
+            return f'{field} must be a non-empty string'
+        if len(value) > length:
+            return f'{field} must be at most {length} characters'
+    return None
+
+
+def _conflict(index, field):
+    return {'index': index, 'status': 'conflict', 'field': field, 'error': f'{field} already exists'}
+
+
+def bulk_upsert_users(rows, mode='create'):
+    """Create (or with ``upsert``, update by username) many users in the current transaction.
+
+    Rows are looked up and written ``BULK_CHUNK_SIZE`` at a time, new users
+    with one multi-row INSERT per chunk. A row whose username or email is
+    taken by another user, in the database or earlier in the batch, is
+    reported as a conflict and skipped rather than failing the rest. In
+    ``upsert`` mode an existing username gets the row's email instead.
+    Returns one result per row: ``index``, ``status`` (``created``,
+    ``updated``, ``unchanged``, ``conflict`` or ``invalid``) and ``id`` or
+    ``error``.
+    """
+    results = [None] * len(rows)
+    claimed_usernames = set()
+    claimed_emails = set()
+    table = User.__table__
+    insert = upsert_insert(db.engine.dialect.name)
+
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = []
+        for index in range(start, min(start + BULK_CHUNK_SIZE, len(rows))):
+            error = _invalid(rows[index])
+            if error:
+                results[index] = {'index': index, 'status': 'invalid', 'error': error}
+            else:
+                chunk.append((index, rows[index]['username'], rows[index]['email']))
+        if not chunk:
+            continue
+
+        existing = db.session.execute(
+            select(User.id, User.username, User.email).where(or_(
+                User.username.in_({username for _, username, _ in chunk}),
+                User.email.in_({email for _, _, email in chunk})
+            ))
+        ).all()
+        by_username = {username: (user_id, email) for user_id, username, email in existing}
+        email_owner = {email: username for _, username, email in existing}
+
+        new, updates = [], []
+        for index, username, email in chunk:
+            if username in claimed_usernames:
+                results[index] = _conflict(index, 'username')
+                continue
+            owner = email_owner.get(email, username)
+            if owner != username or email in claimed_emails:
+                results[index] = _conflict(index, 'email')
+                continue
+            if username in by_username:
+                user_id, current_email = by_username[username]
+                if mode != 'upsert':
+                    results[index] = _conflict(index, 'username')
+                    continue
+                status = 'unchanged' if current_email == email else 'updated'
+                if status == 'updated':
+                    updates.append({'user_id': user_id, 'email': email})
+                results[index] = {'index': index, 'status': status, 'id': user_id}
+            else:
+                new.append((index, username, email))
+            claimed_usernames.add(username)
+            claimed_emails.add(email)
+
+        if updates:
+            db.session.execute(
+                table.update().where(table.c.id == db.bindparam('user_id')), updates
+            )
+        if new:
+            # Rows a concurrent writer got to first are skipped by the
+            # constraints and missing from RETURNING. A parameter list is sent as
+            # multi-row INSERTs from one cached statement (insertmanyvalues)
+            created = dict(db.session.execute(
+                insert(table).on_conflict_do_nothing().returning(table.c.username, table.c.id),
+                [{'username': username, 'email': email} for _, username, email in new]
+            ).all())
+            for index, username, _ in new:
+                if username in created:
+                    results[index] = {'index': index, 'status': 'created', 'id': created[username]}
+                else:
+                    results[index] = {'index': index, 'status': 'conflict', 'error': 'username or email already exists'}
+    return results
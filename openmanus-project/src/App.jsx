@@ -7,6 +7,33 @@ import { Badge } from '@/components/ui/badge.jsx'
 import { Loader2, Send, Bot, User, Terminal, Code, Globe, FileText, Image, Database } from 'lucide-react'
 import './App.css'
 
+// Parse a text/event-stream response body, calling onEvent(event, data) per event
+const readEventStream = async (response, onEvent) => {
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+
+      let event = 'message'
+      let data = ''
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim()
+        else if (line.startsWith('data:')) data += line.slice(5).trim()
+      }
+      if (data) onEvent(event, JSON.parse(data))
+    }
+  }
+}
+
 function App() {
   const [messages, setMessages] = useState([
     {
@@ -18,6 +45,7 @@ function App() {
   ])
   const [input, setInput] = useState('')
   const [isLoading, setIsLoading] = useState(false)
+  const [streamingId, setStreamingId] = useState(null)
   const [currentTask, setCurrentTask] = useState(null)
   const messagesEndRef = useRef(null)
 
@@ -44,47 +72,88 @@ function App() {
     setInput('')
     setIsLoading(true)
 
+    const assistantId = Date.now() + 1
+
     try {
       // Get API URL from runtime environment
       const apiUrl = window.ENV?.API_URL
       if (!apiUrl) {
         throw new Error('API URL not configured')
       }
-      const response = await fetch(`${apiUrl}/api/chat`, {
+      const request = {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Accept': 'text/event-stream',
+          // One key per message, so a retried request is answered once
+          'Idempotency-Key': crypto.randomUUID?.() ?? `${userMessage.id}-${Math.random().toString(36).slice(2)}`,
         },
-        body: JSON.stringify({ message: input.trim() })
-      })
+        body: JSON.stringify({ message: userMessage.content })
+      }
+      let response = await fetch(`${apiUrl}/api/chat/stream`, request)
+      if (response.status === 404) {
+        // Backend without the streaming endpoint
+        response = await fetch(`${apiUrl}/api/chat`, request)
+      }
 
       if (!response.ok) {
         throw new Error('Failed to get response')
       }
 
-      const data = await response.json()
-      
-      const assistantMessage = {
-        id: Date.now() + 1,
+      if (!response.headers.get('Content-Type')?.includes('text/event-stream')) {
+        const data = await response.json()
+
+        const assistantMessage = {
+          id: assistantId,
+          type: 'assistant',
+          content: data.response || 'I understand your request. Let me work on that for you.',
+          timestamp: new Date().toLocaleTimeString(),
+          task: data.task || null,
+          tools: data.tools || []
+        }
+
+        setMessages(prev => [...prev, assistantMessage])
+        setCurrentTask(data.task || null)
+        return
+      }
+
+      const updateAssistant = (update) => {
+        setMessages(prev => prev.map(message =>
+          message.id === assistantId ? { ...message, ...update(message) } : message
+        ))
+      }
+
+      setMessages(prev => [...prev, {
+        id: assistantId,
         type: 'assistant',
-        content: data.response || 'I understand your request. Let me work on that for you.',
+        content: '',
         timestamp: new Date().toLocaleTimeString(),
-        task: data.task || null,
-        tools: data.tools || []
-      }
+        task: null,
+        tools: []
+      }])
+      setStreamingId(assistantId)
 
-      setMessages(prev => [...prev, assistantMessage])
-      setCurrentTask(data.task || null)
+      await readEventStream(response, (event, data) => {
+        if (event === 'task') {
+          updateAssistant(() => ({ task: data.task, tools: data.tools || [] }))
+          setCurrentTask(data.task || null)
+        } else if (event === 'content') {
+          updateAssistant(message => ({ content: message.content + data.delta }))
+        } else if (event === 'error') {
+          throw new Error(data.error || 'Failed to get response')
+        }
+      })
     } catch (error) {
       const errorMessage = {
-        id: Date.now() + 1,
+        id: assistantId,
         type: 'assistant',
         content: 'I apologize, but I encountered an error processing your request. Please try again.',
         timestamp: new Date().toLocaleTimeString()
       }
-      setMessages(prev => [...prev, errorMessage])
+      setMessages(prev => [...prev.filter(message => message.id !== assistantId), errorMessage])
     } finally {
       setIsLoading(false)
+      setStreamingId(null)
     }
   }
 
@@ -179,7 +248,7 @@ function App() {
                     )}
                   </div>
                 ))}
-                {isLoading && (
+                {isLoading && !streamingId && (
                   <div className="flex gap-3 justify-start">
                     <div className="w-8 h-8 bg-gradient-to-br from-blue-500 to-purple-600 rounded-full flex items-center justify-center flex-shrink-0">
                       <Bot className="w-4 h-4 text-white" />
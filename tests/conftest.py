@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# The project backend is built the way the benchmarks build it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from support import make_project_app  # noqa: E402
+
+
+@pytest.fixture
+def project_app(tmp_path):
+    app = make_project_app(f"sqlite:///{tmp_path / 'project.db'}")
+    yield app
+    app.extensions['chat_jobs'].shutdown()
+    app.extensions['session_activity'].close()
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+SESSION_ID = 'test-session'
+
+
+def seed_conversations(count, messages_each):
+    from src.models.user import db
+    from src.models.chat import Conversation, Message
+
+    now = datetime.utcnow()
+    db.session.execute(Conversation.__table__.insert(), [
+        dict(session_id=SESSION_ID, title=f'conversation {i}', created_at=now,
+             updated_at=now + timedelta(seconds=i), message_count=messages_each,
+             last_message_preview=f'preview {i}', last_message_at=now)
+        for i in range(count)
+    ])
+    ids = [row.id for row in db.session.execute(db.select(Conversation.id))]
+    db.session.execute(Message.__table__.insert(), [
+        dict(conversation_id=conversation_id, message_type='user', content='hello', timestamp=now)
+        for conversation_id in ids for _ in range(messages_each)
+    ])
+    db.session.commit()
+
+
+def test_listing_conversations_takes_one_query(project_app):
+    from src.models.user import db
+
+    with project_app.app_context():
+        seed_conversations(1000, 3)
+        engine = db.engine
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', listener)
+
+    client = project_app.test_client()
+    with client.session_transaction() as session:
+        session['session_id'] = SESSION_ID
+    try:
+        response = client.get('/api/conversations')
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    assert response.status_code == 200
+    conversations = response.get_json()['conversations']
+    assert len(conversations) == 1000
+    assert conversations[0]['title'] == 'conversation 999'
+    assert conversations[0]['message_count'] == 3
+    assert conversations[0]['last_message_preview'] == 'preview 999'
+
+    selects = [statement for statement in statements if statement.lstrip().upper().startswith('SELECT')]
+    assert len(selects) == 1, selects
+    assert len(statements) == 1, statements